@@ -10,6 +10,7 @@ from django import forms
 from django.contrib import admin
 from django.contrib.admin import helpers
 from django.contrib.contenttypes.models import ContentType
+from django.db.models import Count
 from polymorphic.admin import PolymorphicInlineSupportMixin, StackedPolymorphicInline
 
 from .models import *
@@ -148,10 +149,14 @@ class FormAdmin(PolymorphicInlineSupportMixin, admin.ModelAdmin):
     # Allow "Save as new" for quick duplication of forms
     save_as = True
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(n_fields=Count("field"))
+
     def n_fields(self, obj):
-        return obj.fields.count()
+        return obj.n_fields
 
     n_fields.short_description = "# fields"
+    n_fields.admin_order_field = "n_fields"
 
 
 ################################################################################
@@ -6,16 +6,52 @@ commands.
 __author__ = "Matt Pryor"
 __copyright__ = "Copyright 2015 UK Science and Technology Facilities Council"
 
+import datetime as dt
 import logging
 import re
+import smtplib
+import time
+from datetime import date
 
 from dateutil.relativedelta import relativedelta
 from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.core import mail
+from django.db import transaction
+from django.db.models import Exists, F, OuterRef, Q
 from django.urls import reverse
 from django.utils import timezone
+from jasmin_notifications.models import Notification
 
-from .models import RequestState
-from .notifications import notify_approvers
+from jasmin_metadata.models import Metadatum
+
+from .backends import RoleObjectPermissionsBackend
+from .caching import (
+    bump_service_grants_versions,
+    bump_service_requests_versions,
+    bump_version,
+    user_access,
+)
+from .models import (
+    Access,
+    DashboardSnapshot,
+    Grant,
+    MessageRecipient,
+    Request,
+    RequestState,
+    Role,
+    ServiceMessage,
+    ServiceRetirement,
+)
+from .notifications import notify_approvers, notify_many
+
+#: The notification types that target requests, which are cleared when a request is decided
+REQUEST_NOTIFICATION_TYPES = (
+    "request_confirm",
+    "request_pending",
+    "request_rejected",
+    "request_incomplete",
+)
 
 
 def synchronise_service_access(grant_queryset):
@@ -85,3 +121,621 @@ def remind_pending(request_queryset):
     ).filter_active()
     for req in request_queryset:
         notify_approvers(req)
+
+
+def _service_link(service):
+    """
+    Returns the link to the details page for the given service, as used in notifications.
+    """
+    return reverse(
+        "jasmin_services:service_details",
+        kwargs={"category": service.category.name, "service": service.name},
+    )
+
+
+def _is_training_account(user):
+    return bool(re.match(r"train\d{3}", user.username))
+
+
+def _group_by_user(accesses):
+    """
+    Groups the given grants or requests into a dictionary by the id of their user.
+    """
+    by_user = {}
+    for access in accesses:
+        by_user.setdefault(access.access.user_id, []).append(access)
+    return by_user
+
+
+def _enable_roles(user, grants):
+    """
+    Enables the roles for the given grants for the user, applying each behaviour once.
+    """
+    logger = logging.getLogger(__name__)
+    try:
+        Role.objects.filter(access__grant__in=grants).enable_for(user)
+    except Exception:
+        logger.exception("Error enabling access for {}".format(user))
+
+
+def _disable_roles(user, grants):
+    """
+    Disables the roles for the given grants for the user, unapplying each behaviour once.
+    """
+    logger = logging.getLogger(__name__)
+    try:
+        Role.objects.filter(access__grant__in=grants).disable_for(user)
+    except Exception:
+        logger.exception("Error disabling access for {}".format(user))
+
+
+def _revoke_grants(grants):
+    """
+    Revokes the given grants in bulk, which must already have their reasons set.
+
+    This does the work that the ``post_save`` signals would do for each grant: for the
+    active grants, the behaviours are unapplied once per user and the users are notified
+    in one batch. The grants should be annotated with their active status and have their
+    access, user, role, service and category loaded.
+    """
+    now = timezone.now()
+    for grant in grants:
+        grant.revoked = True
+        # revoked_at is usually populated in pre_save, which bulk_update does not send
+        grant.revoked_at = now
+    Grant.objects.bulk_update(grants, ["revoked", "revoked_at", "user_reason", "internal_reason"])
+    # Only the active grants determine access
+    grants = [grant for grant in grants if grant.active]
+    # Remove access once for each user
+    for user_grants in _group_by_user(grants).values():
+        _disable_roles(user_grants[0].access.user, user_grants)
+    # The revoked grants may have been the only approvers for some roles
+    DashboardSnapshot.objects.refresh_for_grants(grants)
+    bump_service_grants_versions(grants)
+    notify_many(
+        "grant_revoked",
+        (
+            (grant.access.user, grant, _service_link(grant.access.role.service))
+            for grant in grants
+            if not _is_training_account(grant.access.user)
+        ),
+        if_not_exists=True,
+    )
+
+
+def _reject_requests(requests):
+    """
+    Rejects the given pending requests in bulk, which must already have their reasons set.
+
+    The notifications about the requests are cleared and the users are notified in one
+    batch, as the ``post_save`` signals would do for each request. The requests should
+    be annotated with their active status and have their access, user, role, service
+    and category loaded.
+    """
+    for req in requests:
+        req.state = RequestState.REJECTED
+    Request.objects.bulk_update(
+        requests, ["state", "incomplete", "user_reason", "internal_reason", "internal_comment"]
+    )
+    # Clear any notifications about the requests, since they have now been decided
+    Notification.objects.filter(
+        notification_type__name__in=REQUEST_NOTIFICATION_TYPES,
+        target_id__in=[req.pk for req in requests],
+    ).update(followed_at=timezone.now())
+    DashboardSnapshot.objects.refresh({req.access.role_id for req in requests})
+    bump_service_requests_versions(requests)
+    for notification_type, incomplete in [
+        ("request_rejected", False),
+        ("request_incomplete", True),
+    ]:
+        notify_many(
+            notification_type,
+            (
+                (req.access.user, req, _service_link(req.access.role.service))
+                for req in requests
+                if req.active and req.incomplete == incomplete
+            ),
+            if_not_exists=True,
+        )
+
+
+def _approve_requests(requests, expires, granted_by):
+    """
+    Approves the given pending requests in bulk, creating a grant for each of them.
+
+    ``expires`` maps the id of each request to the expiry date for its grant. This does
+    the work that the ``post_save`` signals would do for each request and grant: the
+    metadata is copied to the grants, the behaviours are applied once per user and the
+    users are notified in one batch. The requests should have their access, user, role,
+    service, category, previous grant and metadata loaded.
+    """
+    grants = Grant.objects.bulk_create(
+        [
+            Grant(
+                access=req.access,
+                previous_grant=req.previous_grant,
+                granted_by=granted_by,
+                expires=expires[req.pk],
+                internal_comment=req.internal_comment,
+            )
+            for req in requests
+        ]
+    )
+    content_type = ContentType.objects.get_for_model(Grant)
+    Metadatum.objects.bulk_create(
+        [
+            Metadatum(
+                content_type=content_type, object_id=grant.pk, key=datum.key, value=datum.value
+            )
+            for req, grant in zip(requests, grants)
+            for datum in req.metadata.all()
+        ]
+    )
+    for req, grant in zip(requests, grants):
+        req.state = RequestState.APPROVED
+        req.resulting_grant = grant
+    Request.objects.bulk_update(requests, ["state", "resulting_grant", "internal_comment"])
+    Notification.objects.filter(
+        notification_type__name__in=REQUEST_NOTIFICATION_TYPES,
+        target_id__in=[req.pk for req in requests],
+    ).update(followed_at=timezone.now())
+    DashboardSnapshot.objects.refresh({req.access.role_id for req in requests})
+    DashboardSnapshot.objects.refresh_for_grants(grants)
+    bump_service_requests_versions(requests)
+    bump_service_grants_versions(grants)
+    for user_id in {req.access.user_id for req in requests}:
+        bump_version(user_access(user_id))
+    for user_grants in _group_by_user(grants).values():
+        _enable_roles(user_grants[0].access.user, user_grants)
+    notify_many(
+        "grant_created",
+        (
+            (grant.access.user, grant, _service_link(grant.access.role.service))
+            for grant in grants
+            if not _is_training_account(grant.access.user)
+        ),
+    )
+    return grants
+
+
+def decide_requests(decisions, approver):
+    """
+    Decides many pending requests at once, in a single transaction.
+
+    ``decisions`` maps request ids to dictionaries containing the ``state``, which is
+    one of ``APPROVED``, ``REJECTED`` or ``INCOMPLETE``, and either the ``expires`` date
+    for an approval or the ``user_reason`` and ``internal_reason`` for a rejection. An
+    ``internal_comment`` may also be given.
+
+    The requests are locked while they are decided, and whether the approver may decide
+    them is checked once for each role. Returns a tuple of the decided requests and the
+    ids of the requests that were skipped, either because they are no longer pending or
+    because the approver may not decide them.
+    """
+    with transaction.atomic():
+        requests = list(
+            Request.objects.filter(pk__in=decisions.keys(), state=RequestState.PENDING)
+            .filter_active()
+            .annotate_active()
+            .select_related("access__user", "access__role__service__category", "previous_grant")
+            .prefetch_related("metadata")
+            .select_for_update(of=("self",))
+            .order_by()
+        )
+        allowed = set(
+            RoleObjectPermissionsBackend()
+            .filter_roles_with_perm(
+                approver,
+                "jasmin_services.decide_request",
+                Role.objects.filter(pk__in={req.access.role_id for req in requests}),
+            )
+            .values_list("pk", flat=True)
+        )
+        requests = [req for req in requests if req.access.role_id in allowed]
+        for req in requests:
+            decision = decisions[req.pk]
+            if "internal_comment" in decision:
+                req.internal_comment = decision["internal_comment"]
+            if decision["state"] != RequestState.APPROVED:
+                req.incomplete = decision["state"] == "INCOMPLETE"
+                req.user_reason = decision["user_reason"]
+                req.internal_reason = decision.get("internal_reason", "")
+        approved = [req for req in requests if decisions[req.pk]["state"] == RequestState.APPROVED]
+        rejected = [req for req in requests if decisions[req.pk]["state"] != RequestState.APPROVED]
+        if approved:
+            _approve_requests(
+                approved,
+                {req.pk: decisions[req.pk]["expires"] for req in approved},
+                approver.username,
+            )
+        if rejected:
+            _reject_requests(rejected)
+    decided = {req.pk for req in requests}
+    return requests, [pk for pk in decisions if pk not in decided]
+
+
+def revoke_grants(grant_ids, user_reason, internal_reason="", chunk_size=500):
+    """
+    Revokes the grants with the given ids, skipping any that are already revoked.
+
+    The grants are processed in chunks, each in its own transaction, with the same
+    effects as revoking each grant individually. Returns a tuple of the number of
+    grants revoked and the time taken in seconds.
+    """
+    start = time.monotonic()
+    grant_ids = list(grant_ids)
+    revoked = 0
+    for offset in range(0, len(grant_ids), chunk_size):
+        with transaction.atomic():
+            grants = list(
+                Grant.objects.filter(pk__in=grant_ids[offset : offset + chunk_size], revoked=False)
+                .annotate_active()
+                .select_related("access__user", "access__role__service__category")
+                .select_for_update(of=("self",))
+                .order_by()
+            )
+            for grant in grants:
+                grant.user_reason = user_reason
+                grant.internal_reason = internal_reason
+            _revoke_grants(grants)
+            revoked += len(grants)
+    return revoked, time.monotonic() - start
+
+
+def suspend_accounts(users):
+    """
+    Revokes all the active grants and rejects all the pending requests for the given
+    users, e.g. when their accounts are suspended or training accounts are torn down.
+
+    This has the same effect as saving each grant and request individually, but the
+    grants and requests are updated in bulk, the behaviours are unapplied once per
+    user and the notifications are sent in one batch.
+    """
+    users = {user.pk: user for user in users}
+    if not users:
+        return
+
+    grants = list(
+        Grant.objects.filter(
+            access__user__in=users.keys(),
+            revoked=False,
+            expires__gt=date.today(),
+        )
+        .filter_active()
+        .annotate_active()
+        .select_related("access__role__service__category")
+        .order_by()
+    )
+    requests = list(
+        Request.objects.filter(access__user__in=users.keys(), state=RequestState.PENDING)
+        .annotate_active()
+        .select_related("access__role__service__category")
+        .order_by()
+    )
+    for access in grants + requests:
+        # Use the given user objects rather than loading them again
+        access.access.user = users[access.access.user_id]
+        if _is_training_account(access.access.user):
+            access.user_reason = "Training account was torn down"
+        else:
+            access.user_reason = "Account was suspended"
+    _revoke_grants(grants)
+    _reject_requests(requests)
+
+
+def reactivate_accounts(users):
+    """
+    Re-instates the grants and requests for the given users that were revoked or
+    rejected when their accounts were suspended.
+
+    Grants that have not expired are re-instated in place. Grants that expired within
+    the last two years are replaced with a new grant that expires in 30 days, and
+    older grants are left alone. The grants and requests are written in bulk, and the
+    behaviours and notifications are applied once per user.
+    """
+    users = {user.pk: user for user in users}
+    if not users:
+        return
+    today = date.today()
+
+    grants = Grant.objects.filter(
+        access__user__in=users.keys(),
+        revoked=True,
+        user_reason="Account was suspended",
+        access__role__service__disabled=False,
+    ).filter_active()
+    grants = grants.select_related("access__role__service__category").order_by()
+    # Re-instate revoked grants that have not yet expired
+    reinstated = list(grants.filter(expires__gt=today))
+    for grant in reinstated:
+        grant.revoked = False
+        grant.revoked_at = None
+        grant.user_reason = ""
+    Grant.objects.bulk_update(reinstated, ["revoked", "revoked_at", "user_reason"])
+    # Create new grants with one month till expiry for grants that expired within
+    # the last two years
+    created = Grant.objects.bulk_create(
+        [
+            Grant(
+                access=grant.access,
+                granted_by=grant.granted_by,
+                expires=today + dt.timedelta(days=30),
+                previous_grant=grant,
+            )
+            for grant in grants.filter(
+                expires__lte=today, expires__gte=today - dt.timedelta(days=730)
+            )
+        ]
+    )
+
+    requests = list(
+        Request.objects.filter(
+            access__user__in=users.keys(),
+            state=RequestState.REJECTED,
+            user_reason="Account was suspended",
+        )
+        .select_related("access__role")
+        .order_by()
+    )
+    for req in requests:
+        req.state = RequestState.PENDING
+        req.user_reason = ""
+    Request.objects.bulk_update(requests, ["state", "user_reason"])
+    bump_service_requests_versions(requests)
+    # Most saves of an active user have nothing to reactivate
+    if requests:
+        DashboardSnapshot.objects.refresh({req.access.role_id for req in requests})
+    if reinstated or created:
+        DashboardSnapshot.objects.refresh_for_grants(reinstated + created)
+    bump_service_grants_versions(reinstated + created)
+
+    # Restore access once for each user
+    for user_id, user_grants in _group_by_user(reinstated + created).items():
+        _enable_roles(users[user_id], user_grants)
+
+    notify_many(
+        "grant_created",
+        (
+            (users[grant.access.user_id], grant, _service_link(grant.access.role.service))
+            for grant in created
+            if not _is_training_account(users[grant.access.user_id])
+        ),
+    )
+
+
+def retire_service(service, retired_by):
+    """
+    Retires the given service, hiding it from all user accessible interfaces.
+
+    The service is disabled immediately, but revoking its grants and rejecting its
+    requests is left to :py:func:`process_retirement`, which is run in the background
+    by the ``services_process_retirements`` management command.
+    """
+    service.disabled = True
+    service.save()
+    retirement, _ = ServiceRetirement.objects.get_or_create(
+        service=service,
+        defaults=dict(
+            requested_by=retired_by,
+            total_grants=Grant.objects.filter_active()
+            .filter(access__role__service=service, revoked=False)
+            .count(),
+            total_requests=Request.objects.filter(
+                access__role__service=service, state=RequestState.PENDING
+            ).count(),
+        ),
+    )
+    return retirement
+
+
+def process_retirement(retirement, chunk_size=500):
+    """
+    Revokes the grants and rejects the pending requests for a retired service.
+
+    The grants and requests are processed in chunks, each of which is committed in
+    its own transaction along with the progress of the retirement, so an interrupted
+    retirement can be resumed by calling this again.
+    """
+    service = retirement.service
+    user_reason = "This service has been retired."
+    internal_reason = f"Service was retired by {retirement.requested_by}."
+    while True:
+        with transaction.atomic():
+            grants = list(
+                Grant.objects.filter_active()
+                .filter(access__role__service=service, revoked=False)
+                .annotate_active()
+                .select_related("access__user", "access__role__service__category")
+                .select_for_update(of=("self",))
+                .order_by("pk")[:chunk_size]
+            )
+            if not grants:
+                break
+            for grant in grants:
+                grant.user_reason = user_reason
+                grant.internal_reason = internal_reason
+            _revoke_grants(grants)
+            retirement.revoked_grants += len(grants)
+            retirement.save(update_fields=["revoked_grants"])
+    while True:
+        with transaction.atomic():
+            requests = list(
+                Request.objects.filter(access__role__service=service, state=RequestState.PENDING)
+                .annotate_active()
+                .select_related("access__user", "access__role__service__category")
+                .select_for_update(of=("self",))
+                .order_by("pk")[:chunk_size]
+            )
+            if not requests:
+                break
+            for req in requests:
+                req.user_reason = user_reason
+                req.internal_reason = internal_reason
+            _reject_requests(requests)
+            retirement.rejected_requests += len(requests)
+            retirement.save(update_fields=["rejected_requests"])
+    retirement.completed_at = timezone.now()
+    retirement.save(update_fields=["completed_at"])
+
+
+def _claim_recipients(message, batch_size):
+    """
+    Claims a batch of the unsent recipients of the message, so that concurrent senders
+    do not send to the same recipients.
+
+    Claims that are older than the ``MESSAGE_CLAIM_TIMEOUT`` setting are assumed to
+    belong to a sender that stopped, so those recipients can be claimed again.
+    """
+    now = timezone.now()
+    timeout = getattr(settings, "JASMIN_SERVICES", {}).get("MESSAGE_CLAIM_TIMEOUT", 3600)
+    with transaction.atomic():
+        recipients = list(
+            message.recipients.filter(sent_at__isnull=True)
+            .filter(
+                Q(claimed_at__isnull=True) | Q(claimed_at__lt=now - dt.timedelta(seconds=timeout))
+            )
+            .select_for_update(skip_locked=True)
+            .order_by("pk")[:batch_size]
+        )
+        MessageRecipient.objects.filter(pk__in=[recipient.pk for recipient in recipients]).update(
+            claimed_at=now
+        )
+    return recipients
+
+
+def _record_recipient(message, recipient):
+    # Record the outcome straight away, so that a resumed send does not repeat it
+    with transaction.atomic():
+        recipient.save(update_fields=["sent_at", "error"])
+        if recipient.failed:
+            ServiceMessage.objects.filter(pk=message.pk).update(failed=F("failed") + 1)
+        else:
+            ServiceMessage.objects.filter(pk=message.pk).update(sent=F("sent") + 1)
+
+
+def send_service_message(message, batch_size=100, rate=None):
+    """
+    Sends a queued service message to each of its recipients that has not yet been
+    processed.
+
+    All the messages are sent over a single SMTP connection. Batches of recipients are
+    claimed before they are sent to, so several senders can work on the same message,
+    and the outcome for each recipient is recorded as soon as it is known, so an
+    interrupted send can be resumed by calling this again. If a rate is given, at most
+    that many emails are sent per second. If the SMTP connection cannot be reopened
+    after an error, the send stops and the unsent recipients are released.
+    """
+    logger = logging.getLogger(__name__)
+    interval = 1 / rate if rate else 0
+    with mail.get_connection() as connection:
+        while True:
+            recipients = _claim_recipients(message, batch_size)
+            if not recipients:
+                break
+            for i, recipient in enumerate(recipients):
+                started = time.monotonic()
+                try:
+                    mail.EmailMessage(
+                        subject=message.subject,
+                        body=message.body,
+                        to=[recipient.email],
+                        reply_to=[message.reply_to] if message.reply_to else [],
+                        connection=connection,
+                    ).send()
+                except (smtplib.SMTPException, OSError) as exc:
+                    logger.exception(
+                        "Error sending message {} to {}".format(message.pk, recipient.email)
+                    )
+                    recipient.error = str(exc) or exc.__class__.__name__
+                    recipient.sent_at = timezone.now()
+                    _record_recipient(message, recipient)
+                    # The connection may have been lost, so start a new one
+                    try:
+                        connection.close()
+                        connection.open()
+                    except (smtplib.SMTPException, OSError):
+                        logger.exception(
+                            "Error reconnecting while sending message {}".format(message.pk)
+                        )
+                        # Release the rest of the batch for the next send
+                        MessageRecipient.objects.filter(
+                            pk__in=[other.pk for other in recipients[i + 1 :]]
+                        ).update(claimed_at=None)
+                        message.refresh_from_db(fields=["sent", "failed"])
+                        return
+                else:
+                    recipient.sent_at = timezone.now()
+                    _record_recipient(message, recipient)
+                # Wait so that the emails are not sent faster than the given rate
+                remaining = interval - (time.monotonic() - started)
+                if remaining > 0:
+                    time.sleep(remaining)
+    # Other senders may still be working on the recipients they claimed, in which case
+    # the last of them to finish completes the message
+    ServiceMessage.objects.filter(pk=message.pk, completed_at__isnull=True).exclude(
+        Exists(MessageRecipient.objects.filter(message=OuterRef("pk"), sent_at__isnull=True))
+    ).update(completed_at=timezone.now())
+    message.refresh_from_db(fields=["sent", "failed", "completed_at"])
+
+
+def grant_role_to_users(role, users, granted_by, expires):
+    """
+    Grants the role to each of the given users, replacing any active grants they
+    already hold for it. Returns the new grants.
+
+    The accesses and the grants they replace are found with set-based queries and
+    the grants are created in bulk. This has the same effects as saving each grant
+    individually, but the behaviours for the role are applied to all the users at once
+    and the users are notified in one batch.
+    """
+    users = {user.pk: user for user in users}
+    if not users:
+        return []
+    with transaction.atomic():
+        Access.objects.bulk_create(
+            [Access(role=role, user=user) for user in users.values()], ignore_conflicts=True
+        )
+        accesses = {
+            access.user_id: access
+            for access in Access.objects.filter(role=role, user__in=users.keys())
+        }
+        previous = {
+            grant.access_id: grant
+            for grant in Grant.objects.filter(access__in=accesses.values())
+            .filter_active()
+            .order_by()
+        }
+        created = Grant.objects.bulk_create(
+            [
+                Grant(
+                    access=access,
+                    granted_by=granted_by,
+                    expires=expires,
+                    previous_grant=previous.get(access.pk),
+                )
+                for access in accesses.values()
+            ]
+        )
+    # Use the given user and role objects rather than loading them again
+    for grant in created:
+        grant.access.user = users[grant.access.user_id]
+        grant.access.role = role
+    DashboardSnapshot.objects.refresh_for_grants(created)
+    bump_service_grants_versions(created)
+    for user_id in users:
+        bump_version(user_access(user_id))
+    logger = logging.getLogger(__name__)
+    try:
+        Role.objects.filter(pk=role.pk).enable_for_users(list(users.values()))
+    except Exception:
+        logger.exception("Error enabling {} for {} users".format(role, len(users)))
+    link = _service_link(role.service)
+    notify_many(
+        "grant_created",
+        (
+            (grant.access.user, grant, link)
+            for grant in created
+            if not _is_training_account(grant.access.user)
+        ),
+    )
+    return created
@@ -14,13 +14,14 @@ from django.core.mail import EmailMessage
 from django.db import models
 from django.shortcuts import redirect, render
 from django.template.loader import render_to_string
-from django.urls import path, re_path
+from django.urls import path, re_path, reverse
 from django.utils.safestring import mark_safe
 
 from jasmin_metadata.models import Form
 
 from .. import models as service_models
-from ..forms import admin_message_form_factory
+from ..actions import retire_service
+from ..forms import admin_message_form_factory, message_recipients
 from ..models import (
     Access,
     Category,
@@ -29,8 +30,13 @@ from ..models import (
     Role,
     RoleObjectPermission,
     Service,
+    ServiceRetirement,
+)
+from ..widgets import (
+    AdminGfkContentTypeWidget,
+    AdminGfkObjectIdWidget,
+    user_picker_response,
 )
-from ..widgets import AdminGfkContentTypeWidget, AdminGfkObjectIdWidget
 
 # Load the admin for behaviours which are turned on.
 from . import behaviour  # unimport:skip
@@ -66,8 +72,15 @@ class GroupAdmin(admin.ModelAdmin):
         ),
     )
 
-    def get_queryset(self, request):
-        return super().get_queryset(request).annotate(num_members=models.Count("member_uids"))
+    def get_changelist_instance(self, request):
+        changelist = super().get_changelist_instance(request)
+        # The member counts come from the snapshot refreshed by the sync job, since
+        # LDAP cannot count the members for us
+        member_counts = self.model.get_member_counts() or {}
+        changelist.result_list = list(changelist.result_list)
+        for group in changelist.result_list:
+            group.num_members = member_counts.get(group.name)
+        return changelist
 
     def get_fieldsets(self, request, obj=None):
         if request.user.is_superuser:
@@ -80,11 +93,12 @@ class GroupAdmin(admin.ModelAdmin):
         return ("name",) if obj else ()
 
     def num_members(self, obj):
-        return obj.num_members
+        num_members = getattr(obj, "num_members", None)
+        # Groups created since the last snapshot are counted directly
+        return len(obj.member_uids or []) if num_members is None else num_members
 
     num_members.description = "Number of members"
     num_members.short_description = "# members"
-    num_members.admin_order_field = "num_members"
 
 
 # Register the LDAP group models defined in settings using this admin
@@ -113,10 +127,14 @@ class CategoryAdmin(admin.ModelAdmin):
     list_editable = ("position",)
     search_fields = ("name", "long_name", "service__name")
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(num_services=models.Count("service"))
+
     def num_services(self, obj):
-        return obj.services.count()
+        return obj.num_services
 
     num_services.short_description = "# Services"
+    num_services.admin_order_field = "num_services"
 
 
 class RoleInline(admin.TabularInline):
@@ -240,6 +258,11 @@ class ServiceAdmin(admin.ModelAdmin):
                 self.admin_site.admin_view(self.support_message),
                 name="jasmin_services_support_message",
             ),
+            re_path(
+                r"^(?P<service>[\w-]+)/message/recipients/$",
+                self.admin_site.admin_view(self.support_message_recipients),
+                name="jasmin_services_support_message_recipients",
+            ),
             path(
                 "<service>/retire",
                 self.admin_site.admin_view(self.retire),
@@ -249,7 +272,14 @@ class ServiceAdmin(admin.ModelAdmin):
 
     def support_message(self, request, service):
         service = Service.objects.get(pk=service)
-        MessageForm = admin_message_form_factory(service)
+        MessageForm = admin_message_form_factory(
+            service,
+            reverse(
+                "admin:jasmin_services_support_message_recipients",
+                args=(service.pk,),
+                current_app=self.admin_site.name,
+            ),
+        )
         if request.method == "POST":
             form = MessageForm(request.POST)
             if form.is_valid():
@@ -263,7 +293,7 @@ class ServiceAdmin(admin.ModelAdmin):
                             "reply_to": settings.JASMIN_SUPPORT_EMAIL,
                         },
                     ),
-                    bcc=[u.email for u in form.cleaned_data["users"]],
+                    bcc=list(form.recipients().values_list("email", flat=True)),
                     from_email=settings.JASMIN_SUPPORT_EMAIL,
                     reply_to=[settings.JASMIN_SUPPORT_EMAIL],
                 ).send()
@@ -284,11 +314,21 @@ class ServiceAdmin(admin.ModelAdmin):
         request.current_app = self.admin_site.name
         return render(request, "admin/jasmin_services/service/message.html", context)
 
+    def support_message_recipients(self, request, service):
+        """
+        Returns a page of the users that a support message can be sent to as JSON.
+        """
+        service = django.shortcuts.get_object_or_404(Service, pk=service)
+        return user_picker_response(request, message_recipients(service.roles.all()))
+
     def retire(self, request, service):
         """
         Admin action to retire a service.
 
-        Retireing a service hides is from all user accessible interfaces, and
+        Retiring a service hides it from all user accessible interfaces, and revokes
+        all its grants and rejects all its pending requests. The grants and requests
+        are processed in the background by the ``services_process_retirements``
+        management command, and this page shows the progress.
         """
         service = Service.objects.get(pk=service)
         if (
@@ -296,40 +336,19 @@ class ServiceAdmin(admin.ModelAdmin):
             and request.user.is_superuser
             and int(request.POST["service_id"]) == service.id
         ):
-            # Disable the service.
-            service.disabled = True
-            service.save()
-
-            # Find a list of current grants for the service.
-            current_grants = Grant.objects.filter_active().filter(
-                access__role__service=service,
-                revoked=False,
-            )
-            # And revoke them en-masse.
-            current_grants.update(
-                revoked=True,
-                user_reason="This service has been retired.",
-                internal_reason=f"Service was retired by {request.user.username}.",
-            )
-
-            # Find a list of current requests for the tervice.
-            current_requests = Request.objects.filter(
-                access__role__service=service, state="PENDING"
-            )
-            # And reject them en-masse.
-            current_requests.update(
-                state="REJECTED",
-                user_reason="This service has been retired.",
-                internal_reason=f"Service was retired by {request.user.username}.",
+            retire_service(service, request.user.username)
+            messages.success(
+                request, "Service retired. Grants and requests will be revoked in the background."
             )
-
-            return django.shortcuts.redirect(f"/admin/jasmin_services/service/{service.id}/change")
+            return django.shortcuts.redirect("admin:jasmin_services_retire", service=service.pk)
 
         context = {
             "title": f"{service.name}: Retire",
             "opts": self.model._meta,
             "service": service,
+            "retirement": ServiceRetirement.objects.filter(service=service).first(),
         }
+        context.update(self.admin_site.each_context(request))
         return render(request, "admin/jasmin_services/service/retire.html", context)
 
 
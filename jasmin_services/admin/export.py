@@ -0,0 +1,109 @@
+"""
+Streaming CSV exports for the admin.
+
+Rows are fetched from the database in chunks with ``values_list`` and written to the
+response as they are generated, so exports of whole tables do not need to be held in
+memory.
+"""
+
+import csv
+import datetime as dt
+import itertools
+
+import django.http
+from django.contrib.contenttypes.models import ContentType
+from django.db import models
+from django.db.models.functions import Cast
+
+from jasmin_metadata.models import Metadatum
+
+#: The number of rows to fetch from the database at once
+CHUNK_SIZE = 2000
+
+
+class Echo:
+    """
+    File-like object that returns what is written to it, for use with ``csv.writer``.
+    """
+
+    def write(self, value):
+        return value
+
+
+def format_value(value):
+    """
+    Formats a value for a CSV cell.
+    """
+    # granted_at is a datetime but expires is a date
+    if isinstance(value, (dt.datetime, dt.date)):
+        return value.strftime("%d/%m/%Y")
+    # Metadata for multiple choice fields are lists
+    if isinstance(value, (list, tuple, set)):
+        return "; ".join(str(v) for v in value)
+    return value
+
+
+def streaming_csv_response(filename, header, rows):
+    """
+    Returns a response that streams the given header and rows as a CSV file.
+    """
+    writer = csv.writer(Echo())
+    response = django.http.StreamingHttpResponse(
+        (
+            writer.writerow([format_value(value) for value in row])
+            for row in itertools.chain([header], rows)
+        ),
+        content_type="text/csv",
+    )
+    response["Content-Disposition"] = f'attachment; filename="{filename}"'
+    return response
+
+
+def export_to_csv(queryset, export_fields, filename):
+    """
+    Returns a streaming CSV response for the given queryset.
+
+    ``export_fields`` maps the lookups to export to their column names.
+    """
+    rows = queryset.values_list(*export_fields.keys()).iterator(chunk_size=CHUNK_SIZE)
+    return streaming_csv_response(filename, list(export_fields.values()), rows)
+
+
+def _chunked(iterable, size):
+    iterator = iter(iterable)
+    while chunk := list(itertools.islice(iterator, size)):
+        yield chunk
+
+
+def export_with_metadata_to_csv(queryset, export_fields, filename):
+    """
+    Returns a streaming CSV response for the given queryset of a model with metadata.
+
+    As well as the columns in ``export_fields``, which must start with the primary key,
+    there is a column for each metadata key used by the objects. The metadata is fetched
+    for each chunk of rows rather than for each row.
+    """
+    content_type = ContentType.objects.get_for_model(queryset.model)
+    # The object ids of metadata are strings, so the primary keys must be cast to match
+    metadata = Metadatum.objects.filter(
+        content_type=content_type,
+        object_id__in=queryset.order_by()
+        .annotate(object_id=Cast("pk", models.CharField()))
+        .values("object_id"),
+    )
+    metadata_keys = sorted(metadata.values_list("key", flat=True).order_by().distinct())
+
+    def rows():
+        pk_rows = queryset.values_list(*export_fields.keys()).iterator(chunk_size=CHUNK_SIZE)
+        for chunk in _chunked(pk_rows, CHUNK_SIZE):
+            chunk_metadata = {}
+            for object_id, key, value in Metadatum.objects.filter(
+                content_type=content_type,
+                object_id__in=[str(row[0]) for row in chunk],
+            ).values_list("object_id", "key", "value"):
+                chunk_metadata.setdefault(object_id, {})[key] = value
+            for row in chunk:
+                row_metadata = chunk_metadata.get(str(row[0]), {})
+                yield list(row) + [row_metadata.get(key, "") for key in metadata_keys]
+
+    return streaming_csv_response(filename, list(export_fields.values()) + metadata_keys, rows())
@@ -1,24 +1,137 @@
 from datetime import date
+from urllib.parse import urlencode
 
 from django.contrib import admin
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.exceptions import ObjectDoesNotExist, ValidationError
+from django.db.models import signals
+from django.dispatch import receiver
+from django.urls import reverse
 
-from ..models import RequestState, Service
+from ..models import Category, RequestState, Service
 
 
-class ServiceFilter(admin.SimpleListFilter):
-    title = "Service"
-    parameter_name = "service_id"
+class AutocompleteListFilter(admin.SimpleListFilter):
+    """
+    Base class for list filters that select an object using a search box rather than
+    listing every possible choice in the sidebar.
+
+    ``autocomplete_field`` must be set to an ``(app_label, model_name, field_name)``
+    tuple. The options are fetched incrementally from the admin autocomplete view for
+    that field as the user types, so the admin for the related model must define
+    ``search_fields``.
+    """
+
+    template = "admin/jasmin_services/autocomplete_filter.html"
+    autocomplete_field = None
+
+    def __init__(self, request, params, model, model_admin):
+        self.admin_site = model_admin.admin_site
+        super().__init__(request, params, model, model_admin)
+
+    def has_output(self):
+        return True
 
     def lookups(self, request, model_admin):
-        # Fetch the services and the categories at once
-        services = Service.objects.all().select_related("category")
-        return tuple((s.pk, str(s)) for s in services)
+        # Only the selected value needs a label
+        value = self.value()
+        if value:
+            label = self.label_for_value(value)
+            if label is not None:
+                return ((value, label),)
+        return ()
+
+    def label_for_value(self, value):
+        """
+        Returns the label for the given value, or ``None`` if it is not valid.
+
+        By default the value itself is used as the label. Subclasses should override
+        this to show a readable label and to reject invalid values.
+        """
+        return str(value)
+
+    def choices(self, changelist):
+        app_label, model_name, field_name = self.autocomplete_field
+        yield {
+            "parameter_name": self.parameter_name,
+            "selected": self.lookup_choices[0] if self.lookup_choices else None,
+            "query_string": changelist.get_query_string(),
+            "clear_query_string": changelist.get_query_string(remove=[self.parameter_name]),
+            "autocomplete_url": "{}?{}".format(
+                reverse("admin:autocomplete", current_app=self.admin_site.name),
+                urlencode(
+                    {
+                        "app_label": app_label,
+                        "model_name": model_name,
+                        "field_name": field_name,
+                    }
+                ),
+            ),
+        }
+
+
+class ServiceFilter(AutocompleteListFilter):
+    title = "Service"
+    parameter_name = "service_id"
+    autocomplete_field = ("jasmin_services", "role", "service")
+
+    #: Cache key for the service lookups, which is cleared when a service changes
+    CACHE_KEY = "jasmin_services.admin.service_lookups"
+
+    @classmethod
+    def service_lookups(cls):
+        """
+        Returns a dictionary mapping the pk of each service to its label.
+
+        This is only used for the label of the selected service, as the options are
+        fetched from the autocomplete view.
+        """
+        lookups = cache.get(cls.CACHE_KEY)
+        if lookups is None:
+            # Fetch the services and the categories at once
+            services = Service.objects.all().select_related("category")
+            lookups = {str(s.pk): str(s) for s in services}
+            cache.set(cls.CACHE_KEY, lookups, None)
+        return lookups
+
+    def label_for_value(self, value):
+        return self.service_lookups().get(value)
 
     def queryset(self, request, queryset):
         if self.value():
             return queryset.filter(access__role__service__pk=self.value())
 
 
+@receiver(signals.post_save, sender=Category)
+@receiver(signals.post_delete, sender=Category)
+@receiver(signals.post_save, sender=Service)
+@receiver(signals.post_delete, sender=Service)
+def clear_service_lookups(sender, **kwargs):
+    """
+    Clears the cached service lookups when a service or category changes, since the
+    labels include the category.
+    """
+    cache.delete(ServiceFilter.CACHE_KEY)
+
+
+class UserFilter(AutocompleteListFilter):
+    title = "User"
+    # This is the same parameter as the related field filter this replaces
+    parameter_name = "access__user__id__exact"
+    autocomplete_field = ("jasmin_services", "access", "user")
+
+    def label_for_value(self, value):
+        try:
+            return str(get_user_model().objects.get(pk=value))
+        except (ValueError, ValidationError, ObjectDoesNotExist):
+            return None
+
+    def queryset(self, request, queryset):
+        if self.value():
+            return queryset.filter(access__user__pk=self.value())
+
+
 class ActiveListFilter(admin.SimpleListFilter):
     title = "Active"
     parameter_name = "active"
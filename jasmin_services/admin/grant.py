@@ -1,11 +1,7 @@
-import csv
-import datetime as dt
-import operator
+import secrets
 from urllib.parse import urlparse
 
-import django.db.models.fields.related
-import django.db.models.fields.reverse_related
-from django.contrib import admin
+from django.contrib import messages
 from django.contrib.contenttypes.models import ContentType
 from django.shortcuts import redirect, render
 from django.urls import Resolver404, re_path, resolve, reverse
@@ -13,10 +9,14 @@ from django.urls import Resolver404, re_path, resolve, reverse
 from jasmin_metadata.admin import HasMetadataModelAdmin
 from jasmin_metadata.models import Metadatum
 
-from ..actions import send_expiry_notifications, synchronise_service_access
+from ..actions import (
+    revoke_grants,
+    send_expiry_notifications,
+    synchronise_service_access,
+)
 from ..forms import AdminGrantForm, AdminRevokeForm
-from ..models import Grant, Request, Role
-from . import filters
+from ..models import Request, Role
+from . import export, filters
 
 
 class GrantAdmin(HasMetadataModelAdmin):
@@ -24,7 +24,7 @@ class GrantAdmin(HasMetadataModelAdmin):
     list_filter = (
         filters.ServiceFilter,
         "access__role__name",
-        ("access__user", admin.RelatedOnlyFieldListFilter),
+        filters.UserFilter,
         filters.ActiveListFilter,
         "revoked",
         filters.ExpiredListFilter,
@@ -55,11 +55,17 @@ class GrantAdmin(HasMetadataModelAdmin):
 
     change_form_template = "admin/jasmin_services/grant/change_form.html"
 
+    #: Session key under which the grants selected for bulk revocation are stored
+    BULK_REVOKE_SESSION_KEY = "jasmin_services_bulk_revoke_{}"
+
     raw_id_fields = (
         "access",
         "previous_grant",
     )
 
+    class Media:
+        js = ("admin/js/autocomplete_filter.js",)
+
     def get_form(self, request, obj=None, change=None, **kwargs):
         kwargs["form"] = AdminGrantForm
         return super().get_form(request, obj=obj, change=change, **kwargs)
@@ -87,14 +93,19 @@ class GrantAdmin(HasMetadataModelAdmin):
     def revoke_grants(self, request, queryset):
         """
         Admin action that revokes the selected grants.
+
+        The selection can cover thousands of grants, so it is stored in the session
+        behind a short token rather than being encoded into the URL.
         """
-        selected = queryset.values_list("pk", flat=True)
-        selected_ids = "_".join(str(pk) for pk in selected)
+        # Order the grants by user so that each user's grants are revoked together
+        selected = list(queryset.order_by("access__user", "pk").values_list("pk", flat=True))
+        token = secrets.token_urlsafe(8)
+        request.session[self.BULK_REVOKE_SESSION_KEY.format(token)] = selected
 
         return redirect(
             reverse(
                 "admin:jasmin_services_bulk_revoke",
-                kwargs={"ids": selected_ids},
+                kwargs={"token": token},
                 current_app=self.admin_site.name,
             )
         )
@@ -120,38 +131,19 @@ class GrantAdmin(HasMetadataModelAdmin):
 
     def export_to_csv(self, request, queryset):
         """Admin action to export the grant list to CSV."""
-        opts = self.model._meta
-        response = django.http.HttpResponse(content_type="text/plain")
-        response["Content-Disposition"] = f"filename={opts.verbose_name}.csv"
-        writer = csv.writer(response)
         # This is the dict of fields which will be exported (keys) with their shorter names (values).
         export_fields = {
             "id": "grant_id",
-            "user.username": "username",
-            "user.email": "email_address",
-            "access.role.service.category.long_name": "category",
-            "access.role.service.name": "service",
-            "access.role.name": "role",
+            "access__user__username": "username",
+            "access__user__email": "email_address",
+            "access__role__service__category__long_name": "category",
+            "access__role__service__name": "service",
+            "access__role__name": "role",
             "revoked": "revoked",
             "granted_at": "date_granted",
             "expires": "date_expires",
         }
-        # fields = [field for field in opts.get_fields() if field.name in export_fields]
-        # Write a first row with header information
-        writer.writerow(export_fields.values())
-        # Write data rows
-        for obj in queryset:
-            data_row = []
-            for field in export_fields.keys():
-                getter = operator.attrgetter(field)
-                value = getter(obj)
-                # granted_at is a datetime but expires is a date
-                if isinstance(value, (dt.datetime, dt.date)):
-                    value = value.strftime("%d/%m/%Y")
-                data_row.append(value)
-            writer.writerow(data_row)
-
-        return response
+        return export.export_to_csv(queryset, export_fields, f"{self.model._meta.verbose_name}.csv")
 
     def get_referring_request(self, request):
         """
@@ -225,24 +217,31 @@ class GrantAdmin(HasMetadataModelAdmin):
     def get_urls(self):
         return [
             re_path(
-                r"^bulk_revoke/(?P<ids>[0-9_]+)/$",
+                r"^bulk_revoke/(?P<token>[\w-]+)/$",
                 self.admin_site.admin_view(self.bulk_revoke),
                 name="jasmin_services_bulk_revoke",
             ),
         ] + super().get_urls()
 
-    def bulk_revoke(self, request, ids):
-        ids = ids.split("_")
+    def bulk_revoke(self, request, token):
+        session_key = self.BULK_REVOKE_SESSION_KEY.format(token)
+        ids = request.session.get(session_key)
+        if ids is None:
+            messages.error(request, "The selection has expired, please select the grants again.")
+            return redirect(f"{self.admin_site.name}:jasmin_services_grant_changelist")
         if request.method == "POST":
             form = AdminRevokeForm(data=request.POST)
             if form.is_valid():
-                user_reason = form.cleaned_data["user_reason"]
-                internal_reason = form.cleaned_data["internal_reason"]
-
-                Grant.objects.filter(pk__in=ids).update(
-                    revoked=True,
-                    user_reason=user_reason,
-                    internal_reason=internal_reason,
+                revoked, elapsed = revoke_grants(
+                    ids,
+                    form.cleaned_data["user_reason"],
+                    form.cleaned_data["internal_reason"],
+                )
+                del request.session[session_key]
+                messages.success(
+                    request,
+                    f"Revoked {revoked} grants in {elapsed:.1f} seconds "
+                    f"({revoked / max(elapsed, 0.001):.0f} grants per second).",
                 )
                 return redirect(f"{self.admin_site.name}:jasmin_services_grant_changelist")
         else:
@@ -250,6 +249,7 @@ class GrantAdmin(HasMetadataModelAdmin):
         context = {
             "title": "Bulk Revoke Grants",
             "form": form,
+            "n_grants": len(ids),
             "opts": self.model._meta,
             "media": self.media + form.media,
         }
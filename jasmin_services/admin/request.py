@@ -1,4 +1,3 @@
-from django.contrib import admin
 from django.contrib.admin.utils import quote
 from django.urls import reverse
 from django.utils.safestring import mark_safe
@@ -11,7 +10,7 @@ from ..models import RequestState, Role
 
 # Load the admin for behaviours which are turned on.
 from . import behaviour  # unimport:skip
-from . import filters, request
+from . import export, filters, request
 
 
 class RequestAdmin(HasMetadataModelAdmin):
@@ -28,7 +27,7 @@ class RequestAdmin(HasMetadataModelAdmin):
     list_filter = (
         filters.ServiceFilter,
         "access__role__name",
-        ("access__user", admin.RelatedOnlyFieldListFilter),
+        filters.UserFilter,
         filters.ActiveListFilter,
         filters.StateListFilter,
     )
@@ -41,7 +40,7 @@ class RequestAdmin(HasMetadataModelAdmin):
         "access__user__email",
         "access__user__last_name",
     )
-    actions = ("remind_pending",)
+    actions = ("remind_pending", "export_to_csv")
     raw_id_fields = (
         "previous_request",
         "previous_grant",
@@ -51,6 +50,9 @@ class RequestAdmin(HasMetadataModelAdmin):
         "resulting_grant",
     )
 
+    class Media:
+        js = ("admin/js/autocomplete_filter.js",)
+
     def get_form(self, request, obj=None, change=None, **kwargs):
         kwargs["form"] = AdminRequestForm
         return super().get_form(request, obj=obj, change=change, **kwargs)
@@ -68,6 +70,29 @@ class RequestAdmin(HasMetadataModelAdmin):
 
     remind_pending.short_description = "Send pending reminders"
 
+    def export_to_csv(self, request, queryset):
+        """
+        Admin action to export the request list to CSV, with a column for each
+        metadata key used by the selected requests.
+        """
+        # This is the dict of fields which will be exported (keys) with their shorter names (values).
+        export_fields = {
+            "id": "request_id",
+            "access__user__username": "username",
+            "access__user__email": "email_address",
+            "access__role__service__category__long_name": "category",
+            "access__role__service__name": "service",
+            "access__role__name": "role",
+            "state": "state",
+            "incomplete": "incomplete",
+            "requested_at": "date_requested",
+        }
+        return export.export_with_metadata_to_csv(
+            queryset, export_fields, f"{self.model._meta.verbose_name}.csv"
+        )
+
+    export_to_csv.short_description = "Export selected requests to CSV"
+
     def decide_link(self, obj):
         if obj.active and obj.state == RequestState.PENDING:
             url = reverse(
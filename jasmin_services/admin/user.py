@@ -0,0 +1,41 @@
+"""
+Admin actions for user accounts.
+
+The user model is registered with the admin outside of this app, so these actions
+are provided for the project to add to the ``actions`` of its user ``ModelAdmin``.
+"""
+
+from django.contrib import messages
+
+from .. import actions
+
+
+def suspend_accounts(modeladmin, request, queryset):
+    """
+    Admin action that suspends the selected accounts, revoking their grants and
+    rejecting their pending requests in bulk.
+    """
+    # Take the selection before updating it, since the changelist is usually filtered
+    # on the flag that the update changes
+    users = list(queryset)
+    queryset.update(is_active=False)
+    actions.suspend_accounts(users)
+    modeladmin.message_user(request, "Accounts suspended", messages.SUCCESS)
+
+
+suspend_accounts.short_description = "Suspend selected accounts"
+
+
+def reactivate_accounts(modeladmin, request, queryset):
+    """
+    Admin action that reactivates the selected accounts, re-instating the grants and
+    requests that were revoked or rejected when they were suspended.
+    """
+    # Take the selection before updating it, as for suspend_accounts
+    users = list(queryset)
+    queryset.update(is_active=True)
+    actions.reactivate_accounts(users)
+    modeladmin.message_user(request, "Accounts reactivated", messages.SUCCESS)
+
+
+reactivate_accounts.short_description = "Reactivate selected accounts"
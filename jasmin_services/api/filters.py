@@ -1,6 +1,8 @@
 import django_filters.rest_framework
+import rest_framework.filters
 
 from .. import models
+from ..search import search_services
 
 
 class RoleFilter(django_filters.rest_framework.FilterSet):
@@ -31,3 +33,17 @@ class UserGrantsFilter(django_filters.rest_framework.FilterSet):
     role = django_filters.rest_framework.AllValuesMultipleFilter(
         field_name="access__role__name", label="Role name"
     )
+
+
+class ServiceSearchFilter(rest_framework.filters.SearchFilter):
+    """Search filter that uses the full-text service search index.
+
+    The ``search_fields`` of the view are ignored, as the index covers the name,
+    summary and description of each service.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        query = " ".join(self.get_search_terms(request))
+        if not query:
+            return queryset
+        return search_services(queryset, query)
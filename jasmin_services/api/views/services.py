@@ -6,8 +6,10 @@ import django.utils.decorators
 import django.utils.timezone
 import drf_spectacular.utils
 import rest_framework.decorators as rf_decorators
+import rest_framework.filters as rf_filters
 import rest_framework.mixins as rf_mixins
 import rest_framework.response as rf_response
+import rest_framework.settings as rf_settings
 import rest_framework.viewsets as rf_viewsets
 
 from ... import models
@@ -33,7 +35,14 @@ class ServicesViewSet(rf_viewsets.ReadOnlyModelViewSet):
     }
     required_scopes = ["jasmin.services.services.all"]
     filterset_fields = ["category", "hidden", "ceda_managed"]
-    search_fields = ["name"]
+    # Searches use the full-text index, so that results are ranked and any ordering
+    # requested by the client is applied afterwards
+    filter_backends = [filters.ServiceSearchFilter] + [
+        backend
+        for backend in rf_settings.api_settings.DEFAULT_FILTER_BACKENDS
+        if not issubclass(backend, rf_filters.SearchFilter)
+    ]
+    search_fields = ["name", "summary", "description"]
 
 
 @drf_spectacular.utils.extend_schema_view(
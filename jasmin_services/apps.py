@@ -18,7 +18,7 @@ class AppConfig(BaseAppConfig):
     verbose_name = "JASMIN Services"
 
     def ready(self):
-        from . import notifications
+        from . import caching, notifications, search  # unimport:skip
 
         # Connect the post_migrate handler that registers notification types
         # to this instance
@@ -5,8 +5,9 @@ Django auth backends for the ``jasmin_services`` app.
 from datetime import date
 
 from django.contrib.contenttypes.models import ContentType
+from django.db.models import Q
 
-from .models import Grant, RoleObjectPermission
+from .models import Grant, Role, RoleObjectPermission, Service
 
 
 class RoleObjectPermissionsBackend:
@@ -30,6 +31,13 @@ class RoleObjectPermissionsBackend:
         # If no object was given, there are no role-based permissions for it
         if obj is None:
             return ()
+        return (
+            self._get_role_perm_cache(user)
+            .get(ContentType.objects.get_for_model(obj).pk, {})
+            .get(str(obj.pk), set())
+        )
+
+    def _get_role_perm_cache(self, user):
         # Load all the role-object-permissions for the user and cache them
         # This isn't much more expensive than finding one at a time...
         if not hasattr(user, "_role_perm_cache"):
@@ -52,6 +60,58 @@ class RoleObjectPermissionsBackend:
                 user._role_perm_cache.setdefault(ct_id, {}).setdefault(obj_pk, set()).add(
                     f"{perm_app}.{perm_name}"
                 )
-        return user._role_perm_cache.get(ContentType.objects.get_for_model(obj).pk, {}).get(
-            str(obj.pk), set()
+        return user._role_perm_cache
+
+    def _pks_with_perm(self, user, perm, model):
+        # Returns the pks of the objects of the model that the user has the permission for
+        perms = self._get_role_perm_cache(user).get(ContentType.objects.get_for_model(model).pk, {})
+        return {int(obj_pk) for obj_pk, obj_perms in perms.items() if perm in obj_perms}
+
+    def roles_with_perm(self, user, perm, service):
+        """
+        Returns the ids of the roles in the given service for which the user has the
+        permission, whether it is held globally, for the service or for the role.
+
+        The ids are found using a single query, and are cached on the user so that
+        the decision is only made once per request.
+        """
+        user_cache = user.__dict__.setdefault("_roles_with_perm_cache", {})
+        if (perm, service.pk) not in user_cache:
+            roles = self.filter_roles_with_perm(user, perm, Role.objects.filter(service=service))
+            user_cache[(perm, service.pk)] = set(roles.values_list("pk", flat=True))
+        return user_cache[(perm, service.pk)]
+
+    def filter_roles_with_perm(self, user, perm, roles):
+        """
+        Returns a new queryset containing the roles from the given queryset for which the
+        user has the permission, whether it is held globally, for the service or for the
+        role.
+
+        No query is made for the roles, so the result can be used as a subquery.
+        """
+        if user.has_perm(perm):
+            return roles
+        return roles.filter(
+            Q(service__in=self._pks_with_perm(user, perm, Service))
+            | Q(pk__in=self._pks_with_perm(user, perm, Role))
         )
+
+    def services_with_perm(self, user, perm):
+        """
+        Returns the ids of the services for which the user has the permission, either
+        globally, for the service or for at least one of its roles.
+
+        The ids are found using a single query, and are cached on the user so that
+        the decision is only made once per request.
+        """
+        user_cache = user.__dict__.setdefault("_services_with_perm_cache", {})
+        if perm not in user_cache:
+            if user.has_perm(perm):
+                services = Service.objects.values_list("pk", flat=True)
+            else:
+                services = Service.objects.filter(
+                    Q(pk__in=self._pks_with_perm(user, perm, Service))
+                    | Q(role__in=self._pks_with_perm(user, perm, Role))
+                ).values_list("pk", flat=True)
+            user_cache[perm] = set(services.order_by())
+        return user_cache[perm]
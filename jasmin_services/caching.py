@@ -0,0 +1,174 @@
+"""
+Helpers for caching values that are derived from the services data.
+
+Rather than deleting cached values when the data changes, cache keys include one or
+more versions that are changed whenever the underlying data changes. Stale values
+are then never read again and are left to expire.
+"""
+
+import collections
+import copy
+import threading
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import signals
+from django.dispatch import receiver
+
+from .models import Access, Category, Grant, Request, Service
+
+#: Name of the version that changes whenever a service or category changes
+SERVICES = "services"
+
+
+def user_access(user_id):
+    """
+    Returns the name of the version that changes whenever the given user gets a new
+    grant or request.
+    """
+    return f"user_access.{user_id}"
+
+
+def service_grants(service_id):
+    """
+    Returns the name of the version that changes whenever a grant for the given service
+    is created, changed or deleted.
+    """
+    return f"service_grants.{service_id}"
+
+
+def service_requests(service_id):
+    """
+    Returns the name of the version that changes whenever a request for the given service
+    is created, changed or deleted.
+    """
+    return f"service_requests.{service_id}"
+
+
+def _version_key(name):
+    return f"jasmin_services.version.{name}"
+
+
+def get_version(name):
+    """
+    Returns the current value of the named version.
+    """
+    version = cache.get(_version_key(name))
+    if version is None:
+        version = uuid.uuid4().hex
+        # If another process sets the version first, use that one
+        if not cache.add(_version_key(name), version, None):
+            version = cache.get(_version_key(name), version)
+    return version
+
+
+def bump_version(name):
+    """
+    Changes the named version, invalidating all the cached values that depend on it.
+    """
+    cache.set(_version_key(name), uuid.uuid4().hex, None)
+
+
+def bump_service_grants_versions(grants):
+    """
+    Changes the grants version for each service that the given grants are for.
+
+    This is for grants that are saved in bulk, which does not send the signals. The
+    grants should have their access and role loaded.
+    """
+    for service_id in {grant.access.role.service_id for grant in grants}:
+        bump_version(service_grants(service_id))
+
+
+def bump_service_requests_versions(requests):
+    """
+    Changes the requests version for each service that the given requests are for.
+
+    This is for requests that are saved in bulk, which does not send the signals. The
+    requests should have their access and role loaded.
+    """
+    for service_id in {req.access.role.service_id for req in requests}:
+        bump_version(service_requests(service_id))
+
+
+#: In-process LRU of services, keyed by the services version, category name and service name
+_service_routes = collections.OrderedDict()
+_service_routes_lock = threading.Lock()
+
+
+def get_service(category_name, service_name):
+    """
+    Returns the service with the given category and name, with its category loaded.
+
+    Services are kept in a small in-process LRU, so that resolving a service from a URL
+    does not query the database once a worker is warm. The entries are keyed on the
+    services version, so a change to any service or category in another process means
+    that they are loaded again. Each caller gets its own copy of the service.
+
+    Raises ``Service.DoesNotExist`` if there is no such service.
+    """
+    key = (get_version(SERVICES), category_name, service_name)
+    with _service_routes_lock:
+        service = _service_routes.get(key)
+        if service is not None:
+            _service_routes.move_to_end(key)
+    if service is None:
+        service = Service.objects.select_related("category").get(
+            category__name=category_name, name=service_name
+        )
+        size = getattr(settings, "JASMIN_SERVICES", {}).get("SERVICE_ROUTES_CACHE_SIZE", 256)
+        with _service_routes_lock:
+            _service_routes[key] = service
+            while len(_service_routes) > size:
+                _service_routes.popitem(last=False)
+    return copy.deepcopy(service)
+
+
+@receiver(signals.post_save, sender=Category)
+@receiver(signals.post_delete, sender=Category)
+@receiver(signals.post_save, sender=Service)
+@receiver(signals.post_delete, sender=Service)
+def bump_services_version(sender, **kwargs):
+    """Change the services version when a service or category changes."""
+    bump_version(SERVICES)
+    # The entries for the old version can no longer be read, so free them now
+    with _service_routes_lock:
+        _service_routes.clear()
+
+
+@receiver(signals.post_save, sender=Grant)
+@receiver(signals.post_save, sender=Request)
+@receiver(signals.post_delete, sender=Grant)
+@receiver(signals.post_delete, sender=Request)
+def bump_user_access_version(sender, instance, created=True, **kwargs):
+    """
+    Change the access version for the user when a grant or request is created or deleted.
+
+    Updating an existing grant or request does not change which services the user has
+    had access to, so the version is left alone.
+    """
+    if created:
+        bump_version(user_access(instance.access.user_id))
+
+
+def _service_id(access_id):
+    return Access.objects.filter(pk=access_id).values_list("role__service_id", flat=True).first()
+
+
+@receiver(signals.post_save, sender=Grant)
+@receiver(signals.post_delete, sender=Grant)
+def bump_service_grants_version(sender, instance, **kwargs):
+    """Change the grants version for the service when one of its grants changes."""
+    service_id = _service_id(instance.access_id)
+    if service_id is not None:
+        bump_version(service_grants(service_id))
+
+
+@receiver(signals.post_save, sender=Request)
+@receiver(signals.post_delete, sender=Request)
+def bump_service_requests_version(sender, instance, **kwargs):
+    """Change the requests version for the service when one of its requests changes."""
+    service_id = _service_id(instance.access_id)
+    if service_id is not None:
+        bump_version(service_requests(service_id))
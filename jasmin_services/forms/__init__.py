@@ -5,62 +5,101 @@ Django forms for the JASMIN services app.
 __author__ = "Matt Pryor"
 __copyright__ = "Copyright 2015 UK Science and Technology Facilities Council"
 
+import csv
+import io
 import json
 import uuid
 from datetime import date
 
-import django.contrib.auth
 import django.utils.encoding
 from django import forms
 from django.conf import settings
-from django.contrib.admin.widgets import AdminDateWidget, FilteredSelectMultiple
+from django.contrib.admin.widgets import AdminDateWidget
 from django.contrib.auth import get_user_model
 from django.core.exceptions import ValidationError
+from django.db.models import Exists, OuterRef, Q
 from django.urls import reverse
 from django.utils.safestring import mark_safe
 from markdown_deux.templatetags.markdown_deux_tags import markdown_allowed
 
 from ..models import Access, Grant, Request, Role
-from .decision_form import DecisionForm  # unimport: skip
+from ..widgets import UserPickerWidget
+from .decision_form import (  # unimport: skip
+    BulkDecisionForm,
+    BulkDecisionFormSet,
+    DecisionForm,
+)
 
 
-def message_form_factory(sender, *roles):
+def message_recipients(roles):
+    """
+    Returns a queryset of the users that have a valid, active grant for one of the roles.
+    """
+    return get_user_model().objects.filter(_holds_role(roles))
+
+
+def _holds_role(roles):
+    # Condition for a user having an active, non-revoked, non-expired grant for one of
+    # the roles, which avoids the duplicates and DISTINCT of a join
+    return Exists(
+        Grant.objects.filter(
+            access__user=OuterRef("pk"),
+            access__role__in=roles,
+            expires__gte=date.today(),
+            revoked=False,
+        ).filter_active()
+    )
+
+
+class BaseMessageForm(forms.Form):
+    """
+    Base class for forms that send a message to individual users and to all the holders
+    of roles.
+
+    The holders of the selected roles are resolved when the message is sent, so they are
+    never listed in the form.
+    """
+
+    def clean(self):
+        cleaned_data = super().clean()
+        if not cleaned_data.get("users") and not cleaned_data.get("roles"):
+            raise ValidationError("Please select at least one user or role to send to.")
+        return cleaned_data
+
+    def recipients(self):
+        """
+        Returns a queryset of the users to send the message to.
+        """
+        recipients = Q(pk__in=[user.pk for user in self.cleaned_data.get("users", [])])
+        roles = self.cleaned_data.get("roles")
+        if roles:
+            recipients |= _holds_role(roles)
+        return self.fields["users"].queryset.filter(recipients)
+
+
+def message_form_factory(sender, *roles, recipients_url):
     """
     Factory function that creates a message form for a set of roles.
 
-    The set of users is those with a valid, active grant for one of the roles.
+    The set of users is those with a valid, active grant for one of the roles. They are
+    searched for using the JSON endpoint at ``recipients_url``.
     """
-    # The possible users are those that have an active, non-revoked, non-expired
-    # grant for the USER role for the service
-    queryset = (
-        get_user_model()
-        .objects.distinct()
-        .filter(
-            access__grant__in=Grant.objects.filter(
-                access__role__in=roles, expires__gte=date.today(), revoked=False
-            ).filter_active()
-        )
-        .exclude(pk=sender.pk)
-        .distinct()
-    )
+    queryset = message_recipients(roles).exclude(pk=sender.pk)
     return type(
         uuid.uuid4().hex,
-        (forms.Form,),
+        (BaseMessageForm,),
         {
             "users": forms.ModelMultipleChoiceField(
                 queryset=queryset,
+                required=False,
                 label="Send to",
-                widget=forms.SelectMultiple(
-                    attrs={
-                        "class": "selectpicker",
-                        "data-actions-box": "true",
-                        "data-live-search": "true",
-                        "data-live-search-normalize": "true",
-                        "data-width": "100%",
-                        "data-style": "",
-                        "data-style-base": "form-control",
-                    }
-                ),
+                widget=UserPickerWidget(recipients_url),
+            ),
+            "roles": forms.ModelMultipleChoiceField(
+                queryset=Role.objects.filter(pk__in=[role.pk for role in roles]),
+                required=False,
+                label="Send to all holders of",
+                widget=forms.CheckboxSelectMultiple,
             ),
             "subject": forms.CharField(max_length=250, label="Subject"),
             "message": forms.CharField(widget=forms.Textarea, label="Message"),
@@ -99,13 +138,23 @@ def grant_form_factory(roles):
 
     return type(
         uuid.uuid4().hex,
-        (forms.Form,),
+        (BaseGrantForm,),
         {
-            "username": forms.CharField(
-                max_length=254,
-                label="Username",
-                validators=[validate_grant_username],
-                help_text="The JASMIN username of the user you wish to grant a role to.",
+            "usernames": forms.CharField(
+                label="Usernames",
+                required=False,
+                widget=forms.Textarea(attrs={"rows": 4}),
+                help_text=(
+                    "The JASMIN usernames of the users you wish to grant a role to, "
+                    "separated by commas or new lines."
+                ),
+            ),
+            "usernames_file": forms.FileField(
+                label="Usernames file",
+                required=False,
+                help_text=(
+                    "Alternatively, a CSV file with a username in the first column of " "each row."
+                ),
             ),
             "role": forms.ChoiceField(
                 choices=role_choices,
@@ -138,13 +187,50 @@ def grant_form_factory(roles):
     )
 
 
-def validate_grant_username(value):
-    # validator to check account exists for given email.
-    user_model = django.contrib.auth.get_user_model()
-    try:
-        user_model.objects.get(username=value)
-    except user_model.DoesNotExist:
-        raise ValidationError(f"user ({value}) does not exist.")
+def parse_usernames(lines):
+    """
+    Returns the unique usernames from the given lines of CSV, in the order they appear.
+
+    Each username is the first column of a row. Rows that are blank or contain a
+    ``username`` header are skipped.
+    """
+    usernames = []
+    for row in csv.reader(lines):
+        username = row[0].strip() if row else ""
+        if username and username.lower() != "username":
+            usernames.append(username)
+    return list(dict.fromkeys(usernames))
+
+
+class BaseGrantForm(forms.Form):
+    """
+    Base class for forms that grant a role to a list of users.
+
+    The users are looked up with a single query when the form is cleaned, and are
+    available as ``cleaned_data["users"]``.
+    """
+
+    def clean(self):
+        cleaned_data = super().clean()
+        text = cleaned_data.get("usernames") or ""
+        lines = text.replace(",", "\n").splitlines()
+        upload = cleaned_data.get("usernames_file")
+        if upload:
+            try:
+                lines.extend(io.TextIOWrapper(upload.file, encoding="utf-8-sig"))
+            except UnicodeDecodeError:
+                raise ValidationError({"usernames_file": "File must be UTF-8 encoded CSV."})
+        usernames = parse_usernames(lines)
+        if not usernames:
+            raise ValidationError("Please give at least one username.")
+        users = get_user_model().objects.in_bulk(usernames, field_name="username")
+        missing = [username for username in usernames if username not in users]
+        if missing:
+            raise ValidationError(
+                "The following users do not exist: {}.".format(", ".join(missing))
+            )
+        cleaned_data["users"] = list(users.values())
+        return cleaned_data
 
 
 class GrantReviewForm(forms.Form):
@@ -250,32 +336,28 @@ class AdminSwitchableLookupWidget(forms.TextInput):
         return mark_safe(output)
 
 
-def admin_message_form_factory(service):
+def admin_message_form_factory(service, recipients_url):
     """
-    Factory function that creates a message form for a set of roles.
+    Factory function that creates a message form for the roles of a service.
 
-    The set of users is those with a valid, active grant for one of the roles.
+    The set of users is those with a valid, active grant for one of the roles. They are
+    searched for using the JSON endpoint at ``recipients_url``.
     """
-    # The possible users are those that have an active, non-revoked, non-expired
-    # grant for the USER role for the service
-    queryset = (
-        get_user_model()
-        .objects.distinct()
-        .filter(
-            grant__in=Grant.objects.filter(
-                access__role__service=service, expires__gte=date.today(), revoked=False
-            ).filter_active()
-        )
-        .distinct()
-    )
     return type(
         uuid.uuid4().hex,
-        (forms.Form,),
+        (BaseMessageForm,),
         {
             "users": forms.ModelMultipleChoiceField(
-                queryset=queryset,
+                queryset=message_recipients(service.roles.all()),
+                required=False,
                 label="Send to",
-                widget=FilteredSelectMultiple("Users", is_stacked=False),
+                widget=UserPickerWidget(recipients_url),
+            ),
+            "roles": forms.ModelMultipleChoiceField(
+                queryset=service.roles.all(),
+                required=False,
+                label="Send to all holders of",
+                widget=forms.CheckboxSelectMultiple,
             ),
             "subject": forms.CharField(max_length=250, label="Subject"),
             "message": forms.CharField(widget=forms.Textarea, label="Message"),
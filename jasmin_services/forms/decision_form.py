@@ -113,28 +113,29 @@ class DecisionForm(forms.Form):
             )
         return user_reason
 
+    def expiry_date(self):
+        """Return the expiry date for the grant if the request is approved."""
+        expires = self.cleaned_data["expires"]
+        if expires == self.EXPIRES_SIX_MONTHS:
+            return dt.date.today() + dt.timedelta(days=180)
+        elif expires == self.EXPIRES_ONE_YEAR:
+            return dt.date.today() + dt.timedelta(days=365)
+        elif expires == self.EXPIRES_TWO_YEARS:
+            return dt.date.today() + dt.timedelta(days=365 * 2)
+        elif expires == self.EXPIRES_THREE_YEARS:
+            return dt.date.today() + dt.timedelta(days=365 * 3)
+        elif expires == self.EXPIRES_FIVE_YEARS:
+            return dt.date.today() + dt.timedelta(days=365 * 5)
+        elif expires == self.EXPIRES_TEN_YEARS:
+            return dt.date.today() + dt.timedelta(days=365 * 10)
+        else:
+            return self.cleaned_data["expires_custom"]
+
     def save(self):
         # Update the request from the form
         if self.cleaned_data["state"] == "APPROVED":
-            # Get the expiry date
-            expires = self.cleaned_data["expires"]
-            if expires == self.EXPIRES_SIX_MONTHS:
-                expires_date = dt.date.today() + dt.timedelta(days=180)
-            elif expires == self.EXPIRES_ONE_YEAR:
-                expires_date = dt.date.today() + dt.timedelta(days=365)
-            elif expires == self.EXPIRES_TWO_YEARS:
-                expires_date = dt.date.today() + dt.timedelta(days=365 * 2)
-            elif expires == self.EXPIRES_THREE_YEARS:
-                expires_date = dt.date.today() + dt.timedelta(days=365 * 3)
-            elif expires == self.EXPIRES_FIVE_YEARS:
-                expires_date = dt.date.today() + dt.timedelta(days=365 * 5)
-            elif expires == self.EXPIRES_TEN_YEARS:
-                expires_date = dt.date.today() + dt.timedelta(days=365 * 10)
-            else:
-                expires_date = self.cleaned_data["expires_custom"]
-
             self._request.approve(
-                expires=expires_date,
+                expires=self.expiry_date(),
                 granted_by=self._approver.username,
             )
 
@@ -150,3 +151,42 @@ class DecisionForm(forms.Form):
 
         self._request.save()
         return self._request
+
+
+class BulkDecisionForm(DecisionForm):
+    """Form for the decision on one of many requests that are decided at once.
+
+    Requests that are not given a decision are left pending.
+    """
+
+    request = forms.IntegerField(widget=forms.HiddenInput)
+
+    def __init__(self, approver, *args, **kwargs):
+        super().__init__(None, approver, *args, **kwargs)
+        # Keep the rows of the table of requests compact
+        for name in ["user_reason", "internal_reason", "internal_comment"]:
+            if name in self.fields:
+                self.fields[name].widget.attrs["rows"] = 2
+                self.fields[name].help_text = ""
+
+    def clean_state(self):
+        # Any approver may leave a request undecided
+        return self.cleaned_data.get("state")
+
+    def decision(self):
+        """Return the decision for ``actions.decide_requests``, or ``None`` if there is none."""
+        state = self.cleaned_data["state"]
+        if state is None:
+            return None
+        decision = {"state": state}
+        if state == "APPROVED":
+            decision["expires"] = self.expiry_date()
+        else:
+            decision["user_reason"] = self.cleaned_data["user_reason"]
+            decision["internal_reason"] = self.cleaned_data["internal_reason"]
+        if self._approver.is_staff and self.cleaned_data.get("internal_comment", False):
+            decision["internal_comment"] = self.cleaned_data["internal_comment"]
+        return decision
+
+
+BulkDecisionFormSet = forms.formset_factory(BulkDecisionForm, extra=0)
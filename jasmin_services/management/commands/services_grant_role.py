@@ -0,0 +1,75 @@
+"""
+Module containing a ``django-admin`` command that will grant a role to many users at
+once, e.g. when onboarding a training course or a project team.
+"""
+
+import datetime as dt
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from ...actions import grant_role_to_users
+from ...forms import parse_usernames
+from ...models import Role
+
+
+class Command(BaseCommand):
+    help = "Grants a role to the given users"
+
+    def add_arguments(self, parser):
+        parser.add_argument("category", help="Name of the category of the service")
+        parser.add_argument("service", help="Name of the service")
+        parser.add_argument("role", help="Name of the role to grant")
+        parser.add_argument("usernames", nargs="*", help="Usernames of the users to grant to")
+        parser.add_argument(
+            "--file",
+            help="A CSV file with a username in the first column of each row",
+        )
+        parser.add_argument(
+            "--expires",
+            type=dt.date.fromisoformat,
+            help="The expiry date for the grants, in the format YYYY-MM-DD",
+        )
+        parser.add_argument(
+            "--granted-by",
+            default="services_grant_role",
+            help="The username to record as having granted the role",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=500,
+            help="The number of users to grant the role to in each transaction",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            role = Role.objects.select_related("service__category").get(
+                service__category__name=options["category"],
+                service__name=options["service"],
+                name=options["role"],
+            )
+        except Role.DoesNotExist:
+            raise CommandError("Role does not exist")
+        lines = list(options["usernames"])
+        if options["file"]:
+            with open(options["file"], newline="", encoding="utf-8-sig") as f:
+                lines.extend(f)
+        usernames = parse_usernames(lines)
+        if not usernames:
+            raise CommandError("Give at least one username or a --file")
+        expires = options["expires"] or (
+            dt.date.today() + settings.JASMIN_SERVICES["DEFAULT_EXPIRY_DELTA"]
+        )
+        users = get_user_model().objects.in_bulk(usernames, field_name="username")
+        missing = [username for username in usernames if username not in users]
+        if missing:
+            self.stderr.write("Skipping users that do not exist: {}".format(", ".join(missing)))
+        users = list(users.values())
+        batch_size = options["batch_size"]
+        for start in range(0, len(users), batch_size):
+            grant_role_to_users(
+                role, users[start : start + batch_size], options["granted_by"], expires
+            )
+            self.stdout.write(f"Granted {role.name} to {min(start + batch_size, len(users))} users")
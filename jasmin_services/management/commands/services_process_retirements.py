@@ -0,0 +1,32 @@
+"""
+Module containing a ``django-admin`` command that will revoke the grants and reject the
+requests for services that have been retired.
+"""
+
+from django.core.management.base import BaseCommand
+
+from ...actions import process_retirement
+from ...models import ServiceRetirement
+
+
+class Command(BaseCommand):
+    help = "Revokes the grants and rejects the pending requests for retired services"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=500,
+            help="The number of grants or requests to process in each transaction",
+        )
+
+    def handle(self, *args, **options):
+        retirements = ServiceRetirement.objects.filter(completed_at__isnull=True).select_related(
+            "service"
+        )
+        for retirement in retirements:
+            process_retirement(retirement, chunk_size=options["chunk_size"])
+            self.stdout.write(
+                f"Retired {retirement.service}: revoked {retirement.revoked_grants} grants "
+                f"and rejected {retirement.rejected_requests} requests"
+            )
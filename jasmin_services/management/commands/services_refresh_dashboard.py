@@ -0,0 +1,16 @@
+"""
+Module containing a ``django-admin`` command that will recompute the request metrics
+displayed on the admin dashboard.
+"""
+
+from django.core.management.base import BaseCommand
+
+from ...models import DashboardSnapshot
+
+
+class Command(BaseCommand):
+    help = "Recomputes the request metrics displayed on the admin dashboard"
+
+    def handle(self, *args, **options):
+        entries = DashboardSnapshot.objects.refresh()
+        self.stdout.write(f"Dashboard snapshot contains {len(entries)} roles")
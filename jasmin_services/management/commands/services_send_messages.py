@@ -0,0 +1,57 @@
+"""
+Module containing a ``django-admin`` command that will send the queued messages to the
+users of services.
+"""
+
+import time
+
+from django import db
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from ...actions import send_service_message
+from ...models import ServiceMessage
+
+
+class Command(BaseCommand):
+    help = "Sends the queued messages to the users of services"
+
+    def add_arguments(self, parser):
+        config = getattr(settings, "JASMIN_SERVICES", {})
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=config.get("MESSAGE_BATCH_SIZE", 100),
+            help="The number of recipients to claim at a time",
+        )
+        parser.add_argument(
+            "--rate",
+            type=float,
+            default=config.get("MESSAGE_RATE"),
+            help="The maximum number of emails to send per second",
+        )
+        parser.add_argument(
+            "--poll",
+            type=float,
+            default=None,
+            help="Keep running, checking for new messages at this interval in seconds",
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            messages = ServiceMessage.objects.filter(completed_at__isnull=True).select_related(
+                "service"
+            )
+            for message in messages.order_by("created_at"):
+                send_service_message(
+                    message, batch_size=options["batch_size"], rate=options["rate"]
+                )
+                self.stdout.write(
+                    f"Sent '{message.subject}' for {message.service}: "
+                    f"{message.sent} sent, {message.failed} failed"
+                )
+            if options["poll"] is None:
+                break
+            time.sleep(options["poll"])
+            # Discard the database connection if it has expired while waiting
+            db.close_old_connections()
@@ -0,0 +1,48 @@
+"""
+Module containing a ``django-admin`` command that will suspend user accounts in bulk,
+revoking their grants and rejecting their pending requests.
+"""
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from ...actions import suspend_accounts
+
+
+class Command(BaseCommand):
+    help = (
+        "Suspends the given accounts, revoking all their active grants and rejecting "
+        "all their pending requests"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("usernames", nargs="*", help="Usernames of the accounts to suspend")
+        parser.add_argument(
+            "--pattern",
+            help="Suspend all the accounts whose username matches this regular expression, "
+            "e.g. 'train\\d{3}'",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=100,
+            help="The number of accounts to process at once",
+        )
+
+    def handle(self, *args, **options):
+        if not (options["usernames"] or options["pattern"]):
+            raise CommandError("Give at least one username or a --pattern")
+        users = get_user_model().objects.all()
+        if options["pattern"]:
+            users = users.filter(username__regex=options["pattern"])
+        if options["usernames"]:
+            users = users.filter(username__in=options["usernames"])
+        user_ids = list(users.order_by("pk").values_list("pk", flat=True))
+        # Deactivate the accounts in one query rather than saving each one, which
+        # would tear down each account's access separately
+        get_user_model().objects.filter(pk__in=user_ids).update(is_active=False)
+        batch_size = options["batch_size"]
+        for start in range(0, len(user_ids), batch_size):
+            batch = get_user_model().objects.filter(pk__in=user_ids[start : start + batch_size])
+            suspend_accounts(batch)
+            self.stdout.write(f"Suspended {min(start + batch_size, len(user_ids))} accounts")
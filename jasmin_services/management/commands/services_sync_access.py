@@ -1,6 +1,9 @@
 """
 Module containing a ``django-admin`` command that will ensure that actual service
 access is consistent with the active grants.
+
+Once access has been synchronised, the snapshot of LDAP group sizes displayed in the
+admin is also refreshed.
 """
 
 __author__ = "Matt Pryor"
@@ -8,8 +11,10 @@ __copyright__ = "Copyright 2015 UK Science and Technology Facilities Council"
 
 from datetime import date
 
+from django.conf import settings
 from django.core.management.base import BaseCommand
 
+from ... import models
 from ...actions import synchronise_service_access
 from ...models import Grant
 
@@ -20,3 +25,5 @@ class Command(BaseCommand):
     def handle(self, *args, **kwargs):
         # For the cron, we only consider grants where access should be disabled
         synchronise_service_access(Grant.objects.exclude(revoked=False, expires__gte=date.today()))
+        for grp in settings.JASMIN_SERVICES["LDAP_GROUPS"]:
+            getattr(models, grp["MODEL_NAME"]).refresh_member_counts()
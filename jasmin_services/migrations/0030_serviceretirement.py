@@ -0,0 +1,39 @@
+# Generated by Django 5.1.5 on 2026-10-18 09:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("jasmin_services", "0029_request_jasmin_serv_resulti_2f6892_idx_and_more"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ServiceRetirement",
+            fields=[
+                ("id", models.AutoField(primary_key=True, serialize=False)),
+                ("requested_by", models.CharField(max_length=200)),
+                ("requested_at", models.DateTimeField(auto_now_add=True)),
+                ("completed_at", models.DateTimeField(blank=True, null=True)),
+                ("total_grants", models.PositiveIntegerField(default=0)),
+                ("total_requests", models.PositiveIntegerField(default=0)),
+                ("revoked_grants", models.PositiveIntegerField(default=0)),
+                ("rejected_requests", models.PositiveIntegerField(default=0)),
+                (
+                    "service",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="retirement",
+                        related_query_name="retirement",
+                        to="jasmin_services.service",
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ("-requested_at",),
+            },
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.1.5 on 2026-10-18 09:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("jasmin_services", "0030_serviceretirement"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DashboardSnapshot",
+            fields=[
+                ("id", models.AutoField(primary_key=True, serialize=False)),
+                ("num_pending", models.PositiveIntegerField(default=0)),
+                ("num_pending_longtime", models.PositiveIntegerField(default=0)),
+                ("ceda_managed", models.BooleanField(default=False)),
+                ("manager_role", models.BooleanField(default=False)),
+                ("has_approver", models.BooleanField(default=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "role",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="dashboard_snapshot",
+                        related_query_name="dashboard_snapshot",
+                        to="jasmin_services.role",
+                    ),
+                ),
+            ],
+            options={
+                "ordering": (
+                    "role__service__category__position",
+                    "role__service__category__long_name",
+                    "role__service__position",
+                    "role__service__name",
+                    "role__position",
+                    "role__name",
+                ),
+            },
+        ),
+    ]
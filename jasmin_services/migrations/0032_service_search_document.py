@@ -0,0 +1,68 @@
+# Generated by Django 5.1.5 on 2026-10-18 09:00
+
+from django.db import migrations, models
+
+SEARCH_INDEX_NAME = "jasmin_serv_search_idx"
+FTS_TABLE = "jasmin_services_service_fts"
+
+
+def populate_search_document(apps, schema_editor):
+    Service = apps.get_model("jasmin_services", "Service")
+    services = list(Service.objects.using(schema_editor.connection.alias))
+    for service in services:
+        service.search_document = "\n".join(
+            filter(None, [service.name, service.summary, service.description])
+        )
+    Service.objects.using(schema_editor.connection.alias).bulk_update(
+        services, ["search_document"], batch_size=500
+    )
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == "postgresql":
+        # Imported here as the PostgreSQL modules require psycopg
+        from django.contrib.postgres.indexes import GinIndex
+        from django.contrib.postgres.search import SearchVector
+
+        schema_editor.add_index(
+            apps.get_model("jasmin_services", "Service"),
+            GinIndex(
+                SearchVector("search_document", config="english"),
+                name=SEARCH_INDEX_NAME,
+            ),
+        )
+    elif vendor == "sqlite":
+        schema_editor.execute(
+            f"CREATE VIRTUAL TABLE {FTS_TABLE} "
+            "USING fts5(service_id UNINDEXED, document, tokenize='porter unicode61')"
+        )
+        schema_editor.execute(
+            f"INSERT INTO {FTS_TABLE} (service_id, document) "
+            "SELECT id, search_document FROM jasmin_services_service"
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == "postgresql":
+        schema_editor.execute(f"DROP INDEX IF EXISTS {SEARCH_INDEX_NAME}")
+    elif vendor == "sqlite":
+        schema_editor.execute(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("jasmin_services", "0031_dashboardsnapshot"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="service",
+            name="search_document",
+            field=models.TextField(blank=True, default="", editable=False),
+        ),
+        migrations.RunPython(populate_search_document, migrations.RunPython.noop),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
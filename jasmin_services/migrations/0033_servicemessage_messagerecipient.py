@@ -0,0 +1,85 @@
+# Generated by Django 5.1.5 on 2026-10-18 09:00
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("jasmin_services", "0032_service_search_document"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ServiceMessage",
+            fields=[
+                ("id", models.AutoField(primary_key=True, serialize=False)),
+                ("subject", models.CharField(max_length=250)),
+                ("body", models.TextField()),
+                ("reply_to", models.EmailField(blank=True, max_length=254)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("completed_at", models.DateTimeField(blank=True, null=True)),
+                ("total_recipients", models.PositiveIntegerField(default=0)),
+                ("sent", models.PositiveIntegerField(default=0)),
+                ("failed", models.PositiveIntegerField(default=0)),
+                (
+                    "sender",
+                    models.ForeignKey(
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="+",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+                (
+                    "service",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="messages",
+                        related_query_name="message",
+                        to="jasmin_services.service",
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ("-created_at",),
+            },
+        ),
+        migrations.CreateModel(
+            name="MessageRecipient",
+            fields=[
+                ("id", models.AutoField(primary_key=True, serialize=False)),
+                ("email", models.EmailField(max_length=254)),
+                ("sent_at", models.DateTimeField(blank=True, null=True)),
+                ("error", models.TextField(blank=True)),
+                (
+                    "message",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="recipients",
+                        related_query_name="recipient",
+                        to="jasmin_services.servicemessage",
+                    ),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="+",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["message", "sent_at"], name="jasmin_serv_message_1578e8_idx"
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 5.1.5 on 2026-10-18 09:00
+
+from django.conf import settings
+from django.db import migrations, models
+
+UNIQUE_PENDING_NAME = "jasmin_serv_request_one_pending"
+
+
+def create_unique_pending(apps, schema_editor):
+    # Deployments that allow multiple requests per access may have several pending
+    if settings.MULTIPLE_REQUESTS_ALLOWED:
+        return
+    Request = apps.get_model("jasmin_services", "Request")
+    duplicates = list(
+        Request.objects.using(schema_editor.connection.alias)
+        .filter(state="PENDING")
+        .values("access")
+        .annotate(count=models.Count("pk"))
+        .filter(count__gt=1)
+        .values_list("access", flat=True)
+        .order_by()
+    )
+    if duplicates:
+        raise RuntimeError(
+            "Some accesses have more than one pending request, which must be decided "
+            f"before migrating: {duplicates}"
+        )
+    schema_editor.add_constraint(
+        Request,
+        models.UniqueConstraint(
+            fields=["access"],
+            condition=models.Q(state="PENDING"),
+            name=UNIQUE_PENDING_NAME,
+        ),
+    )
+
+
+def drop_unique_pending(apps, schema_editor):
+    schema_editor.execute(f"DROP INDEX IF EXISTS {UNIQUE_PENDING_NAME}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("jasmin_services", "0033_servicemessage_messagerecipient"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_unique_pending, drop_unique_pending),
+    ]
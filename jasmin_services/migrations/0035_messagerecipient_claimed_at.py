@@ -0,0 +1,18 @@
+# Generated by Django 5.1.5 on 2026-10-18 09:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("jasmin_services", "0034_request_unique_pending"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="messagerecipient",
+            name="claimed_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
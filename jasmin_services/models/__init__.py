@@ -8,18 +8,25 @@ __copyright__ = "Copyright 2015 UK Science and Technology Facilities Council"
 from .access import Access
 from .behaviours import *
 from .category import Category
+from .dashboard import DashboardSnapshot
 from .grant import Grant
+from .message import MessageRecipient, ServiceMessage
 from .request import Request, RequestState
+from .retirement import ServiceRetirement
 from .role import Role, RoleObjectPermission
 from .service import Service
 
 __all__ = [
     "Access",
     "Category",
+    "DashboardSnapshot",
     "Grant",
+    "MessageRecipient",
     "Request",
     "RequestState",
     "Role",
     "RoleObjectPermission",
     "Service",
+    "ServiceMessage",
+    "ServiceRetirement",
 ]
@@ -17,6 +17,11 @@ class Behaviour(PolymorphicModel):
         """Apply the behaviour for the given user."""
         raise NotImplementedError
 
+    def apply_many(self, users, role):
+        """Apply the behaviour for each of the given users."""
+        for user in users:
+            self.apply(user, role)
+
     def unapply(self, user, role):
         """Un-apply the behaviour for the given user."""
         raise NotImplementedError
@@ -2,6 +2,7 @@
 
 import importlib
 
+import django.core.cache
 import django.core.exceptions
 import django.core.validators
 import django.db.models
@@ -86,6 +87,30 @@ class Group(jasmin_ldap_django.models.LDAPModel):
     def __str__(self):
         return f"cn={self.name},{self.base_dn}"
 
+    @classmethod
+    def member_counts_cache_key(cls):
+        return f"jasmin_services.ldap_group_member_counts.{cls.__name__}"
+
+    @classmethod
+    def refresh_member_counts(cls):
+        """
+        Stores a snapshot of the number of members of each group in the cache.
+
+        Counting the members requires every group to be fetched from LDAP, so this
+        is done by the sync job rather than when the counts are displayed.
+        """
+        counts = {group.name: len(group.member_uids or []) for group in cls.objects.all()}
+        django.core.cache.cache.set(cls.member_counts_cache_key(), counts, None)
+        return counts
+
+    @classmethod
+    def get_member_counts(cls):
+        """
+        Returns the most recent snapshot of the number of members of each group,
+        or ``None`` if there is no snapshot.
+        """
+        return django.core.cache.cache.get(cls.member_counts_cache_key())
+
     def save(self, *args, **kwargs):
         # If there is no gidNumber, try to allocate one
         if self.gidNumber is None:
@@ -171,6 +196,14 @@ class LdapGroupBehaviour(Behaviour):
             group.member_uids.append(user.username)
             group.save()
 
+    def apply_many(self, users, _role):
+        # Add all the users to the group with a single write
+        group = self.get_ldap_group()
+        new_members = [u.username for u in users if u.username not in group.member_uids]
+        if new_members:
+            group.member_uids.extend(dict.fromkeys(new_members))
+            group.save()
+
     def unapply(self, user, _role):
         group = self.get_ldap_group()
         if user.username in group.member_uids:
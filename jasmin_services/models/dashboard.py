@@ -0,0 +1,237 @@
+import datetime as dt
+import threading
+
+import django.dispatch
+import django.utils.timezone
+from django.contrib.contenttypes.models import ContentType
+from django.db import models, transaction
+from django.db.models import Count, Exists, OuterRef, Q
+from django.db.models.functions import Cast
+
+from .grant import Grant
+from .request import Request, RequestState
+from .role import Role, RoleObjectPermission
+from .service import Service
+
+#: Requests that have been pending for longer than this are shown separately
+LONGTIME_PENDING = dt.timedelta(days=30)
+
+
+class DashboardSnapshotQuerySet(models.QuerySet):
+    def refresh(self, roles=None):
+        """
+        Recomputes the snapshot for the given role ids, or for all roles if none are given.
+
+        Only roles with pending requests have an entry in the snapshot. Entries are
+        upserted rather than replaced, so that concurrent refreshes for the same role
+        cannot conflict, and only the entries for roles that no longer have pending
+        requests are deleted.
+        """
+        queryset = Role.objects.all()
+        if roles is not None:
+            queryset = queryset.filter(pk__in=roles)
+        # A role has an approver if there is an active grant for a role that can decide
+        # requests, either for the role itself or for all the roles of its service
+        approver_grants = Grant.objects.filter(
+            Q(
+                access__role__object_permission__content_type=ContentType.objects.get_for_model(
+                    Role
+                ),
+                access__role__object_permission__object_pk=Cast(OuterRef("pk"), models.CharField()),
+            )
+            | Q(
+                access__role__object_permission__content_type=ContentType.objects.get_for_model(
+                    Service
+                ),
+                access__role__object_permission__object_pk=Cast(
+                    OuterRef("service_id"), models.CharField()
+                ),
+            ),
+            access__role__object_permission__permission__codename="decide_request",
+            access__role__object_permission__permission__content_type__app_label="jasmin_services",
+            revoked=False,
+            expires__gte=dt.date.today(),
+        ).filter_active()
+        entries = [
+            self.model(
+                role=role,
+                num_pending=role.num_pending,
+                num_pending_longtime=role.num_pending_longtime,
+                ceda_managed=role.service.ceda_managed,
+                manager_role=role.manager_role,
+                has_approver=role.has_approver,
+            )
+            for role in queryset.select_related("service")
+            .annotate(
+                num_pending=Count(
+                    "access__request",
+                    filter=Q(access__request__state=RequestState.PENDING),
+                ),
+                num_pending_longtime=Count(
+                    "access__request",
+                    filter=Q(
+                        access__request__state=RequestState.PENDING,
+                        access__request__requested_at__lt=(
+                            django.utils.timezone.now() - LONGTIME_PENDING
+                        ),
+                    ),
+                ),
+                manager_role=Exists(
+                    RoleObjectPermission.objects.filter(
+                        role=OuterRef("pk"),
+                        permission__codename="decide_request",
+                        permission__content_type__app_label="jasmin_services",
+                    )
+                ),
+                has_approver=Exists(approver_grants),
+            )
+            .filter(num_pending__gt=0)
+        ]
+        with transaction.atomic():
+            self.bulk_create(
+                entries,
+                update_conflicts=True,
+                unique_fields=["role"],
+                update_fields=[
+                    "num_pending",
+                    "num_pending_longtime",
+                    "ceda_managed",
+                    "manager_role",
+                    "has_approver",
+                    "updated_at",
+                ],
+            )
+            stale = self.all() if roles is None else self.filter(role__in=roles)
+            stale.exclude(role__in=[entry.role_id for entry in entries]).delete()
+        return entries
+
+    def refresh_for_grants(self, grants):
+        """
+        Recomputes the snapshot for the roles whose approvers may have been changed by the
+        given grants.
+        """
+        decide_request = RoleObjectPermission.objects.filter(
+            role__access__grant__in=grants,
+            permission__codename="decide_request",
+            permission__content_type__app_label="jasmin_services",
+        )
+        # The object pks of the permissions are strings, so the pks must be cast to match
+        roles = list(
+            self.annotate(
+                role_pk=Cast("role_id", models.CharField()),
+                service_pk=Cast("role__service_id", models.CharField()),
+            )
+            .filter(
+                Q(
+                    role_pk__in=decide_request.filter(
+                        content_type=ContentType.objects.get_for_model(Role)
+                    ).values("object_pk")
+                )
+                | Q(
+                    service_pk__in=decide_request.filter(
+                        content_type=ContentType.objects.get_for_model(Service)
+                    ).values("object_pk")
+                )
+            )
+            .values_list("role", flat=True)
+        )
+        if roles:
+            self.refresh(roles)
+
+
+class DashboardSnapshot(models.Model):
+    """
+    Precomputed request metrics for a role, for display on the admin dashboard.
+
+    The snapshot is recomputed for a role when a transaction that saves one of its
+    requests commits, and for the roles that a grant can approve when a transaction
+    that saves the grant commits. The
+    ``services_refresh_dashboard`` management command recomputes the whole snapshot,
+    picking up changes that do not send signals and requests that have aged.
+    """
+
+    id = models.AutoField(primary_key=True)
+
+    class Meta:
+        ordering = (
+            "role__service__category__position",
+            "role__service__category__long_name",
+            "role__service__position",
+            "role__service__name",
+            "role__position",
+            "role__name",
+        )
+
+    objects = DashboardSnapshotQuerySet.as_manager()
+
+    #: The role that the metrics are for
+    role = models.OneToOneField(
+        Role,
+        models.CASCADE,
+        related_name="dashboard_snapshot",
+        related_query_name="dashboard_snapshot",
+    )
+    #: The number of pending requests for the role
+    num_pending = models.PositiveIntegerField(default=0)
+    #: The number of requests that have been pending for a long time
+    num_pending_longtime = models.PositiveIntegerField(default=0)
+    #: Indicates if the service for the role is managed by CEDA
+    ceda_managed = models.BooleanField(default=False)
+    #: Indicates if the role allows its holders to decide requests
+    manager_role = models.BooleanField(default=False)
+    #: Indicates if anyone currently holds a role that can decide requests for the role
+    has_approver = models.BooleanField(default=True)
+    #: The datetime at which the metrics were computed
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.role} : dashboard snapshot"
+
+
+class _DirtyRoles(threading.local):
+    """
+    The roles and grants saved by this thread whose snapshot is yet to be recomputed.
+    """
+
+    def __init__(self):
+        self.roles = set()
+        self.grants = set()
+
+
+_dirty = _DirtyRoles()
+
+
+def _refresh_dirty():
+    roles, _dirty.roles = _dirty.roles, set()
+    grants, _dirty.grants = _dirty.grants, set()
+    if roles:
+        DashboardSnapshot.objects.refresh(roles)
+    if grants:
+        DashboardSnapshot.objects.refresh_for_grants(grants)
+
+
+def refresh_on_commit(roles=(), grants=()):
+    """
+    Marks the given role ids, and the roles that the given grant ids can approve, as
+    needing their snapshot recomputed once the current transaction commits.
+
+    All the roles marked during a transaction are recomputed together by the first
+    callback to run, so saving many objects in one transaction costs a single refresh.
+    Roles marked in a transaction that is rolled back are recomputed along with the
+    next commit, which is harmless.
+    """
+    _dirty.roles.update(roles)
+    _dirty.grants.update(grants)
+    transaction.on_commit(_refresh_dirty)
+
+
+@django.dispatch.receiver(django.db.models.signals.post_save, sender=Request)
+def refresh_dashboard_for_request(sender, instance, **kwargs):
+    """Recompute the dashboard snapshot for the role of a request when it is saved."""
+    refresh_on_commit(roles=[instance.access.role_id])
+
+
+@django.dispatch.receiver(django.db.models.signals.post_save, sender=Grant)
+def refresh_dashboard_for_grant(sender, instance, **kwargs):
+    """Recompute the dashboard snapshot for the roles that a grant can approve."""
+    refresh_on_commit(grants=[instance.pk])
@@ -39,6 +39,27 @@ class GrantQuerySet(models.QuerySet):
         """
         return self.filter(next_grant__isnull=True)
 
+    def role_holders(self, service, role_names):
+        """
+        Returns a dictionary mapping each of the given role names to a list of the users
+        who currently hold that role for the given service, using a single query.
+        """
+        holders = {role_name: [] for role_name in role_names}
+        grants = (
+            self.filter(
+                access__role__service=service,
+                access__role__name__in=role_names,
+                expires__gt=date.today(),
+                revoked=False,
+            )
+            .filter_active()
+            .select_related("access__user", "access__role")
+            .order_by("access__user__username", "pk")
+        )
+        for grant in grants:
+            holders[grant.access.role.name].append(grant.access.user)
+        return holders
+
     def filter_access(self, role, user):
         """
         Returns a new queryset containing the grant that determines the users
@@ -0,0 +1,103 @@
+from django.conf import settings
+from django.db import models
+
+
+class ServiceMessage(models.Model):
+    """
+    Represents an email message sent to users of a service.
+
+    Messages can have thousands of recipients, which is too slow to send within a web
+    request. So the message is queued and sent in batches by the
+    ``services_send_messages`` management command, which records its progress here and
+    the delivery to each recipient in :class:`MessageRecipient`.
+    """
+
+    id = models.AutoField(primary_key=True)
+
+    class Meta:
+        ordering = ("-created_at",)
+
+    #: The service the message is about
+    service = models.ForeignKey(
+        "Service", models.CASCADE, related_name="messages", related_query_name="message"
+    )
+    #: The user who sent the message
+    sender = models.ForeignKey(
+        settings.AUTH_USER_MODEL, models.SET_NULL, null=True, related_name="+"
+    )
+    #: The subject of the message
+    subject = models.CharField(max_length=250)
+    #: The rendered body of the message
+    body = models.TextField()
+    #: The address to use in the Reply-To header, if any
+    reply_to = models.EmailField(blank=True)
+    #: The datetime at which the message was queued
+    created_at = models.DateTimeField(auto_now_add=True)
+    #: The datetime at which all the recipients had been processed
+    completed_at = models.DateTimeField(null=True, blank=True)
+    #: The number of recipients when the message was queued
+    total_recipients = models.PositiveIntegerField(default=0)
+    #: The number of recipients the message has been sent to so far
+    sent = models.PositiveIntegerField(default=0)
+    #: The number of recipients the message could not be sent to so far
+    failed = models.PositiveIntegerField(default=0)
+
+    @property
+    def completed(self):
+        """
+        ``True`` if the message has been processed for all the recipients, ``False``
+        otherwise.
+        """
+        return self.completed_at is not None
+
+    @property
+    def progress(self):
+        """
+        The percentage of the recipients that have been processed.
+        """
+        if self.completed or not self.total_recipients:
+            return 100
+        return min(100, int(100 * (self.sent + self.failed) / self.total_recipients))
+
+    def __str__(self):
+        return f"{self.service} : {self.subject}"
+
+
+class MessageRecipient(models.Model):
+    """
+    Represents the delivery of a :class:`ServiceMessage` to a single recipient.
+    """
+
+    id = models.AutoField(primary_key=True)
+
+    class Meta:
+        indexes = [models.Index(fields=["message", "sent_at"])]
+
+    #: The message being sent
+    message = models.ForeignKey(
+        ServiceMessage,
+        models.CASCADE,
+        related_name="recipients",
+        related_query_name="recipient",
+    )
+    #: The user receiving the message
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, models.SET_NULL, null=True, related_name="+")
+    #: The email address the message is sent to
+    email = models.EmailField()
+    #: The datetime at which the message was sent, or at which sending failed
+    sent_at = models.DateTimeField(null=True, blank=True)
+    #: If sending failed, the reason for the failure
+    error = models.TextField(blank=True)
+    #: The datetime at which a sender claimed the recipient, so that concurrent senders
+    #: do not send to the same recipient
+    claimed_at = models.DateTimeField(null=True, blank=True)
+
+    @property
+    def failed(self):
+        """
+        ``True`` if the message could not be sent to the recipient, ``False`` otherwise.
+        """
+        return bool(self.error)
+
+    def __str__(self):
+        return f"{self.message} : {self.email}"
@@ -0,0 +1,57 @@
+from django.db import models
+
+
+class ServiceRetirement(models.Model):
+    """
+    Represents the retirement of a service.
+
+    Retiring a service revokes all its grants and rejects all its pending requests.
+    For large services this is too slow to do within a web request, so it is done in
+    chunks by the ``services_process_retirements`` management command, which records
+    its progress here. Because each chunk only considers the grants and requests that
+    are still outstanding, an interrupted retirement is resumed on the next run.
+    """
+
+    id = models.AutoField(primary_key=True)
+
+    class Meta:
+        ordering = ("-requested_at",)
+
+    #: The service being retired
+    service = models.OneToOneField(
+        "Service", models.CASCADE, related_name="retirement", related_query_name="retirement"
+    )
+    #: Username of the user who retired the service
+    requested_by = models.CharField(max_length=200)
+    #: The datetime at which the retirement was requested
+    requested_at = models.DateTimeField(auto_now_add=True)
+    #: The datetime at which all the grants and requests had been processed
+    completed_at = models.DateTimeField(null=True, blank=True)
+    #: The number of grants that needed to be revoked when the retirement was requested
+    total_grants = models.PositiveIntegerField(default=0)
+    #: The number of requests that needed to be rejected when the retirement was requested
+    total_requests = models.PositiveIntegerField(default=0)
+    #: The number of grants revoked so far
+    revoked_grants = models.PositiveIntegerField(default=0)
+    #: The number of requests rejected so far
+    rejected_requests = models.PositiveIntegerField(default=0)
+
+    @property
+    def completed(self):
+        """
+        ``True`` if all the grants and requests have been processed, ``False`` otherwise.
+        """
+        return self.completed_at is not None
+
+    @property
+    def progress(self):
+        """
+        The percentage of the grants and requests that have been processed.
+        """
+        total = self.total_grants + self.total_requests
+        if self.completed or not total:
+            return 100
+        return min(100, int(100 * (self.revoked_grants + self.rejected_requests) / total))
+
+    def __str__(self):
+        return f"{self.service} : retirement"
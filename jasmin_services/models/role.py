@@ -19,6 +19,36 @@ from .grant import Grant
 from .service import Service
 
 
+def _blocks_apply_q(prefix=""):
+    """
+    Return a Q object matching the accesses with a grant or request that prevents the
+    user from applying for the role again.
+
+    The prefix is the path from the model being filtered to the access.
+    """
+    return (
+        # Get any currently valid grants.
+        Q(
+            Q(**{f"{prefix}grant__revoked": False})  # Valid grants are not revoked.
+            & Q(**{f"{prefix}grant__next_grant__isnull": True})  # filter only 'active' grants
+            & Q(
+                **{
+                    f"{prefix}grant__expires__gt": (
+                        django.utils.timezone.localdate() + dt.timedelta(days=65)
+                    )
+                }
+            )  # Only include grants which don't expire in the next 60 days.
+        )
+        # And any pending requests.
+        | Q(**{f"{prefix}request__state": "PENDING"})
+        # And any rejected requests which have been marked as incomplete.
+        | Q(
+            Q(**{f"{prefix}request__incomplete": False})
+            & Q(**{f"{prefix}request__state": "PENDING"})
+        )
+    )
+
+
 class RoleQuerySet(models.QuerySet):
     """Custom queryset that allows filtering of the roles by the permissions granted."""
 
@@ -45,6 +75,128 @@ class RoleQuerySet(models.QuerySet):
             )
         )
 
+    def _user_may_not_apply_query(self, user, roles):
+        """
+        Return a query of the pks of the given roles that the user may not apply for,
+        along with a list of the pks of all the given roles.
+        """
+        role_ids = [getattr(role, "pk", role) for role in roles]
+        # The user and the grant or request conditions must be in the same filter
+        # call so that they apply to the same access
+        return (
+            self.filter(Q(access__user=user) & _blocks_apply_q("access__"))
+            .filter(pk__in=role_ids)
+            .values_list("pk", flat=True)
+            .order_by()
+            .distinct()
+        ), role_ids
+
+    def user_may_apply_map(self, user, roles):
+        """
+        Return a dictionary mapping the pk of each of the given roles (or role pks)
+        to whether the user may apply for it.
+
+        This is the same as calling :py:meth:`Role.user_may_apply` for each role,
+        but uses a single query.
+        """
+        if settings.MULTIPLE_REQUESTS_ALLOWED:
+            return {getattr(role, "pk", role): True for role in roles}
+        query, role_ids = self._user_may_not_apply_query(user, roles)
+        blocked = set(query)
+        return {role_id: role_id not in blocked for role_id in role_ids}
+
+    async def auser_may_apply_map(self, user, roles):
+        """Async implementation of user_may_apply_map."""
+        if settings.MULTIPLE_REQUESTS_ALLOWED:
+            return {getattr(role, "pk", role): True for role in roles}
+        query, role_ids = self._user_may_not_apply_query(user, roles)
+        blocked = {role_id async for role_id in query}
+        return {role_id: role_id not in blocked for role_id in role_ids}
+
+    def _behaviour_roles(self):
+        """
+        Returns a dictionary mapping the pk of each behaviour attached to the roles in
+        this queryset to a ``(behaviour, role)`` tuple, so that each behaviour appears
+        only once even if it is attached to several of the roles.
+        """
+        behaviours = {}
+        for role in self.prefetch_related("behaviours"):
+            for behaviour in role.behaviours.all():
+                behaviours.setdefault(behaviour.pk, (behaviour, role))
+        return behaviours
+
+    def enable_for(self, user):
+        """
+        Enable all the roles in this queryset for the given user.
+
+        This has the same effect as calling :py:meth:`Role.enable` for each role,
+        but each behaviour is applied at most once.
+        """
+        # During an import, disable all behaviours
+        if getattr(settings, "IS_CEDA_IMPORT", False):
+            return
+        # Only apply behaviours for migrated users
+        # If there is no MIGRATED_USERS setting, then assume all users are migrated
+        if user.username not in getattr(settings, "MIGRATED_USERS", [user.username]):
+            return
+        for behaviour, role in self._behaviour_roles().values():
+            behaviour.apply(user, role)
+
+    def enable_for_users(self, users):
+        """
+        Enable all the roles in this queryset for each of the given users.
+
+        This has the same effect as calling :py:meth:`enable_for` for each user, but the
+        behaviours are only loaded once and each one is applied to all the users at once.
+        """
+        # During an import, disable all behaviours
+        if getattr(settings, "IS_CEDA_IMPORT", False):
+            return
+        # Only apply behaviours for migrated users
+        # If there is no MIGRATED_USERS setting, then assume all users are migrated
+        migrated_users = getattr(settings, "MIGRATED_USERS", None)
+        if migrated_users is not None:
+            users = [user for user in users if user.username in migrated_users]
+        if not users:
+            return
+        for behaviour, role in self._behaviour_roles().values():
+            behaviour.apply_many(users, role)
+
+    def disable_for(self, user):
+        """
+        Disable all the roles in this queryset for the given user.
+
+        This has the same effect as calling :py:meth:`Role.disable` for each role,
+        but each behaviour is unapplied at most once and the behaviours that are
+        still required by another active grant are found in a single query.
+        """
+        # During an import, disable all behaviours
+        if getattr(settings, "IS_CEDA_IMPORT", False):
+            return
+        # Only unapply behaviours for migrated users
+        # If there is no MIGRATED_USERS setting, then assume all users are migrated
+        if user.username not in getattr(settings, "MIGRATED_USERS", [user.username]):
+            return
+        behaviours = self._behaviour_roles()
+        if not behaviours:
+            return
+        # Find the behaviours that should still be applied because of another
+        # active, unrevoked and unexpired grant for the same user
+        still_required = set(
+            Grant.objects.filter(
+                access__role__behaviours__in=behaviours.keys(),
+                access__user=user,
+                revoked=False,
+                expires__gte=date.today(),
+            )
+            .filter_active()
+            .values_list("access__role__behaviours", flat=True)
+            .order_by()
+        )
+        for pk, (behaviour, role) in behaviours.items():
+            if pk not in still_required:
+                behaviour.unapply(user, role)
+
 
 class Role(models.Model):
     """Model representing a role for a service."""
@@ -145,22 +297,8 @@ class Role(models.Model):
 
     def _user_may_apply_query(self, user):
         """Return a query of a users valid requests and grants."""
-        # Otherwise get the valid (and not expiring soon) grants and requests the user has.
-        # If they have any, they are not allowed to apply.
-        return self.accesses.filter(user=user).filter(
-            # Get any currently valid grants.
-            Q(
-                Q(grant__revoked=False)  # Valid grants are not revoked.
-                & Q(grant__next_grant__isnull=True)  # filter only 'active' grants
-                & Q(
-                    grant__expires__gt=(django.utils.timezone.localdate() + dt.timedelta(days=65))
-                )  # Only include grants which don't expire in the next 60 days.
-            )
-            # And any pending requests.
-            | Q(request__state="PENDING")
-            # And any rejected requests which have been marked as incomplete.
-            | Q(Q(request__incomplete=False) & Q(request__state="PENDING"))
-        )
+        # If the user has any valid grants or requests, they are not allowed to apply.
+        return self.accesses.filter(user=user).filter(_blocks_apply_q())
 
     def user_may_apply(self, user):
         """Return true if user is allowed to apply for this role."""
@@ -93,6 +93,20 @@ class Service(models.Model):
         help_text="Whether this service is disabled. Disabled services are hidden, and impossible to apply for.",
     )
 
+    #: The text that is indexed for searching, maintained when the service is saved
+    search_document = models.TextField(blank=True, default="", editable=False)
+
+    def build_search_document(self):
+        """Return the text to index for searching for this service."""
+        return "\n".join(filter(None, [self.name, self.summary, self.description]))
+
+    def save(self, *args, **kwargs):
+        self.search_document = self.build_search_document()
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and {"name", "summary", "description"} & set(update_fields):
+            kwargs["update_fields"] = set(update_fields) | {"search_document"}
+        super().save(*args, **kwargs)
+
     def get_user_active_roles(self, user):
         """Given a user, return their active roles in this service."""
         return self.roles.filter(
@@ -3,11 +3,9 @@
 __author__ = "Matt Pryor"
 __copyright__ = "Copyright 2015 UK Science and Technology Facilities Council"
 
-import datetime as dt
 import logging
 import os
 import re
-from datetime import date
 
 import httpx
 from django.conf import settings
@@ -20,9 +18,10 @@ from jasmin_notifications.models import (
     Notification,
     NotificationLevel,
     NotificationType,
+    UserNotification,
 )
 
-from .models import Access, Grant, Request, RequestState
+from .models import Grant, Request, RequestState
 
 _log = logging.getLogger(__name__)
 
@@ -72,6 +71,33 @@ def register_notifications(app_config, verbosity=2, interactive=True, **kwargs):
     )
 
 
+def notify_many(notification_type, notifications, if_not_exists=False):
+    """
+    Sends a notification of the given type for each ``(user, target, link)`` tuple.
+
+    If ``if_not_exists`` is given, targets that the user has already been notified
+    about are skipped, in the same way as ``user.notify_if_not_exists``. The existing
+    notifications are found with one query for the whole batch rather than one per target.
+    """
+    notifications = list(notifications)
+    if if_not_exists and notifications:
+        existing = {
+            (user_id, str(target_id))
+            for user_id, target_id in UserNotification.objects.filter(
+                notification_type__name=notification_type,
+                user__in={user.pk for user, _, _ in notifications},
+                target_id__in={target.pk for _, target, _ in notifications},
+            ).values_list("user_id", "target_id")
+        }
+        notifications = [
+            (user, target, link)
+            for user, target, link in notifications
+            if (user.pk, str(target.pk)) not in existing
+        ]
+    for user, target, link in notifications:
+        user.notify(notification_type, target, link)
+
+
 @receiver(signals.post_save, sender=Request)
 def confirm_request(sender, instance, created, **kwargs):
     """Notifies the user that their request was received."""
@@ -212,24 +238,10 @@ def account_suspended(sender, instance, created, **kwargs):
     the pending requests for that user.
     """
     if not instance.is_active:
-        for grant in Grant.objects.filter(
-            access__user=instance,
-            revoked=False,
-            expires__gt=dt.date.today(),
-        ).filter_active():
-            grant.revoked = True
-            if re.match(r"train\d{3}", instance.username):
-                grant.user_reason = "Training account was torn down"
-            else:
-                grant.user_reason = "Account was suspended"
-            grant.save()
-        for req in Request.objects.filter(access__user=instance, state=RequestState.PENDING):
-            req.state = RequestState.REJECTED
-            if re.match(r"train\d{3}", instance.username):
-                req.user_reason = "Training account was torn down"
-            else:
-                req.user_reason = "Account was suspended"
-            req.save()
+        # Imported here as the actions module depends on this one
+        from .actions import suspend_accounts
+
+        suspend_accounts([instance])
 
 
 @receiver(signals.post_save, sender=get_user_model())
@@ -239,34 +251,7 @@ def account_reactivated(sender, instance, created, **kwargs):
     the pending requests for that user.
     """
     if instance.is_active:
-        for grant in Grant.objects.filter(
-            access__user=instance,
-            revoked=True,
-            user_reason="Account was suspended",
-            access__role__service__disabled=False,
-        ).filter_active():
-            # Re-instate revoked grants if not expired, or create new grant with one
-            # month till expiry if expired within the last two years.
-            if grant.expires > date.today():
-                grant.user_reason = ""
-                grant.revoked = False
-                grant.save()
-            elif grant.expires >= date.today() - dt.timedelta(days=730):
-                access, _ = Access.objects.get_or_create(
-                    user=instance,
-                    role=grant.access.role,
-                )
-                Grant.objects.create(
-                    access=access,
-                    granted_by=grant.granted_by,
-                    expires=date.today() + dt.timedelta(days=30),
-                    previous_grant=grant,
-                )
-        for req in Request.objects.filter(
-            access__user=instance,
-            state=RequestState.REJECTED,
-            user_reason="Account was suspended",
-        ):
-            req.user_reason = ""
-            req.state = RequestState.PENDING
-            req.save()
+        # Imported here as the actions module depends on this one
+        from .actions import reactivate_accounts
+
+        reactivate_accounts([instance])
@@ -0,0 +1,108 @@
+"""
+Indexed full-text search for services.
+
+The text of each service is stored in ``Service.search_document`` when the service is
+saved. On PostgreSQL, this is indexed by a GIN index on its ``tsvector``. On SQLite, it
+is copied into an FTS5 table by the signal handlers in this module. Both are created
+by migration 0032. On any other database, searches fall back to matching the terms
+against ``search_document`` with ``icontains``.
+"""
+
+import re
+
+from django.db import connections
+from django.db.models import Case, F, FloatField, Value, When, signals
+from django.dispatch import receiver
+
+from .models import Service
+
+#: The text search configuration to use on PostgreSQL
+SEARCH_CONFIG = "english"
+#: The name of the SQLite FTS5 table
+FTS_TABLE = "jasmin_services_service_fts"
+
+
+def search_terms(query):
+    """Split a query into the words to search for."""
+    return re.findall(r"\w+", query)
+
+
+def search_services(queryset, query):
+    """
+    Return the services from the queryset that match the query, best match first.
+
+    Each term in the query must match the start of a word in the service's name,
+    summary or description. The services are annotated with ``search_rank``.
+    """
+    terms = search_terms(query)
+    if not terms:
+        return queryset
+    vendor = connections[queryset.db].vendor
+    if vendor == "postgresql":
+        queryset = _search_postgresql(queryset, terms)
+    elif vendor == "sqlite":
+        queryset = _search_sqlite(queryset, terms)
+    else:
+        for term in terms:
+            queryset = queryset.filter(search_document__icontains=term)
+        queryset = queryset.annotate(search_rank=Value(1.0, output_field=FloatField()))
+    return queryset.order_by("-search_rank", "name", "pk")
+
+
+def _search_postgresql(queryset, terms):
+    # Imported here as the PostgreSQL modules require psycopg
+    from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+
+    # This must match the expression used for the index in the migration
+    vector = SearchVector("search_document", config=SEARCH_CONFIG)
+    search_query = SearchQuery(
+        " & ".join(f"{term}:*" for term in terms), config=SEARCH_CONFIG, search_type="raw"
+    )
+    return (
+        queryset.annotate(search_vector=vector)
+        .filter(search_vector=search_query)
+        .annotate(search_rank=SearchRank(F("search_vector"), search_query))
+    )
+
+
+def _search_sqlite(queryset, terms):
+    # Each term is quoted so that it cannot be interpreted as FTS5 syntax
+    match = " ".join(f'"{term}"*' for term in terms)
+    with connections[queryset.db].cursor() as cursor:
+        cursor.execute(
+            f"SELECT service_id, bm25({FTS_TABLE}) FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s",
+            [match],
+        )
+        # bm25 gives better matches lower scores
+        ranks = {service_id: -score for service_id, score in cursor.fetchall()}
+    if not ranks:
+        return queryset.none().annotate(search_rank=Value(0.0, output_field=FloatField()))
+    return queryset.filter(pk__in=ranks.keys()).annotate(
+        search_rank=Case(
+            *(When(pk=pk, then=Value(rank)) for pk, rank in ranks.items()),
+            default=Value(0.0),
+            output_field=FloatField(),
+        )
+    )
+
+
+@receiver(signals.post_save, sender=Service)
+def index_service(sender, instance, using, **kwargs):
+    """Update the SQLite FTS5 table when a service is saved."""
+    connection = connections[using]
+    if connection.vendor == "sqlite":
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE service_id = %s", [instance.pk])
+            cursor.execute(
+                f"INSERT INTO {FTS_TABLE} (service_id, document) VALUES (%s, %s)",
+                [instance.pk, instance.search_document],
+            )
+
+
+@receiver(signals.post_delete, sender=Service)
+def unindex_service(sender, instance, using, **kwargs):
+    """Remove a service from the SQLite FTS5 table when it is deleted."""
+    connection = connections[using]
+    if connection.vendor == "sqlite":
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE service_id = %s", [instance.pk])
@@ -0,0 +1,47 @@
+(function() {
+    // Applies the filter for the given option by following the filter's query string
+    function applyFilter(input, option) {
+        var queryString = input.dataset.queryString;
+        var separator = queryString.length > 1 ? '&' : '';
+        window.location.search = queryString + separator +
+            encodeURIComponent(input.dataset.parameterName) + '=' +
+            encodeURIComponent(option.dataset.value);
+    }
+
+    // Replaces the options in the datalist with the results for the current term
+    function fetchOptions(input, datalist) {
+        var url = input.dataset.autocompleteUrl + '&term=' + encodeURIComponent(input.value);
+        fetch(url, { credentials: 'same-origin' })
+            .then(function(response) { return response.json(); })
+            .then(function(data) {
+                datalist.replaceChildren.apply(datalist, data.results.map(function(result) {
+                    var option = document.createElement('option');
+                    option.value = result.text;
+                    option.dataset.value = result.id;
+                    return option;
+                }));
+            });
+    }
+
+    document.addEventListener('DOMContentLoaded', function() {
+        document.querySelectorAll('input.autocomplete-filter').forEach(function(input) {
+            var datalist = document.getElementById(input.getAttribute('list'));
+            var timeout = null;
+            input.addEventListener('input', function() {
+                // If the value matches an option, the user has selected it
+                var selected = Array.from(datalist.options).find(function(option) {
+                    return option.value === input.value;
+                });
+                if( selected ) {
+                    applyFilter(input, selected);
+                    return;
+                }
+                // Otherwise, fetch new options once the user stops typing
+                if( input.dataset.autocompleteUrl && input.value.length > 1 ) {
+                    clearTimeout(timeout);
+                    timeout = setTimeout(function() { fetchOptions(input, datalist); }, 250);
+                }
+            });
+        });
+    });
+})();
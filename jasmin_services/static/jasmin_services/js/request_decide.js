@@ -35,3 +35,26 @@ $('textarea').each(function() {
     // Remove the help text as it is no longer required
     $(this).siblings('.help-block').find('.help-block:not(.error-block)').remove();
 })
+
+// Load the applicant's requests and grants for other services a page at a time
+var access_history = $('#access-history');
+var load_history = function(url) {
+    $.get(url, function(html) {
+        var page = $('<div>').html(html);
+        var table = access_history.find('table');
+        access_history.find('.load-more').remove();
+        if( table.length ) {
+            // Subsequent pages are added to the existing table
+            table.children('tbody').append(page.find('tbody').children());
+            access_history.append(page.find('.load-more'));
+        } else {
+            access_history.html(page.contents());
+        }
+    });
+}
+if( access_history.length ) {
+    access_history.on('click', '.load-more', function() {
+        load_history($(this).data('url'));
+    });
+    load_history(access_history.data('url'));
+}
@@ -0,0 +1,92 @@
+(function() {
+    // Adds a removable entry for a selected option to the list of selected users
+    function addSelected(select, selected, option) {
+        var item = document.createElement('span');
+        item.className = 'user-picker-selected badge bg-secondary me-1 mb-1';
+        item.textContent = option.textContent + ' ';
+        var remove = document.createElement('a');
+        remove.href = '#';
+        remove.title = 'Remove';
+        remove.innerHTML = '&times;';
+        remove.addEventListener('click', function(e) {
+            e.preventDefault();
+            option.remove();
+            item.remove();
+        });
+        item.appendChild(remove);
+        selected.appendChild(item);
+    }
+
+    // Selects the given user, unless they are already selected
+    function selectUser(select, selected, result) {
+        var exists = Array.from(select.options).some(function(option) {
+            return option.value === String(result.id);
+        });
+        if( exists ) return;
+        var option = new Option(result.text, result.id, true, true);
+        select.appendChild(option);
+        addSelected(select, selected, option);
+    }
+
+    // Fetches a page of users matching the term, appending them to the results
+    function fetchPage(picker, page) {
+        var url = picker.select.dataset.url + '?term=' + encodeURIComponent(picker.input.value) +
+            '&page=' + page;
+        fetch(url, { credentials: 'same-origin' })
+            .then(function(response) { return response.json(); })
+            .then(function(data) {
+                if( page === 1 ) picker.results.replaceChildren();
+                data.results.forEach(function(result) {
+                    var item = document.createElement('li');
+                    item.className = 'list-group-item list-group-item-action';
+                    item.style.cursor = 'pointer';
+                    item.textContent = result.text;
+                    item.addEventListener('click', function() {
+                        selectUser(picker.select, picker.selected, result);
+                    });
+                    picker.results.appendChild(item);
+                });
+                picker.page = page;
+                picker.more.style.display = data.more ? '' : 'none';
+            });
+    }
+
+    document.addEventListener('DOMContentLoaded', function() {
+        document.querySelectorAll('select.user-picker').forEach(function(select) {
+            var picker = {
+                select: select,
+                selected: document.createElement('div'),
+                input: document.createElement('input'),
+                results: document.createElement('ul'),
+                more: document.createElement('button'),
+                page: 1
+            };
+            // The select only holds the chosen users, so it is hidden
+            select.style.display = 'none';
+            picker.input.type = 'search';
+            picker.input.className = 'form-control vTextField';
+            picker.input.placeholder = 'Search for users by name, username or email';
+            picker.results.className = 'list-group mt-1';
+            picker.results.style.maxHeight = '20em';
+            picker.results.style.overflowY = 'auto';
+            picker.more.type = 'button';
+            picker.more.className = 'btn btn-link';
+            picker.more.textContent = 'Load more';
+            picker.more.style.display = 'none';
+            picker.more.addEventListener('click', function() {
+                fetchPage(picker, picker.page + 1);
+            });
+            Array.from(select.options).forEach(function(option) {
+                addSelected(select, picker.selected, option);
+            });
+            // Fetch new results once the user stops typing
+            var timeout = null;
+            picker.input.addEventListener('input', function() {
+                clearTimeout(timeout);
+                timeout = setTimeout(function() { fetchPage(picker, 1); }, 250);
+            });
+            select.after(picker.selected, picker.input, picker.results, picker.more);
+            fetchPage(picker, 1);
+        });
+    });
+})();
@@ -5,36 +5,46 @@ Custom template filters for inspecting a user's roles for a service.
 __author__ = "Matt Pryor"
 __copyright__ = "Copyright 2015 UK Science and Technology Facilities Council"
 from django import template
+from django.conf import settings
+from django.core.cache import cache
 
-from ..models import Request, RequestState
+from .. import caching
+from ..backends import RoleObjectPermissionsBackend
+from ..models import Request
 
 register = template.Library()
 
 
 @register.simple_tag
 def user_has_service_perm(service, user, perm):
-    return (
-        user.has_perm(perm)
-        or user.has_perm(perm, service)
-        or any(user.has_perm(perm, role) for role in service.roles.all())
-    )
+    return service.pk in RoleObjectPermissionsBackend().services_with_perm(user, perm)
 
 
 @register.simple_tag(takes_context=True)
 def pending_req_count(context, service):
-    # Find the role that the user in the context has permission to decide
-    permission = "jasmin_services.decide_request"
-    if context["user"].has_perm(permission) or context["user"].has_perm(permission, service):
-        user_roles = list(service.roles.all())
-    else:
-        user_roles = [
-            role for role in service.roles.all() if context["user"].has_perm(permission, role)
-        ]
-    return (
-        Request.objects.filter_active()
-        .filter(access__role__in=user_roles, state=RequestState.PENDING)
-        .count()
+    # Use the count annotated by the view if there is one
+    if hasattr(service, "pending_request_count"):
+        return service.pending_request_count
+    # Otherwise use the cached count for the roles that the user has permission to decide
+    user = context["user"]
+    cache_key = "jasmin_services.pending_req_count.{}.{}.{}.{}".format(
+        user.pk,
+        service.pk,
+        caching.get_version(caching.service_requests(service.pk)),
+        caching.get_version(caching.user_access(user.pk)),
     )
+    count = cache.get(cache_key)
+    if count is None:
+        role_ids = RoleObjectPermissionsBackend().roles_with_perm(
+            user, "jasmin_services.decide_request", service
+        )
+        count = Request.objects.pending_counts(role_ids).get(service.pk, 0)
+        cache.set(
+            cache_key,
+            count,
+            getattr(settings, "JASMIN_SERVICES", {}).get("PENDING_COUNT_CACHE_TIMEOUT", 300),
+        )
+    return count
 
 
 @register.inclusion_tag("jasmin_services/includes/display_accesses.html")
@@ -5,6 +5,7 @@ import django.contrib.auth
 import django.test
 
 import jasmin_metadata.models
+import jasmin_services.actions
 import jasmin_services.models
 
 
@@ -194,3 +195,42 @@ class AccountReactivationTest(django.test.TestCase):
 
         grant.refresh_from_db()
         self.assertTrue(grant.revoked)
+
+    def test_reactivate_many_accounts(self):
+        """
+        The bulk routine should re-instate the grants for all the given users.
+        """
+        other_user = django.contrib.auth.get_user_model().objects.create_user(
+            username="otheruser",
+            email="other@example.com",
+        )
+        other_user.notify_if_not_exists = mock.Mock()
+        other_user.notify = mock.Mock()
+        other_access = jasmin_services.models.Access.objects.create(
+            user=other_user,
+            role=self.role,
+        )
+        unexpired = jasmin_services.models.Grant.objects.create(
+            access=self.access,
+            granted_by="admin",
+            expires=dt.date.today() + dt.timedelta(days=180),
+            revoked=True,
+            user_reason="Account was suspended",
+        )
+        expired = jasmin_services.models.Grant.objects.create(
+            access=other_access,
+            granted_by="admin",
+            expires=dt.date.today() - dt.timedelta(days=365),
+            revoked=True,
+            user_reason="Account was suspended",
+        )
+        other_user.notify.reset_mock()
+
+        jasmin_services.actions.reactivate_accounts([self.user, other_user])
+
+        unexpired.refresh_from_db()
+        self.assertFalse(unexpired.revoked)
+        self.assertIsNone(unexpired.revoked_at)
+        new_grant = jasmin_services.models.Grant.objects.get(previous_grant=expired)
+        self.assertEqual(new_grant.expires, dt.date.today() + dt.timedelta(days=30))
+        other_user.notify.assert_called_once()
@@ -0,0 +1,130 @@
+import datetime as dt
+from unittest import mock
+
+import django.contrib.auth
+import django.test
+
+import jasmin_metadata.models
+import jasmin_services.actions
+import jasmin_services.models
+
+
+class AccountSuspensionTest(django.test.TestCase):
+    def setUp(self):
+        self.user = django.contrib.auth.get_user_model().objects.create_user(
+            username="testuser",
+            email="test@example.com",
+        )
+        self.user.notify_if_not_exists = mock.Mock()
+        self.user.notify = mock.Mock()
+        metadata_form = jasmin_metadata.models.Form.objects.create(name="test_form")
+        self.category = jasmin_services.models.Category.objects.create(
+            name="test_category",
+            long_name="Test Category",
+            position=1,
+        )
+        self.service = jasmin_services.models.Service.objects.create(
+            category=self.category,
+            name="test_service",
+            summary="Test service",
+            description="Test service description",
+        )
+        self.role = jasmin_services.models.Role.objects.create(
+            service=self.service,
+            name="test_role",
+            description="Test role",
+            metadata_form=metadata_form,
+        )
+        self.access = jasmin_services.models.Access.objects.create(
+            user=self.user,
+            role=self.role,
+        )
+
+    def test_suspend_revokes_grant(self):
+        """
+        Active grants should be revoked with revoked_at populated.
+        """
+        grant = jasmin_services.models.Grant.objects.create(
+            access=self.access,
+            granted_by="admin",
+            expires=dt.date.today() + dt.timedelta(days=180),
+        )
+        self.user.notify.reset_mock()
+
+        self.user.is_active = False
+        self.user.save()
+
+        grant.refresh_from_db()
+        self.assertTrue(grant.revoked)
+        self.assertIsNotNone(grant.revoked_at)
+        self.assertEqual(grant.user_reason, "Account was suspended")
+        self.user.notify.assert_called_once()
+
+    @mock.patch("jasmin_services.notifications.notify_approvers")
+    def test_suspend_rejects_request(self, _):
+        """
+        Pending requests should be rejected.
+        """
+        request = jasmin_services.models.Request.objects.create(
+            access=self.access,
+            requested_by="testuser",
+        )
+
+        self.user.is_active = False
+        self.user.save()
+
+        request.refresh_from_db()
+        self.assertEqual(request.state, jasmin_services.models.RequestState.REJECTED)
+        self.assertEqual(request.user_reason, "Account was suspended")
+
+    def test_suspend_training_account(self):
+        """
+        Training accounts should be torn down without notifying the user.
+        """
+        self.user.username = "train001"
+        grant = jasmin_services.models.Grant.objects.create(
+            access=self.access,
+            granted_by="admin",
+            expires=dt.date.today() + dt.timedelta(days=180),
+        )
+
+        self.user.is_active = False
+        self.user.save()
+
+        grant.refresh_from_db()
+        self.assertTrue(grant.revoked)
+        self.assertEqual(grant.user_reason, "Training account was torn down")
+        self.user.notify.assert_not_called()
+
+    def test_suspend_many_accounts(self):
+        """
+        The bulk routine should revoke the grants for all the given users.
+        """
+        other_user = django.contrib.auth.get_user_model().objects.create_user(
+            username="otheruser",
+            email="other@example.com",
+        )
+        other_user.notify = mock.Mock()
+        other_access = jasmin_services.models.Access.objects.create(
+            user=other_user,
+            role=self.role,
+        )
+        grants = [
+            jasmin_services.models.Grant.objects.create(
+                access=access,
+                granted_by="admin",
+                expires=dt.date.today() + dt.timedelta(days=180),
+            )
+            for access in (self.access, other_access)
+        ]
+        self.user.notify.reset_mock()
+        other_user.notify.reset_mock()
+
+        jasmin_services.actions.suspend_accounts([self.user, other_user])
+
+        for grant in grants:
+            grant.refresh_from_db()
+            self.assertTrue(grant.revoked)
+            self.assertIsNotNone(grant.revoked_at)
+        self.user.notify.assert_called_once()
+        other_user.notify.assert_called_once()
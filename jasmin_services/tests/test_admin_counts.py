@@ -0,0 +1,148 @@
+import types
+from unittest import mock
+
+import django.conf
+import django.contrib.admin
+import django.contrib.auth
+import django.core.cache
+import django.core.management
+import django.test
+
+import jasmin_metadata.admin
+import jasmin_metadata.models
+import jasmin_services.models
+from jasmin_services.admin import CategoryAdmin, GroupAdmin
+from jasmin_services.models.behaviours.ldap import Group
+
+
+class AnnotatedCountsTest(django.test.TestCase):
+    """
+    Tests that the counts in the category and form changelists come from annotations.
+    """
+
+    def setUp(self):
+        User = django.contrib.auth.get_user_model()
+        self.admin = User.objects.create_user(
+            username="admin", email="admin@example.com", is_staff=True, is_superuser=True
+        )
+        self.factory = django.test.RequestFactory()
+        for position, num_services in enumerate((2, 0, 1), start=1):
+            category = jasmin_services.models.Category.objects.create(
+                name=f"category_{num_services}",
+                long_name=f"Category {num_services}",
+                position=position,
+            )
+            for i in range(num_services):
+                jasmin_services.models.Service.objects.create(
+                    category=category, name=f"service_{num_services}_{i}"
+                )
+        for num_fields in (1, 3, 0):
+            form = jasmin_metadata.models.Form.objects.create(name=f"form_{num_fields}")
+            for i in range(num_fields):
+                jasmin_metadata.models.BooleanField.objects.create(
+                    form=form, name=f"field_{i}", label=f"Field {i}"
+                )
+
+    def changelist(self, model_admin, **params):
+        request = self.factory.get("/", params)
+        request.user = self.admin
+        return model_admin.get_changelist_instance(request)
+
+    def assertCountsAnnotated(self, model_admin, count_field):
+        changelist = self.changelist(model_admin)
+        counts = {}
+        # Reading the counts must not issue a query per row
+        with self.assertNumQueries(0):
+            for obj in changelist.result_list:
+                counts[obj.name] = getattr(model_admin, count_field)(obj)
+        column = changelist.list_display.index(count_field)
+        for order, reverse in ((str(column), False), (f"-{column}", True)):
+            with self.subTest(order=order):
+                changelist = self.changelist(model_admin, o=order)
+                self.assertEqual(
+                    [getattr(model_admin, count_field)(obj) for obj in changelist.result_list],
+                    sorted(counts.values(), reverse=reverse),
+                )
+        return counts
+
+    def test_category_num_services(self):
+        model_admin = CategoryAdmin(jasmin_services.models.Category, django.contrib.admin.site)
+        self.assertEqual(model_admin.num_services.admin_order_field, "num_services")
+        counts = self.assertCountsAnnotated(model_admin, "num_services")
+        self.assertEqual(counts, {"category_2": 2, "category_0": 0, "category_1": 1})
+
+    def test_form_n_fields(self):
+        model_admin = jasmin_metadata.admin.FormAdmin(
+            jasmin_metadata.models.Form, django.contrib.admin.site
+        )
+        self.assertEqual(model_admin.n_fields.admin_order_field, "n_fields")
+        counts = self.assertCountsAnnotated(model_admin, "n_fields")
+        self.assertEqual(counts, {"form_1": 1, "form_3": 3, "form_0": 0})
+
+
+class TestGroup:
+    """
+    Stand-in for an LDAP group model, since there is no LDAP server in the tests.
+    """
+
+    objects = mock.Mock()
+
+    member_counts_cache_key = Group.__dict__["member_counts_cache_key"]
+    refresh_member_counts = Group.__dict__["refresh_member_counts"]
+    get_member_counts = Group.__dict__["get_member_counts"]
+
+
+def group(name, num_members):
+    return types.SimpleNamespace(name=name, member_uids=[f"user{i}" for i in range(num_members)])
+
+
+@django.test.override_settings(
+    JASMIN_SERVICES={
+        **django.conf.settings.JASMIN_SERVICES,
+        "LDAP_GROUPS": [{"MODEL_NAME": "TestGroup"}],
+    }
+)
+@mock.patch("jasmin_services.models.TestGroup", TestGroup, create=True)
+class GroupMemberCountsTest(django.test.SimpleTestCase):
+    """
+    Tests that the group changelist displays member counts from the snapshot.
+    """
+
+    def setUp(self):
+        django.core.cache.cache.delete(TestGroup.member_counts_cache_key())
+        self.groups = [group("group_a", 3), group("group_b", 1)]
+        TestGroup.objects.all.return_value = self.groups
+        TestGroup.objects.all.reset_mock()
+        self.model_admin = GroupAdmin.__new__(GroupAdmin)
+        self.model_admin.model = TestGroup
+
+    def num_members(self, groups):
+        changelist = types.SimpleNamespace(result_list=iter(groups))
+        with mock.patch.object(
+            django.contrib.admin.ModelAdmin, "get_changelist_instance", return_value=changelist
+        ):
+            changelist = self.model_admin.get_changelist_instance(None)
+        return {obj.name: self.model_admin.num_members(obj) for obj in changelist.result_list}
+
+    @mock.patch(
+        "jasmin_services.management.commands.services_sync_access.synchronise_service_access"
+    )
+    def test_counts_from_snapshot(self, synchronise_service_access):
+        self.assertIsNone(TestGroup.get_member_counts())
+        django.core.management.call_command("services_sync_access")
+        synchronise_service_access.assert_called_once()
+        self.assertEqual(TestGroup.get_member_counts(), {"group_a": 3, "group_b": 1})
+        # Members added since the snapshot are not counted until the next sync, and
+        # displaying the counts does not fetch the groups
+        self.groups[0].member_uids.append("user3")
+        TestGroup.objects.all.reset_mock()
+        self.assertEqual(self.num_members(self.groups), {"group_a": 3, "group_b": 1})
+        TestGroup.objects.all.assert_not_called()
+
+    def test_counts_without_snapshot(self):
+        self.assertEqual(self.num_members(self.groups), {"group_a": 3, "group_b": 1})
+
+    def test_group_missing_from_snapshot(self):
+        TestGroup.refresh_member_counts()
+        self.groups.append(group("group_c", 2))
+        self.assertEqual(self.num_members(self.groups), {"group_a": 3, "group_b": 1, "group_c": 2})
@@ -0,0 +1,88 @@
+import datetime as dt
+
+import django.contrib.auth
+import django.test
+
+import jasmin_metadata.models
+import jasmin_services.models
+from jasmin_services.admin import export
+
+
+class AdminExportTest(django.test.TestCase):
+    def setUp(self):
+        metadata_form = jasmin_metadata.models.Form.objects.create(name="test_form")
+        category = jasmin_services.models.Category.objects.create(
+            name="test_category",
+            long_name="Test Category",
+            position=1,
+        )
+        service = jasmin_services.models.Service.objects.create(
+            category=category,
+            name="test_service",
+            summary="Test service",
+            description="Test service description",
+        )
+        role = jasmin_services.models.Role.objects.create(
+            service=service,
+            name="test_role",
+            description="Test role",
+            metadata_form=metadata_form,
+        )
+        self.grants = []
+        for i in range(3):
+            # Training accounts are not notified, which keeps the test self-contained
+            user = django.contrib.auth.get_user_model().objects.create_user(
+                username=f"train{i:03}",
+                email=f"train{i:03}@example.com",
+            )
+            access = jasmin_services.models.Access.objects.create(user=user, role=role)
+            self.grants.append(
+                jasmin_services.models.Grant.objects.create(
+                    access=access,
+                    granted_by="admin",
+                    expires=dt.date(2030, 1, 31),
+                )
+            )
+        self.export_fields = {
+            "id": "grant_id",
+            "access__user__username": "username",
+            "expires": "date_expires",
+        }
+
+    def read_response(self, response):
+        return b"".join(response.streaming_content).decode().splitlines()
+
+    def test_export_to_csv(self):
+        """
+        The export should stream a header row followed by a row for each object.
+        """
+        queryset = jasmin_services.models.Grant.objects.order_by("pk")
+        response = export.export_to_csv(queryset, self.export_fields, "grant.csv")
+
+        self.assertEqual(response["Content-Type"], "text/csv")
+        self.assertEqual(
+            self.read_response(response),
+            ["grant_id,username,date_expires"]
+            + [f"{grant.pk},train{i:03},31/01/2030" for i, grant in enumerate(self.grants)],
+        )
+
+    def test_export_with_metadata_to_csv(self):
+        """
+        The metadata of each object should be flattened into a column for each key.
+        """
+        for grant, (key, value) in zip(
+            self.grants, [("reason", "Research"), ("datasets", ["a", "b"])]
+        ):
+            grant.metadata.create(key=key, value=value)
+        queryset = jasmin_services.models.Grant.objects.order_by("pk")
+        response = export.export_with_metadata_to_csv(queryset, self.export_fields, "grant.csv")
+
+        self.assertEqual(
+            self.read_response(response),
+            [
+                "grant_id,username,date_expires,datasets,reason",
+                f"{self.grants[0].pk},train000,31/01/2030,,Research",
+                f"{self.grants[1].pk},train001,31/01/2030,a; b,",
+                f"{self.grants[2].pk},train002,31/01/2030,,",
+            ],
+        )
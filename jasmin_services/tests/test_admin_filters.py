@@ -0,0 +1,86 @@
+from urllib.parse import parse_qs, urlparse
+
+import django.contrib.admin
+import django.contrib.auth
+import django.core.cache
+import django.test
+from django.urls import path
+
+import jasmin_services.models
+from jasmin_services.admin import filters
+
+# The admin is not part of the test project urls
+urlpatterns = [path("admin/", django.contrib.admin.site.urls)]
+
+
+@django.test.override_settings(ROOT_URLCONF=__name__)
+class ServiceFilterTest(django.test.TestCase):
+    def setUp(self):
+        django.core.cache.cache.delete(filters.ServiceFilter.CACHE_KEY)
+        self.category = jasmin_services.models.Category.objects.create(
+            name="test_category",
+            long_name="Test Category",
+            position=1,
+        )
+        self.service = jasmin_services.models.Service.objects.create(
+            category=self.category,
+            name="test_service",
+            summary="Test service",
+            description="Test service description",
+        )
+
+    def test_service_lookups_are_cached(self):
+        """
+        The service lookups should only be fetched from the database once.
+        """
+        filters.ServiceFilter.service_lookups()
+        with self.assertNumQueries(0):
+            lookups = filters.ServiceFilter.service_lookups()
+        self.assertEqual(lookups, {str(self.service.pk): "Test Category : test_service"})
+
+    def test_service_lookups_are_cleared(self):
+        """
+        Changing a service or category should clear the cached service lookups.
+        """
+        filters.ServiceFilter.service_lookups()
+        self.service.name = "renamed_service"
+        self.service.save()
+        self.assertEqual(
+            filters.ServiceFilter.service_lookups(),
+            {str(self.service.pk): "Test Category : renamed_service"},
+        )
+        self.category.long_name = "Renamed Category"
+        self.category.save()
+        self.assertEqual(
+            filters.ServiceFilter.service_lookups(),
+            {str(self.service.pk): "Renamed Category : renamed_service"},
+        )
+
+    def test_service_options_fetched_incrementally(self):
+        """
+        The options should be fetched from the admin autocomplete view for the service
+        of a role, rather than being rendered with the filter.
+        """
+        admin = django.contrib.auth.get_user_model().objects.create_user(
+            username="admin", email="admin@example.com", is_staff=True, is_superuser=True
+        )
+        request = django.test.RequestFactory().get("/")
+        request.user = admin
+        model_admin = django.contrib.admin.site._registry[jasmin_services.models.Grant]
+        service_filter = filters.ServiceFilter(
+            request, {}, jasmin_services.models.Grant, model_admin
+        )
+        changelist = model_admin.get_changelist_instance(request)
+        (choice,) = service_filter.choices(changelist)
+        self.assertNotIn("options", choice)
+
+        url = urlparse(choice["autocomplete_url"])
+        self.client.force_login(admin)
+        response = self.client.get(
+            url.path, {**{k: v[0] for k, v in parse_qs(url.query).items()}, "term": "test_serv"}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response.json()["results"],
+            [{"id": str(self.service.pk), "text": "Test Category : test_service"}],
+        )
@@ -0,0 +1,139 @@
+import datetime as dt
+from unittest import mock
+
+import django.contrib.admin
+import django.contrib.auth
+import django.contrib.messages
+import django.test
+import django.urls
+from django.urls import include, path
+
+import jasmin_metadata.models
+import jasmin_services.actions
+import jasmin_services.models
+from jasmin_services.admin.grant import GrantAdmin
+from jasmin_services.models.role import RoleQuerySet
+
+# The admin is not part of the test project urls
+urlpatterns = [
+    path("admin/", django.contrib.admin.site.urls),
+    path("services/", include("jasmin_services.urls")),
+]
+
+
+@django.test.override_settings(ROOT_URLCONF=__name__)
+@mock.patch("jasmin_services.actions.notify_many")
+@mock.patch.object(RoleQuerySet, "disable_for", autospec=True)
+class BulkRevokeTest(django.test.TestCase):
+    def setUp(self):
+        User = django.contrib.auth.get_user_model()
+        category = jasmin_services.models.Category.objects.create(
+            name="test_category", long_name="Test Category", position=1
+        )
+        service = jasmin_services.models.Service.objects.create(
+            category=category, name="test_service"
+        )
+        role = jasmin_services.models.Role.objects.create(
+            service=service,
+            name="USER",
+            metadata_form=jasmin_metadata.models.Form.objects.create(name="test_form"),
+        )
+        self.active_user = User.objects.create_user(username="active", email="a@example.com")
+        self.superseded_user = User.objects.create_user(
+            username="superseded", email="s@example.com"
+        )
+        expires = dt.date.today() + dt.timedelta(days=365)
+        self.active = self.grant(self.active_user, role, expires)
+        # This grant has been replaced by a newer one, so it is no longer active
+        self.superseded = self.grant(self.superseded_user, role, expires)
+        self.grant(self.superseded_user, role, expires, previous_grant=self.superseded)
+        self.admin = User.objects.create_user(
+            username="admin", email="admin@example.com", is_staff=True, is_superuser=True
+        )
+        self.changelist_url = django.urls.reverse("admin:jasmin_services_grant_changelist")
+
+    def grant(self, user, role, expires, previous_grant=None):
+        access, _ = jasmin_services.models.Access.objects.get_or_create(user=user, role=role)
+        return jasmin_services.models.Grant.objects.create(
+            access=access, granted_by="admin", expires=expires, previous_grant=previous_grant
+        )
+
+    def select(self):
+        """Select the grants with the admin action, returning the bulk revoke url."""
+        response = self.client.post(
+            self.changelist_url,
+            {
+                "action": "revoke_grants",
+                "_selected_action": [self.active.pk, self.superseded.pk],
+            },
+        )
+        self.assertEqual(response.status_code, 302)
+        return response.url
+
+    def test_revoke_grants(self, disable_for, _):
+        """
+        Revoking should set revoked_at and only unapply behaviours for active grants.
+        """
+        revoked, elapsed = jasmin_services.actions.revoke_grants(
+            [self.active.pk, self.superseded.pk], "Reason", chunk_size=1
+        )
+
+        self.assertEqual(revoked, 2)
+        self.assertGreaterEqual(elapsed, 0)
+        for grant in [self.active, self.superseded]:
+            grant.refresh_from_db()
+            self.assertTrue(grant.revoked)
+            self.assertIsNotNone(grant.revoked_at)
+            self.assertEqual(grant.user_reason, "Reason")
+        self.assertEqual([call.args[1] for call in disable_for.call_args_list], [self.active_user])
+        # Grants that are already revoked are skipped
+        revoked, _ = jasmin_services.actions.revoke_grants([self.active.pk], "Reason")
+        self.assertEqual(revoked, 0)
+
+    def test_bulk_revoke_view(self, disable_for, _):
+        """
+        The selection should be stored behind a token, which is removed once the grants
+        have been revoked.
+        """
+        self.client.force_login(self.admin)
+        url = self.select()
+        token = django.urls.resolve(url).kwargs["token"]
+        session_key = GrantAdmin.BULK_REVOKE_SESSION_KEY.format(token)
+        self.assertCountEqual(
+            self.client.session[session_key], [self.active.pk, self.superseded.pk]
+        )
+
+        response = self.client.post(url, {"user_reason": "Reason", "internal_reason": ""})
+        self.assertRedirects(response, self.changelist_url, fetch_redirect_response=False)
+        self.assertNotIn(session_key, self.client.session)
+        self.assertEqual(
+            jasmin_services.models.Grant.objects.filter(revoked=True, revoked_at__isnull=False)
+            .order_by()
+            .count(),
+            2,
+        )
+        message = str(list(django.contrib.messages.get_messages(response.wsgi_request))[0])
+        self.assertIn("Revoked 2 grants", message)
+        self.assertIn("grants per second", message)
+
+    def test_bulk_revoke_unknown_token(self, disable_for, _):
+        """
+        An unknown or expired token should redirect back to the changelist.
+        """
+        self.client.force_login(self.admin)
+        url = self.select()
+        # Expire the selection by removing it from the session
+        session = self.client.session
+        del session[
+            GrantAdmin.BULK_REVOKE_SESSION_KEY.format(django.urls.resolve(url).kwargs["token"])
+        ]
+        session.save()
+
+        for bulk_url in [
+            url,
+            django.urls.reverse("admin:jasmin_services_bulk_revoke", kwargs={"token": "unknown"}),
+        ]:
+            response = self.client.post(bulk_url, {"user_reason": "Reason"})
+            self.assertRedirects(response, self.changelist_url, fetch_redirect_response=False)
+        self.assertFalse(jasmin_services.models.Grant.objects.filter(revoked=True).exists())
+        disable_for.assert_not_called()
@@ -0,0 +1,182 @@
+import datetime as dt
+from unittest import mock
+
+import django.contrib.auth
+import django.test
+from django.contrib.auth.models import Permission
+from django.contrib.contenttypes.models import ContentType
+
+import jasmin_metadata.models
+import jasmin_services.models
+from jasmin_services.models import dashboard
+
+
+@mock.patch("jasmin_services.notifications.notify_approvers")
+class DashboardSnapshotTest(django.test.TestCase):
+    def setUp(self):
+        # Start without any roles left marked by the callbacks of other tests, which
+        # are discarded when their transactions are rolled back
+        dirty = mock.patch.object(dashboard, "_dirty", dashboard._DirtyRoles())
+        dirty.start()
+        self.addCleanup(dirty.stop)
+        self.user = django.contrib.auth.get_user_model().objects.create_user(
+            username="testuser",
+            email="test@example.com",
+        )
+        self.user.notify = mock.Mock()
+        self.metadata_form = jasmin_metadata.models.Form.objects.create(name="test_form")
+        category = jasmin_services.models.Category.objects.create(
+            name="test_category",
+            long_name="Test Category",
+            position=1,
+        )
+        self.service = jasmin_services.models.Service.objects.create(
+            category=category,
+            name="test_service",
+            summary="Test service",
+            description="Test service description",
+        )
+        self.role = jasmin_services.models.Role.objects.create(
+            service=self.service,
+            name="USER",
+            description="Test role",
+            metadata_form=self.metadata_form,
+        )
+        self.access = jasmin_services.models.Access.objects.create(user=self.user, role=self.role)
+
+    def other_access(self, username):
+        user = django.contrib.auth.get_user_model().objects.create_user(
+            username=username,
+            email=f"{username}@example.com",
+        )
+        user.notify = mock.Mock()
+        return jasmin_services.models.Access.objects.create(user=user, role=self.role)
+
+    def test_request_updates_snapshot(self, _):
+        """
+        Saving a request should update the snapshot for its role.
+        """
+        with self.captureOnCommitCallbacks(execute=True):
+            request = jasmin_services.models.Request.objects.create(
+                access=self.access,
+                requested_by="testuser",
+            )
+
+        snapshot = jasmin_services.models.DashboardSnapshot.objects.get(role=self.role)
+        self.assertEqual(snapshot.num_pending, 1)
+        self.assertEqual(snapshot.num_pending_longtime, 0)
+        self.assertFalse(snapshot.has_approver)
+
+        request.state = jasmin_services.models.RequestState.REJECTED
+        request.user_reason = "Rejected"
+        with self.captureOnCommitCallbacks(execute=True):
+            request.save()
+
+        self.assertFalse(jasmin_services.models.DashboardSnapshot.objects.exists())
+
+    def test_grant_updates_approvers(self, _):
+        """
+        Granting a role that can decide requests should update the snapshot for the
+        roles that it can approve.
+        """
+        jasmin_services.models.Request.objects.create(
+            access=self.access,
+            requested_by="testuser",
+        )
+        manager_role = jasmin_services.models.Role.objects.create(
+            service=self.service,
+            name="MANAGER",
+            description="Manager role",
+            metadata_form=self.metadata_form,
+        )
+        jasmin_services.models.RoleObjectPermission.objects.create(
+            role=manager_role,
+            permission=Permission.objects.get(
+                codename="decide_request", content_type__app_label="jasmin_services"
+            ),
+            content_type=ContentType.objects.get_for_model(jasmin_services.models.Service),
+            object_pk=str(self.service.pk),
+        )
+        manager = django.contrib.auth.get_user_model().objects.create_user(
+            username="manager",
+            email="manager@example.com",
+        )
+        manager.notify = mock.Mock()
+        with self.captureOnCommitCallbacks(execute=True):
+            jasmin_services.models.Grant.objects.create(
+                access=jasmin_services.models.Access.objects.create(
+                    user=manager, role=manager_role
+                ),
+                granted_by="admin",
+                expires=dt.date.today() + dt.timedelta(days=180),
+            )
+
+        snapshot = jasmin_services.models.DashboardSnapshot.objects.get(role=self.role)
+        self.assertTrue(snapshot.has_approver)
+
+    def test_refresh_once_per_transaction(self, _):
+        """
+        Saving many requests in a transaction should refresh the snapshot once, when the
+        transaction commits.
+        """
+        with mock.patch.object(
+            jasmin_services.models.DashboardSnapshot.objects,
+            "refresh",
+            wraps=jasmin_services.models.DashboardSnapshot.objects.refresh,
+        ) as refresh:
+            with self.captureOnCommitCallbacks(execute=True):
+                for i in range(3):
+                    jasmin_services.models.Request.objects.create(
+                        access=self.other_access(f"user{i}"),
+                        requested_by=f"user{i}",
+                    )
+                refresh.assert_not_called()
+            refresh.assert_called_once_with({self.role.pk})
+
+        snapshot = jasmin_services.models.DashboardSnapshot.objects.get(role=self.role)
+        self.assertEqual(snapshot.num_pending, 3)
+
+    def test_refresh_upserts(self, _):
+        """
+        Refreshing should update existing entries in place and only delete the entries
+        for roles that no longer have pending requests.
+        """
+        other_role = jasmin_services.models.Role.objects.create(
+            service=self.service,
+            name="OTHER",
+            description="Other role",
+            metadata_form=self.metadata_form,
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            jasmin_services.models.Request.objects.create(
+                access=self.access,
+                requested_by="testuser",
+            )
+            other_request = jasmin_services.models.Request.objects.create(
+                access=jasmin_services.models.Access.objects.create(
+                    user=self.user, role=other_role
+                ),
+                requested_by="testuser",
+            )
+        snapshot = jasmin_services.models.DashboardSnapshot.objects.get(role=self.role)
+        # Change both roles without sending signals, so that they are only picked up by
+        # a full refresh
+        jasmin_services.models.Request.objects.bulk_create(
+            [
+                jasmin_services.models.Request(
+                    access=self.other_access("otheruser"), requested_by="otheruser"
+                )
+            ]
+        )
+        jasmin_services.models.Request.objects.filter(pk=other_request.pk).update(
+            state=jasmin_services.models.RequestState.REJECTED
+        )
+
+        jasmin_services.models.DashboardSnapshot.objects.refresh()
+
+        self.assertQuerySetEqual(
+            jasmin_services.models.DashboardSnapshot.objects.values_list(
+                "pk", "role", "num_pending"
+            ),
+            [(snapshot.pk, self.role.pk, 2)],
+        )
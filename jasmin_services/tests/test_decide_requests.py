@@ -0,0 +1,123 @@
+import datetime as dt
+import json
+from unittest import mock
+
+import django.contrib.auth
+import django.test
+import django.urls
+
+import jasmin_metadata.models
+import jasmin_services.models
+from jasmin_services.actions import decide_requests
+
+
+@mock.patch("jasmin_services.actions.notify_many")
+class DecideRequestsTest(django.test.TestCase):
+    def setUp(self):
+        # Patch in setUp rather than on the class, so that it covers the requests
+        # created here as well as in the tests
+        patcher = mock.patch("jasmin_services.notifications.notify_approvers")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        User = django.contrib.auth.get_user_model()
+        category = jasmin_services.models.Category.objects.create(
+            name="test_category", long_name="Test Category", position=1
+        )
+        self.service = jasmin_services.models.Service.objects.create(
+            category=category, name="test_service"
+        )
+        role = jasmin_services.models.Role.objects.create(
+            service=self.service,
+            name="USER",
+            metadata_form=jasmin_metadata.models.Form.objects.create(name="test_form"),
+        )
+        self.requests = []
+        for i in range(3):
+            user = User.objects.create_user(username=f"user{i}", email=f"user{i}@example.com")
+            user.notify = mock.Mock()
+            self.requests.append(
+                jasmin_services.models.Request.objects.create(
+                    access=jasmin_services.models.Access.objects.create(user=user, role=role),
+                    requested_by=user.username,
+                )
+            )
+        self.approver = User.objects.create_user(
+            username="approver", email="approver@example.com", is_superuser=True
+        )
+        self.expires = dt.date.today() + dt.timedelta(days=365)
+
+    def test_decide_requests(self, *_):
+        """
+        Each request should be approved or rejected as given, in a single call.
+        """
+        approved, rejected, incomplete = self.requests
+        decided, skipped = decide_requests(
+            {
+                approved.pk: {"state": "APPROVED", "expires": self.expires},
+                rejected.pk: {"state": "REJECTED", "user_reason": "No"},
+                incomplete.pk: {"state": "INCOMPLETE", "user_reason": "More info"},
+            },
+            self.approver,
+        )
+
+        self.assertEqual(len(decided), 3)
+        self.assertEqual(skipped, [])
+        for req in self.requests:
+            req.refresh_from_db()
+        self.assertEqual(approved.state, "APPROVED")
+        self.assertEqual(approved.resulting_grant.expires, self.expires)
+        self.assertEqual(approved.resulting_grant.granted_by, "approver")
+        self.assertEqual((rejected.state, rejected.incomplete), ("REJECTED", False))
+        self.assertEqual((incomplete.state, incomplete.incomplete), ("REJECTED", True))
+        self.assertEqual(incomplete.user_reason, "More info")
+
+    def test_decide_requests_skips(self, *_):
+        """
+        Requests that have already been decided, or that the approver may not decide,
+        should be skipped.
+        """
+        decision = {"state": "APPROVED", "expires": self.expires}
+        decide_requests({self.requests[0].pk: decision}, self.approver)
+        manager = django.contrib.auth.get_user_model().objects.create_user(
+            username="manager", email="manager@example.com"
+        )
+
+        _, skipped = decide_requests({self.requests[0].pk: decision}, self.approver)
+        self.assertEqual(skipped, [self.requests[0].pk])
+        _, skipped = decide_requests({self.requests[1].pk: decision}, manager)
+        self.assertEqual(skipped, [self.requests[1].pk])
+        self.requests[1].refresh_from_db()
+        self.assertEqual(self.requests[1].state, "PENDING")
+
+    def test_decide_requests_json(self, *_):
+        """
+        The endpoint should decide the requests in the JSON body, leaving those without a
+        decision pending.
+        """
+        self.client.force_login(self.approver)
+        url = django.urls.reverse(
+            "jasmin_services:service_requests_decide",
+            kwargs={"category": self.service.category.name, "service": self.service.name},
+        )
+        decisions = [
+            {"request": self.requests[0].pk, "state": "APPROVED", "expires": 2},
+            {"request": self.requests[1].pk, "state": None},
+            {"request": self.requests[2].pk, "state": "REJECTED"},
+        ]
+        response = self.client.post(
+            url, json.dumps({"decisions": decisions}), content_type="application/json"
+        )
+        # A rejection needs a reason for the user
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(list(response.json()["errors"]), ["2"])
+
+        decisions[2]["user_reason"] = "No"
+        response = self.client.post(
+            url, json.dumps({"decisions": decisions}), content_type="application/json"
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertCountEqual(
+            response.json()["decided"], [self.requests[0].pk, self.requests[2].pk]
+        )
+        self.requests[1].refresh_from_db()
+        self.assertEqual(self.requests[1].state, "PENDING")
@@ -0,0 +1,79 @@
+import threading
+
+import asgiref.sync
+import django.conf
+import django.db
+import django.test
+
+import jasmin_services.models
+from jasmin_services.views import common
+
+
+class GatherQueriesTest(django.test.TransactionTestCase):
+    """
+    Tests for running queries concurrently, which needs the data to be committed so that
+    the worker threads can see it.
+    """
+
+    def setUp(self):
+        # Start each test with a new pool, so that the settings are picked up
+        common.shutdown_query_executor()
+        self.addCleanup(common.shutdown_query_executor)
+        for position, name in enumerate(("first", "second"), start=1):
+            jasmin_services.models.Category.objects.create(
+                name=name, long_name=name.capitalize(), position=position
+            )
+
+    def query(self, name):
+        # Run the query first, so that the worker has connected
+        long_name = jasmin_services.models.Category.objects.get(name=name).long_name
+        return (
+            threading.current_thread().name,
+            django.db.connections["default"].connection,
+            long_name,
+        )
+
+    def gather(self, *names):
+        return asgiref.sync.async_to_sync(common.gather_queries)(
+            *(lambda name=name: self.query(name) for name in names)
+        )
+
+    def test_queries_run_in_workers(self):
+        """
+        The queries should run in the worker threads, with the results in order.
+        """
+        results = self.gather("first", "second")
+        self.assertEqual([long_name for _, _, long_name in results], ["First", "Second"])
+        for thread_name, _, _ in results:
+            self.assertTrue(thread_name.startswith("jasmin_services_query"))
+
+    @django.test.override_settings(
+        JASMIN_SERVICES={**django.conf.settings.JASMIN_SERVICES, "QUERY_CONCURRENCY": 1}
+    )
+    def test_worker_keeps_connection(self):
+        """
+        A worker should keep its connection between queries, rather than reconnecting.
+        """
+        (first,) = self.gather("first")
+        (second,) = self.gather("second")
+        self.assertEqual(first[0], second[0])
+        self.assertIsNotNone(first[1])
+        self.assertIs(first[1], second[1])
+
+    def test_shutdown(self):
+        """
+        Shutting down the pool should stop the workers, and a new pool should be started
+        for any more queries.
+        """
+        self.gather("first")
+        executor = common._get_query_executor()
+        common.shutdown_query_executor()
+        self.assertFalse(
+            any(
+                thread.name.startswith("jasmin_services_query") and thread.is_alive()
+                for thread in threading.enumerate()
+            )
+        )
+        (result,) = self.gather("second")
+        self.assertEqual(result[2], "Second")
+        self.assertIsNot(common._get_query_executor(), executor)
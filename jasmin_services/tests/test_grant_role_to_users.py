@@ -0,0 +1,69 @@
+import datetime as dt
+from unittest import mock
+
+import django.contrib.auth
+import django.test
+
+import jasmin_metadata.models
+import jasmin_services.models
+from jasmin_services.actions import grant_role_to_users
+from jasmin_services.forms import parse_usernames
+
+
+@mock.patch("jasmin_services.notifications.notify_approvers")
+class GrantRoleToUsersTest(django.test.TestCase):
+    def setUp(self):
+        category = jasmin_services.models.Category.objects.create(
+            name="test_category", long_name="Test Category", position=1
+        )
+        service = jasmin_services.models.Service.objects.create(
+            category=category, name="test_service"
+        )
+        self.role = jasmin_services.models.Role.objects.create(
+            service=service,
+            name="USER",
+            metadata_form=jasmin_metadata.models.Form.objects.create(name="test_form"),
+        )
+        self.users = []
+        for i in range(3):
+            user = django.contrib.auth.get_user_model().objects.create_user(
+                username=f"user{i}", email=f"user{i}@example.com"
+            )
+            user.notify = mock.Mock()
+            self.users.append(user)
+        self.existing = jasmin_services.models.Grant.objects.create(
+            access=jasmin_services.models.Access.objects.create(user=self.users[0], role=self.role),
+            granted_by="admin",
+            expires=dt.date.today() + dt.timedelta(days=10),
+        )
+
+    def test_grant_role_to_users(self, _):
+        """
+        Each user should get a new active grant, replacing any existing active grant.
+        """
+        expires = dt.date.today() + dt.timedelta(days=365)
+        # The existing grant has already notified its user
+        for user in self.users:
+            user.notify.reset_mock()
+        created = grant_role_to_users(self.role, self.users, "manager", expires)
+
+        self.assertEqual(len(created), 3)
+        active = jasmin_services.models.Grant.objects.filter_active().filter(access__role=self.role)
+        self.assertCountEqual(
+            active.values_list("access__user__username", "expires", "granted_by"),
+            [(user.username, expires, "manager") for user in self.users],
+        )
+        self.existing.refresh_from_db()
+        self.assertEqual(self.existing.next_grant.access.user, self.users[0])
+        grants = {grant.access.user_id: grant for grant in created}
+        for user in self.users:
+            user.notify.assert_called_once_with("grant_created", grants[user.pk], mock.ANY)
+
+    def test_parse_usernames(self, _):
+        """
+        Usernames should be read from the first column, skipping headers and duplicates.
+        """
+        self.assertEqual(
+            parse_usernames(["username,name", "user1,User One", "", "user2", "user1"]),
+            ["user1", "user2"],
+        )
@@ -0,0 +1,92 @@
+import datetime as dt
+import json
+
+import django.contrib.auth
+import django.test
+
+import jasmin_metadata.models
+import jasmin_services.models
+from jasmin_services.forms import message_form_factory, message_recipients
+from jasmin_services.widgets import user_picker_response
+
+
+class MessageFormTest(django.test.TestCase):
+    def setUp(self):
+        metadata_form = jasmin_metadata.models.Form.objects.create(name="test_form")
+        category = jasmin_services.models.Category.objects.create(
+            name="test_category", long_name="Test Category", position=1
+        )
+        service = jasmin_services.models.Service.objects.create(
+            category=category, name="test_service"
+        )
+        self.user_role, self.manager_role = (
+            jasmin_services.models.Role.objects.create(
+                service=service, name=name, metadata_form=metadata_form
+            )
+            for name in ["USER", "MANAGER"]
+        )
+        self.manager = self.grant("manager", self.manager_role)
+        self.users = [self.grant(f"user{i}", self.user_role) for i in range(5)]
+        self.MessageForm = message_form_factory(
+            self.manager, self.user_role, self.manager_role, recipients_url="/recipients/"
+        )
+
+    def grant(self, username, role):
+        user = django.contrib.auth.get_user_model().objects.create_user(
+            username=username, email=f"{username}@example.com"
+        )
+        jasmin_services.models.Grant.objects.create(
+            access=jasmin_services.models.Access.objects.create(user=user, role=role),
+            granted_by="admin",
+            expires=dt.date.today() + dt.timedelta(days=365),
+        )
+        return user
+
+    def test_user_picker_response(self):
+        """
+        The recipients should be returned a page at a time, filtered by the search term.
+        """
+        recipients = message_recipients([self.user_role])
+        request = django.test.RequestFactory().get("/recipients/", {"page": 2})
+        data = json.loads(user_picker_response(request, recipients, per_page=2).content)
+        self.assertEqual(
+            [result["id"] for result in data["results"]], [u.pk for u in self.users[2:4]]
+        )
+        self.assertTrue(data["more"])
+
+        request = django.test.RequestFactory().get("/recipients/", {"term": "user3"})
+        data = json.loads(user_picker_response(request, recipients).content)
+        self.assertEqual(
+            data, {"results": [{"id": self.users[3].pk, "text": "user3"}], "more": False}
+        )
+
+    def test_only_selected_users_are_rendered(self):
+        """
+        The widget should only render options for the selected users.
+        """
+        form = self.MessageForm(initial={"users": [self.users[0].pk]})
+        html = str(form["users"])
+        self.assertIn('data-url="/recipients/"', html)
+        self.assertEqual(html.count("<option"), 1)
+
+    def test_role_holders_are_resolved(self):
+        """
+        Selecting a role should send the message to all of its holders, except the sender.
+        """
+        form = self.MessageForm(
+            {
+                "users": [self.users[0].pk],
+                "roles": [self.user_role.pk, self.manager_role.pk],
+                "subject": "Test",
+                "message": "Test message",
+            }
+        )
+        self.assertTrue(form.is_valid(), form.errors)
+        self.assertCountEqual(form.recipients(), self.users)
+
+    def test_a_recipient_is_required(self):
+        """
+        The form should be invalid if no users or roles are selected.
+        """
+        form = self.MessageForm({"subject": "Test", "message": "Test message"})
+        self.assertFalse(form.is_valid())
@@ -0,0 +1,137 @@
+import datetime as dt
+import importlib
+from unittest import mock
+
+import django.conf
+import django.contrib.auth
+import django.core.cache
+import django.db
+import django.test
+from django import http
+from django.test.utils import CaptureQueriesContext
+
+import jasmin_metadata.models
+import jasmin_services.models
+
+# The views package exports the view under the same name as its module
+views = importlib.import_module("jasmin_services.views.my_services")
+
+FILTERS = ["active", "revoked", "expired", "expiring", "rejected", "pending"]
+
+
+@django.test.override_settings(
+    JASMIN_SERVICES={**django.conf.settings.JASMIN_SERVICES, "SERVICES_PER_PAGE": 100}
+)
+@mock.patch.object(views, "render", return_value=http.HttpResponse())
+@mock.patch("jasmin_services.notifications.notify_approvers")
+class MyServicesTest(django.test.TestCase):
+    def setUp(self):
+        django.core.cache.cache.clear()
+        self.user = django.contrib.auth.get_user_model().objects.create_user(
+            username="testuser", email="test@example.com"
+        )
+        self.user.notify = mock.Mock()
+        self.user.notify_if_not_exists = mock.Mock()
+        self.category = jasmin_services.models.Category.objects.create(
+            name="test_category", long_name="Test Category", position=1
+        )
+        self.metadata_form = jasmin_metadata.models.Form.objects.create(name="test_form")
+        self.factory = django.test.RequestFactory()
+
+    def access(self, name, position=0):
+        service = jasmin_services.models.Service.objects.create(
+            category=self.category, name=name, position=position
+        )
+        role = jasmin_services.models.Role.objects.create(
+            service=service, name="USER", metadata_form=self.metadata_form
+        )
+        return jasmin_services.models.Access.objects.create(user=self.user, role=role)
+
+    def grant(self, access, expires, **kwargs):
+        return jasmin_services.models.Grant.objects.create(
+            access=access,
+            granted_by="admin",
+            expires=dt.date.today() + dt.timedelta(days=expires),
+            **kwargs,
+        )
+
+    def listed_services(self, render, params=None):
+        request = self.factory.get("/my_services/", params or {})
+        request.user = self.user
+        views.my_services(request)
+        context = render.call_args.args[2]
+        return [service.name for service, _ in context["services"]]
+
+    def test_status_filters(self, _, render):
+        """
+        Each filter should list only the services with a grant or request in that state.
+        """
+        for position, status in enumerate(FILTERS):
+            access = self.access(status, position)
+            if status == "active":
+                self.grant(access, 365)
+            elif status == "revoked":
+                self.grant(access, 365, revoked=True, user_reason="Revoked")
+            elif status == "expired":
+                self.grant(access, -1)
+            elif status == "expiring":
+                self.grant(access, 30)
+            elif status == "rejected":
+                jasmin_services.models.Request.objects.create(
+                    access=access,
+                    requested_by="testuser",
+                    state=jasmin_services.models.RequestState.REJECTED,
+                    user_reason="Rejected",
+                )
+            else:
+                jasmin_services.models.Request.objects.create(
+                    access=access, requested_by="testuser"
+                )
+
+        self.assertEqual(self.listed_services(render), FILTERS)
+        for status in FILTERS:
+            with self.subTest(status=status):
+                self.assertEqual(
+                    self.listed_services(render, {"_apply_filters": "1", status: "1"}), [status]
+                )
+        self.assertEqual(
+            self.listed_services(render, {"_apply_filters": "1", "revoked": "1", "pending": "1"}),
+            ["revoked", "pending"],
+        )
+        self.assertEqual(self.listed_services(render, {"_apply_filters": "1"}), [])
+
+    def test_many_historical_accesses(self, _, render):
+        """
+        A user with a long history should see each of their services once, and the
+        services should be found without passing the history to the database as a list.
+        """
+        names = []
+        for i in range(30):
+            access = self.access(f"service_{i:02d}", i)
+            names.append(access.role.service.name)
+            jasmin_services.models.Request.objects.create(
+                access=access,
+                requested_by="testuser",
+                state=jasmin_services.models.RequestState.REJECTED,
+                user_reason="Incomplete",
+            )
+            # Each renewal supersedes the previous grant
+            grant = None
+            for expires in (-365, -1, 365):
+                grant = self.grant(access, expires, previous_grant=grant)
+
+        with CaptureQueriesContext(django.db.connection) as queries:
+            listed = self.listed_services(render)
+
+        self.assertEqual(listed, names)
+        service_queries = [
+            query["sql"]
+            for query in queries
+            # The count for the paginator also has LIMIT in its EXISTS subqueries
+            if 'FROM "jasmin_services_service"' in query["sql"]
+            and "LIMIT 100" in query["sql"]
+            and "COUNT(" not in query["sql"]
+        ]
+        self.assertEqual(len(service_queries), 1)
+        self.assertIn("EXISTS", service_queries[0])
+        self.assertNotIn(" IN (", service_queries[0])
@@ -0,0 +1,91 @@
+import datetime as dt
+from unittest import mock
+
+import django.contrib.auth
+import django.core.cache
+import django.test
+from django.contrib.auth.models import Permission
+from django.contrib.contenttypes.models import ContentType
+
+import jasmin_metadata.models
+import jasmin_services.models
+from jasmin_services.templatetags.service_tags import pending_req_count
+from jasmin_services.views.common import annotate_pending_counts
+
+
+class PendingCountsTest(django.test.TestCase):
+    def setUp(self):
+        # Patch in setUp rather than on the class, so that it covers the requests
+        # created here as well as in the tests
+        patcher = mock.patch("jasmin_services.notifications.notify_approvers")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        django.core.cache.cache.clear()
+        self.metadata_form = jasmin_metadata.models.Form.objects.create(name="test_form")
+        category = jasmin_services.models.Category.objects.create(
+            name="test_category", long_name="Test Category", position=1
+        )
+        self.service, self.other_service = (
+            jasmin_services.models.Service.objects.create(category=category, name=name)
+            for name in ["test_service", "other_service"]
+        )
+        self.user_role, self.manager_role = (
+            jasmin_services.models.Role.objects.create(
+                service=self.service, name=name, metadata_form=self.metadata_form
+            )
+            for name in ["USER", "MANAGER"]
+        )
+        # The decider may only decide requests for the user role
+        self.decider = self.create_user("decider")
+        jasmin_services.models.RoleObjectPermission.objects.create(
+            role=self.manager_role,
+            permission=Permission.objects.get(codename="decide_request"),
+            content_type=ContentType.objects.get_for_model(self.user_role),
+            object_pk=str(self.user_role.pk),
+        )
+        jasmin_services.models.Grant.objects.create(
+            access=jasmin_services.models.Access.objects.create(
+                user=self.decider, role=self.manager_role
+            ),
+            granted_by="admin",
+            expires=dt.date.today() + dt.timedelta(days=365),
+        )
+        for role in [self.user_role, self.manager_role]:
+            self.create_request("applicant", role)
+
+    def create_user(self, username):
+        user = django.contrib.auth.get_user_model().objects.create_user(
+            username=username, email=f"{username}@example.com"
+        )
+        user.notify = mock.Mock()
+        return user
+
+    def create_request(self, username, role):
+        jasmin_services.models.Request.objects.create(
+            access=jasmin_services.models.Access.objects.create(
+                user=self.create_user(username), role=role
+            ),
+            requested_by=username,
+        )
+
+    def test_annotate_pending_counts(self):
+        """
+        Only the services that the user may decide requests for should be annotated, with
+        the number of requests for the roles they may decide.
+        """
+        services = [self.service, self.other_service]
+        annotate_pending_counts(self.decider, services)
+        self.assertEqual(self.service.pending_request_count, 1)
+        self.assertFalse(hasattr(self.other_service, "pending_request_count"))
+
+    def test_pending_req_count_is_cached(self):
+        """
+        The tag should cache the count until a request for the service changes.
+        """
+        context = {"user": self.decider}
+        self.assertEqual(pending_req_count(context, self.service), 1)
+        with self.assertNumQueries(0):
+            self.assertEqual(pending_req_count(context, self.service), 1)
+
+        self.create_request("another_applicant", self.user_role)
+        self.assertEqual(pending_req_count(context, self.service), 2)
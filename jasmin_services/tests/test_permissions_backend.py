@@ -0,0 +1,94 @@
+import datetime as dt
+from unittest import mock
+
+import django.contrib.auth
+import django.test
+from django.contrib.auth.models import Permission
+from django.contrib.contenttypes.models import ContentType
+
+import jasmin_metadata.models
+import jasmin_services.models
+from jasmin_services.backends import RoleObjectPermissionsBackend
+
+
+@mock.patch("jasmin_services.notifications.notify_approvers")
+class RoleObjectPermissionsBackendTest(django.test.TestCase):
+    def setUp(self):
+        self.backend = RoleObjectPermissionsBackend()
+        self.user = django.contrib.auth.get_user_model().objects.create_user(
+            username="manager", email="manager@example.com"
+        )
+        self.user.notify = mock.Mock()
+        metadata_form = jasmin_metadata.models.Form.objects.create(name="test_form")
+        category = jasmin_services.models.Category.objects.create(
+            name="test_category", long_name="Test Category", position=1
+        )
+        self.services = [
+            jasmin_services.models.Service.objects.create(category=category, name=name)
+            for name in ["role_level", "service_level", "none"]
+        ]
+        self.roles = {
+            (service.name, name): jasmin_services.models.Role.objects.create(
+                service=service, name=name, metadata_form=metadata_form
+            )
+            for service in self.services
+            for name in ["USER", "MANAGER"]
+        }
+        manager = self.roles["role_level", "MANAGER"]
+        # The manager can decide requests for the user role of the first service
+        # and for the whole of the second service
+        for obj in [self.roles["role_level", "USER"], self.services[1]]:
+            jasmin_services.models.RoleObjectPermission.objects.create(
+                role=manager,
+                permission=Permission.objects.get(codename="decide_request"),
+                content_type=ContentType.objects.get_for_model(obj),
+                object_pk=str(obj.pk),
+            )
+        jasmin_services.models.Grant.objects.create(
+            access=jasmin_services.models.Access.objects.create(user=self.user, role=manager),
+            granted_by="admin",
+            expires=dt.date.today() + dt.timedelta(days=365),
+        )
+        self.perm = "jasmin_services.decide_request"
+
+    def test_roles_with_perm(self, _):
+        """
+        Role-level and service-level permissions should both be resolved.
+        """
+        role_ids = self.backend.roles_with_perm(self.user, self.perm, self.services[0])
+        self.assertEqual(role_ids, {self.roles["role_level", "USER"].pk})
+        role_ids = self.backend.roles_with_perm(self.user, self.perm, self.services[1])
+        self.assertEqual(
+            role_ids,
+            {self.roles["service_level", "USER"].pk, self.roles["service_level", "MANAGER"].pk},
+        )
+        self.assertEqual(
+            self.backend.roles_with_perm(self.user, self.perm, self.services[2]), set()
+        )
+
+    def test_services_with_perm(self, _):
+        """
+        The services should include those with a permission for any of their roles, and
+        should only be resolved once for each user.
+        """
+        self.assertEqual(
+            self.backend.services_with_perm(self.user, self.perm),
+            {self.services[0].pk, self.services[1].pk},
+        )
+        with self.assertNumQueries(0):
+            self.backend.services_with_perm(self.user, self.perm)
+
+    def test_global_perm(self, _):
+        """
+        A global permission should give the permission for every role and service.
+        """
+        self.user.user_permissions.add(Permission.objects.get(codename="decide_request"))
+        user = django.contrib.auth.get_user_model().objects.get(pk=self.user.pk)
+        self.assertEqual(
+            self.backend.services_with_perm(user, self.perm),
+            {service.pk for service in self.services},
+        )
+        self.assertEqual(
+            self.backend.roles_with_perm(user, self.perm, self.services[2]),
+            {self.roles["none", "USER"].pk, self.roles["none", "MANAGER"].pk},
+        )
@@ -0,0 +1,104 @@
+import datetime as dt
+from unittest import mock
+
+import django.contrib.auth
+import django.test
+import django.urls
+
+import jasmin_metadata.models
+import jasmin_services.models
+from jasmin_services.views.request_decide import RequestHistoryView, history_page
+
+
+class RequestHistoryTest(django.test.TestCase):
+    def setUp(self):
+        # Patch in setUp rather than on the class, so that it covers the requests
+        # created here as well as in the tests
+        patcher = mock.patch("jasmin_services.notifications.notify_approvers")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        User = django.contrib.auth.get_user_model()
+        self.applicant = User.objects.create_user(username="applicant", email="a@example.com")
+        self.applicant.notify = mock.Mock()
+        metadata_form = jasmin_metadata.models.Form.objects.create(name="test_form")
+        category = jasmin_services.models.Category.objects.create(
+            name="test_category", long_name="Test Category", position=1
+        )
+        self.services = [
+            jasmin_services.models.Service.objects.create(category=category, name=f"service{i}")
+            for i in range(4)
+        ]
+        roles = [
+            jasmin_services.models.Role.objects.create(
+                service=service, name="USER", metadata_form=metadata_form
+            )
+            for service in self.services
+        ]
+        self.request = jasmin_services.models.Request.objects.create(
+            access=jasmin_services.models.Access.objects.create(user=self.applicant, role=roles[0]),
+            requested_by="applicant",
+        )
+        # Each of the other services has both a grant and a pending request
+        for role in roles[1:]:
+            access = jasmin_services.models.Access.objects.create(user=self.applicant, role=role)
+            jasmin_services.models.Grant.objects.create(
+                access=access,
+                granted_by="admin",
+                expires=dt.date.today() + dt.timedelta(days=365),
+            )
+            jasmin_services.models.Request.objects.create(access=access, requested_by="applicant")
+        self.staff = User.objects.create_user(
+            username="staff", email="staff@example.com", is_staff=True, is_superuser=True
+        )
+        self.url = django.urls.reverse(
+            "jasmin_services:request_history", kwargs={"pk": self.request.pk}
+        )
+
+    def test_history_pages(self):
+        """
+        The pages should cover the history for other services once, newest first.
+        """
+        accesses, page, has_next = [], 1, True
+        while has_next:
+            grants, requests, has_next = history_page(
+                self.applicant, self.services[0], page, per_page=4
+            )
+            accesses.extend(
+                sorted(
+                    grants + requests,
+                    key=lambda access: getattr(access, "granted_at", None) or access.requested_at,
+                    reverse=True,
+                )
+            )
+            page += 1
+
+        self.assertEqual(page, 3)
+        self.assertEqual(len(accesses), 6)
+        self.assertNotIn(self.request, accesses)
+        starts = [getattr(access, "granted_at", None) or access.requested_at for access in accesses]
+        self.assertEqual(starts, sorted(starts, reverse=True))
+
+    def test_history_view(self):
+        """
+        Staff should get a page of the history, with a link to the next page.
+        """
+        request = django.test.RequestFactory().get(self.url)
+        request.user = self.staff
+        with self.settings(JASMIN_SERVICES={"HISTORY_PER_PAGE": 4}):
+            response = RequestHistoryView.as_view()(request, pk=self.request.pk)
+        # The response is not rendered, as the access templates need apps that are not
+        # installed for the tests
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.template_name, ["jasmin_services/includes/request_history.html"])
+        self.assertEqual(len(response.context_data["accesses"]), 4)
+        self.assertEqual(response.context_data["next_page"], 2)
+
+    def test_history_view_staff_only(self):
+        """
+        Users who may decide the request but are not staff should not see the history.
+        """
+        manager = django.contrib.auth.get_user_model().objects.create_user(
+            username="manager", email="manager@example.com", is_superuser=True
+        )
+        self.client.force_login(manager)
+        self.assertEqual(self.client.get(self.url).status_code, 403)
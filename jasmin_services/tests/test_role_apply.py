@@ -0,0 +1,58 @@
+from unittest import mock
+
+import django.contrib.auth
+import django.db
+import django.test
+import django.urls
+
+import jasmin_metadata.models
+import jasmin_services.models
+
+
+@mock.patch("jasmin_services.notifications.notify_approvers")
+class RoleApplyTest(django.test.TestCase):
+    def setUp(self):
+        self.user = django.contrib.auth.get_user_model().objects.create_user(
+            username="testuser", email="test@example.com"
+        )
+        category = jasmin_services.models.Category.objects.create(
+            name="test_category", long_name="Test Category", position=1
+        )
+        service = jasmin_services.models.Service.objects.create(
+            category=category, name="test_service"
+        )
+        self.role = jasmin_services.models.Role.objects.create(
+            service=service,
+            name="USER",
+            metadata_form=jasmin_metadata.models.Form.objects.create(name="test_form"),
+        )
+        self.url = django.urls.reverse(
+            "jasmin_services:role_apply",
+            kwargs={"category": category.name, "service": service.name, "role": "USER"},
+        )
+
+    def test_resubmit_creates_one_request(self, _):
+        """
+        Submitting the application twice, e.g. with a double-click, should only create
+        one request.
+        """
+        self.client.force_login(self.user)
+        for _ in range(2):
+            response = self.client.post(self.url, {})
+            self.assertEqual(response.status_code, 302)
+
+        requests = jasmin_services.models.Request.objects.filter(access__user=self.user)
+        self.assertEqual(requests.count(), 1)
+        self.assertEqual(requests.get().state, "PENDING")
+
+    def test_one_pending_request_per_access(self, _):
+        """
+        The database should not allow a second pending request for an access.
+        """
+        access = jasmin_services.models.Access.objects.create(user=self.user, role=self.role)
+        jasmin_services.models.Request.objects.create(access=access, requested_by="testuser")
+        with self.assertRaises(django.db.IntegrityError):
+            # Bulk creation skips the checks that are made when saving
+            jasmin_services.models.Request.objects.bulk_create(
+                [jasmin_services.models.Request(access=access, requested_by="testuser")]
+            )
@@ -0,0 +1,73 @@
+import datetime as dt
+from unittest import mock
+
+import asgiref.sync
+import django.contrib.auth
+import django.core.cache
+import django.test
+
+import jasmin_metadata.models
+import jasmin_services.models
+from jasmin_services.views.service_details import ServiceDetailsView
+
+
+@mock.patch("jasmin_services.notifications.notify_approvers")
+class RoleHoldersTest(django.test.TestCase):
+    def setUp(self):
+        django.core.cache.cache.clear()
+        metadata_form = jasmin_metadata.models.Form.objects.create(name="test_form")
+        category = jasmin_services.models.Category.objects.create(
+            name="test_category", long_name="Test Category", position=1
+        )
+        self.service = jasmin_services.models.Service.objects.create(
+            category=category, name="test_service"
+        )
+        self.manager_role, self.deputy_role, self.user_role = (
+            jasmin_services.models.Role.objects.create(
+                service=self.service, name=name, metadata_form=metadata_form
+            )
+            for name in ["MANAGER", "DEPUTY", "USER"]
+        )
+        self.manager = self.grant("manager", self.manager_role)
+        self.deputy = self.grant("deputy", self.deputy_role)
+        self.grant("user", self.user_role)
+
+    def grant(self, username, role):
+        user = django.contrib.auth.get_user_model().objects.create_user(
+            username=username, email=f"{username}@example.com"
+        )
+        user.notify = mock.Mock()
+        jasmin_services.models.Grant.objects.create(
+            access=jasmin_services.models.Access.objects.create(user=user, role=role),
+            granted_by="admin",
+            expires=dt.date.today() + dt.timedelta(days=365),
+        )
+        return user
+
+    def get_service_roleholders(self):
+        return asgiref.sync.async_to_sync(ServiceDetailsView.get_service_roleholders)(
+            self.service, ["MANAGER", "DEPUTY"]
+        )
+
+    def test_role_holders(self, _):
+        """
+        The holders of all the given roles should be fetched in a single query.
+        """
+        with self.assertNumQueries(1):
+            holders = jasmin_services.models.Grant.objects.role_holders(
+                self.service, ["MANAGER", "DEPUTY"]
+            )
+        self.assertEqual(holders, {"MANAGER": [self.manager], "DEPUTY": [self.deputy]})
+
+    def test_role_holders_are_cached(self, _):
+        """
+        The holders should be cached until a grant for the service changes.
+        """
+        self.get_service_roleholders()
+        with self.assertNumQueries(0):
+            holders = self.get_service_roleholders()
+        self.assertEqual(holders, {"MANAGER": [self.manager], "DEPUTY": [self.deputy]})
+
+        deputy = self.grant("another_deputy", self.deputy_role)
+        holders = self.get_service_roleholders()
+        self.assertEqual(holders["DEPUTY"], [deputy, self.deputy])
@@ -0,0 +1,111 @@
+import datetime as dt
+import importlib
+from unittest import mock
+
+import django.conf
+import django.contrib.auth
+import django.core.cache
+import django.db
+import django.test
+from django import http
+from django.test.utils import CaptureQueriesContext
+
+import jasmin_metadata.models
+import jasmin_services.models
+
+# The views package exports the view under the same name as its module
+views = importlib.import_module("jasmin_services.views.service_list")
+
+
+@mock.patch.object(views, "render", return_value=http.HttpResponse())
+@mock.patch("jasmin_services.notifications.notify_approvers")
+class ServiceListTest(django.test.TestCase):
+    def setUp(self):
+        django.core.cache.cache.clear()
+        User = django.contrib.auth.get_user_model()
+        self.user = User.objects.create_user(username="testuser", email="test@example.com")
+        self.user.notify = mock.Mock()
+        self.other_user = User.objects.create_user(username="other", email="other@example.com")
+        self.other_user.notify = mock.Mock()
+        self.category = jasmin_services.models.Category.objects.create(
+            name="test_category", long_name="Test Category", position=1
+        )
+        self.metadata_form = jasmin_metadata.models.Form.objects.create(name="test_form")
+        self.factory = django.test.RequestFactory()
+
+    def service(self, name, position=0, hidden=False, **kwargs):
+        # Services are hidden by default
+        return jasmin_services.models.Service.objects.create(
+            category=self.category, name=name, position=position, hidden=hidden, **kwargs
+        )
+
+    def access(self, service, user):
+        role, _ = jasmin_services.models.Role.objects.get_or_create(
+            service=service, name="USER", defaults={"metadata_form": self.metadata_form}
+        )
+        return jasmin_services.models.Access.objects.create(user=user, role=role)
+
+    def listed_services(self, render, **params):
+        request = self.factory.get("/test_category/", params)
+        request.user = self.user
+        views.service_list(request, "test_category")
+        context = render.call_args.args[2]
+        return [service for service, _ in context["services"]]
+
+    def test_hidden_services_with_access_are_listed(self, _, render):
+        """
+        Hidden services should only be listed if the user has a grant or request for them.
+        """
+        visible = self.service("visible", 1)
+        granted = self.service("granted", 2, hidden=True)
+        requested = self.service("requested", 3, hidden=True)
+        self.service("hidden", 4, hidden=True)
+        other_granted = self.service("other_granted", 5, hidden=True)
+        self.service("disabled", 6, disabled=True)
+        jasmin_services.models.Grant.objects.create(
+            access=self.access(granted, self.user),
+            granted_by="admin",
+            expires=dt.date.today() + dt.timedelta(days=180),
+        )
+        jasmin_services.models.Request.objects.create(
+            access=self.access(requested, self.user), requested_by="testuser"
+        )
+        jasmin_services.models.Grant.objects.create(
+            access=self.access(other_granted, self.other_user),
+            granted_by="admin",
+            expires=dt.date.today() + dt.timedelta(days=180),
+        )
+
+        with django.test.override_settings(
+            JASMIN_SERVICES={**django.conf.settings.JASMIN_SERVICES, "SERVICES_PER_PAGE": 10}
+        ):
+            self.assertEqual(self.listed_services(render), [visible, granted, requested])
+
+    def test_page_fetches_only_its_services(self, _, render):
+        """
+        Only the services on the requested page should be fetched, along with their
+        categories.
+        """
+        services = [self.service(f"service_{i}", i) for i in range(5)]
+
+        with django.test.override_settings(
+            JASMIN_SERVICES={**django.conf.settings.JASMIN_SERVICES, "SERVICES_PER_PAGE": 2}
+        ):
+            with CaptureQueriesContext(django.db.connection) as queries:
+                listed = self.listed_services(render, page=2)
+
+        self.assertEqual(listed, services[2:4])
+        # The services are fetched a page at a time, rather than all of them being
+        # fetched to be paginated in Python
+        service_queries = [
+            query["sql"]
+            for query in queries
+            if 'FROM "jasmin_services_service"' in query["sql"] and "LIMIT" in query["sql"]
+        ]
+        self.assertEqual(len(service_queries), 1)
+        self.assertIn("LIMIT 2 OFFSET 2", service_queries[0])
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                [(service.category.long_name, len(service.roles.all())) for service in listed],
+                [("Test Category", 0), ("Test Category", 0)],
+            )
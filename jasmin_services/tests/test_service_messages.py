@@ -0,0 +1,155 @@
+import datetime as dt
+import smtplib
+from unittest import mock
+
+import django.contrib.auth
+import django.core.mail
+import django.core.mail.backends.locmem
+import django.test
+import django.utils.timezone
+
+import jasmin_services.models
+from jasmin_services.actions import send_service_message
+
+
+class SendServiceMessageTest(django.test.TestCase):
+    def setUp(self):
+        category = jasmin_services.models.Category.objects.create(
+            name="test_category", long_name="Test Category", position=1
+        )
+        service = jasmin_services.models.Service.objects.create(
+            category=category, name="test_service"
+        )
+        self.message = jasmin_services.models.ServiceMessage.objects.create(
+            service=service,
+            subject="Maintenance",
+            body="The service will be unavailable tomorrow.",
+            reply_to="manager@example.com",
+            total_recipients=5,
+        )
+        for i in range(5):
+            user = django.contrib.auth.get_user_model().objects.create_user(
+                username=f"user{i}", email=f"user{i}@example.com"
+            )
+            jasmin_services.models.MessageRecipient.objects.create(
+                message=self.message, user=user, email=user.email
+            )
+
+    def test_send_service_message(self):
+        """
+        The message should be sent to every recipient, in batches.
+        """
+        send_service_message(self.message, batch_size=2)
+
+        self.assertEqual(len(django.core.mail.outbox), 5)
+        self.assertEqual(django.core.mail.outbox[0].reply_to, ["manager@example.com"])
+        self.message.refresh_from_db()
+        self.assertEqual((self.message.sent, self.message.failed), (5, 0))
+        self.assertTrue(self.message.completed)
+        self.assertFalse(self.message.recipients.filter(sent_at__isnull=True).exists())
+
+    def test_failures_are_reported(self):
+        """
+        A recipient that the message cannot be sent to should be recorded as failed,
+        without stopping the other recipients.
+        """
+        send = django.core.mail.EmailMessage.send
+
+        def send_or_fail(email, *args, **kwargs):
+            if email.to == ["user1@example.com"]:
+                raise smtplib.SMTPRecipientsRefused({"user1@example.com": (550, b"Unknown")})
+            return send(email, *args, **kwargs)
+
+        with mock.patch.object(django.core.mail.EmailMessage, "send", send_or_fail):
+            send_service_message(self.message, batch_size=2)
+
+        self.assertEqual(len(django.core.mail.outbox), 4)
+        self.message.refresh_from_db()
+        self.assertEqual((self.message.sent, self.message.failed), (4, 1))
+        failed = self.message.recipients.exclude(error="")
+        self.assertEqual([recipient.email for recipient in failed], ["user1@example.com"])
+
+    def test_recipients_recorded_as_sent(self):
+        """
+        Each recipient should be recorded as soon as the message is sent to them, rather
+        than at the end of the batch.
+        """
+        send = django.core.mail.EmailMessage.send
+        recorded = []
+
+        def send_and_check(email, *args, **kwargs):
+            recorded.append(self.message.recipients.filter(sent_at__isnull=False).count())
+            return send(email, *args, **kwargs)
+
+        with mock.patch.object(django.core.mail.EmailMessage, "send", send_and_check):
+            send_service_message(self.message, batch_size=5)
+
+        self.assertEqual(recorded, [0, 1, 2, 3, 4])
+        self.assertEqual((self.message.sent, self.message.failed), (5, 0))
+
+    def test_claimed_recipients_are_skipped(self):
+        """
+        Recipients claimed by another sender should be skipped until the claim expires,
+        and the message should only be completed once every recipient is processed.
+        """
+        claimed = list(self.message.recipients.order_by("pk").values_list("pk", flat=True)[:2])
+        jasmin_services.models.MessageRecipient.objects.filter(pk__in=claimed).update(
+            claimed_at=django.utils.timezone.now()
+        )
+
+        send_service_message(self.message, batch_size=2)
+
+        self.assertEqual(
+            [email.to for email in django.core.mail.outbox],
+            [["user2@example.com"], ["user3@example.com"], ["user4@example.com"]],
+        )
+        self.assertEqual((self.message.sent, self.message.failed), (3, 0))
+        self.assertFalse(self.message.completed)
+
+        # The claim has expired, so the sender that made it is assumed to have stopped
+        jasmin_services.models.MessageRecipient.objects.filter(pk__in=claimed).update(
+            claimed_at=django.utils.timezone.now() - dt.timedelta(hours=2)
+        )
+        send_service_message(self.message, batch_size=2)
+
+        self.assertEqual(len(django.core.mail.outbox), 5)
+        self.assertEqual((self.message.sent, self.message.failed), (5, 0))
+        self.assertTrue(self.message.completed)
+
+    def test_reconnect_failure_stops_send(self):
+        """
+        If the connection cannot be reopened after an error, the send should stop and
+        release the rest of the batch, recording the recipients processed so far.
+        """
+        send = django.core.mail.EmailMessage.send
+
+        def send_or_fail(email, *args, **kwargs):
+            if email.to == ["user1@example.com"]:
+                raise smtplib.SMTPServerDisconnected("Connection unexpectedly closed")
+            return send(email, *args, **kwargs)
+
+        with (
+            mock.patch.object(django.core.mail.EmailMessage, "send", send_or_fail),
+            mock.patch.object(
+                django.core.mail.backends.locmem.EmailBackend,
+                "open",
+                side_effect=[None, OSError("Connection refused")],
+            ),
+        ):
+            send_service_message(self.message, batch_size=5)
+
+        self.assertEqual(len(django.core.mail.outbox), 1)
+        self.assertEqual((self.message.sent, self.message.failed), (1, 1))
+        self.assertFalse(self.message.completed)
+        unsent = self.message.recipients.filter(sent_at__isnull=True).order_by("pk")
+        self.assertEqual(
+            list(unsent.values_list("email", "claimed_at")),
+            [("user2@example.com", None), ("user3@example.com", None), ("user4@example.com", None)],
+        )
+
+        # The next send picks up where this one stopped
+        send_service_message(self.message, batch_size=5)
+
+        self.assertEqual(len(django.core.mail.outbox), 4)
+        self.assertEqual((self.message.sent, self.message.failed), (4, 1))
+        self.assertTrue(self.message.completed)
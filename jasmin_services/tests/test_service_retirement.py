@@ -0,0 +1,75 @@
+import datetime as dt
+from unittest import mock
+
+import django.contrib.auth
+import django.test
+
+import jasmin_metadata.models
+import jasmin_services.actions
+import jasmin_services.models
+
+
+class ServiceRetirementTest(django.test.TestCase):
+    def setUp(self):
+        metadata_form = jasmin_metadata.models.Form.objects.create(name="test_form")
+        self.category = jasmin_services.models.Category.objects.create(
+            name="test_category",
+            long_name="Test Category",
+            position=1,
+        )
+        self.service = jasmin_services.models.Service.objects.create(
+            category=self.category,
+            name="test_service",
+            summary="Test service",
+            description="Test service description",
+        )
+        self.role = jasmin_services.models.Role.objects.create(
+            service=self.service,
+            name="test_role",
+            description="Test role",
+            metadata_form=metadata_form,
+        )
+        self.grants = []
+        for i in range(3):
+            # Training accounts are not notified, which keeps the test self-contained
+            user = django.contrib.auth.get_user_model().objects.create_user(
+                username=f"train{i:03}",
+                email=f"train{i:03}@example.com",
+            )
+            access = jasmin_services.models.Access.objects.create(user=user, role=self.role)
+            self.grants.append(
+                jasmin_services.models.Grant.objects.create(
+                    access=access,
+                    granted_by="admin",
+                    expires=dt.date.today() + dt.timedelta(days=180),
+                )
+            )
+
+    def test_retire_service(self):
+        """
+        Retiring a service should disable it and record the grants to be revoked.
+        """
+        retirement = jasmin_services.actions.retire_service(self.service, "admin")
+
+        self.service.refresh_from_db()
+        self.assertTrue(self.service.disabled)
+        self.assertEqual(retirement.total_grants, 3)
+        self.assertFalse(retirement.completed)
+
+    @mock.patch("jasmin_services.actions.notify_many")
+    def test_process_retirement_in_chunks(self, _):
+        """
+        Processing a retirement should revoke all the grants, setting revoked_at.
+        """
+        retirement = jasmin_services.actions.retire_service(self.service, "admin")
+
+        jasmin_services.actions.process_retirement(retirement, chunk_size=2)
+
+        for grant in self.grants:
+            grant.refresh_from_db()
+            self.assertTrue(grant.revoked)
+            self.assertIsNotNone(grant.revoked_at)
+            self.assertEqual(grant.user_reason, "This service has been retired.")
+        self.assertEqual(retirement.revoked_grants, 3)
+        self.assertTrue(retirement.completed)
+        self.assertEqual(retirement.progress, 100)
@@ -0,0 +1,49 @@
+import django.core.cache
+import django.test
+
+import jasmin_services.models
+from jasmin_services import caching
+
+
+class ServiceRoutesTest(django.test.TestCase):
+    def setUp(self):
+        django.core.cache.cache.clear()
+        self.category = jasmin_services.models.Category.objects.create(
+            name="test_category", long_name="Test Category", position=1
+        )
+        self.service = jasmin_services.models.Service.objects.create(
+            category=self.category, name="test_service"
+        )
+
+    def test_get_service_cached(self):
+        """
+        Once a service has been loaded, it should be resolved without a query.
+        """
+        service = caching.get_service("test_category", "test_service")
+        with self.assertNumQueries(0):
+            again = caching.get_service("test_category", "test_service")
+            self.assertEqual(again.category.name, "test_category")
+        self.assertEqual(again, service)
+        # Each caller gets its own copy
+        self.assertIsNot(again, service)
+
+    def test_get_service_invalidated(self):
+        """
+        Changing a service or category should cause the service to be loaded again.
+        """
+        caching.get_service("test_category", "test_service")
+        self.service.summary = "Changed"
+        self.service.save()
+        self.assertEqual(caching.get_service("test_category", "test_service").summary, "Changed")
+        self.category.long_name = "Changed"
+        self.category.save()
+        self.assertEqual(
+            caching.get_service("test_category", "test_service").category.long_name, "Changed"
+        )
+
+    def test_get_service_missing(self):
+        """
+        A service that does not exist should raise DoesNotExist.
+        """
+        with self.assertRaises(jasmin_services.models.Service.DoesNotExist):
+            caching.get_service("test_category", "missing")
@@ -0,0 +1,67 @@
+import django.test
+import django.urls
+
+import jasmin_services.models
+from jasmin_services.search import search_services
+
+
+class ServiceSearchTest(django.test.TestCase):
+    def setUp(self):
+        category = jasmin_services.models.Category.objects.create(
+            name="test_category", long_name="Test Category", position=1
+        )
+        self.climate = jasmin_services.models.Service.objects.create(
+            category=category,
+            name="gws_climate",
+            summary="Group workspace for climate modelling",
+        )
+        self.login = jasmin_services.models.Service.objects.create(
+            category=category,
+            name="login",
+            summary="Access to the login servers",
+            description="Required for all other services.",
+        )
+
+    def test_search_matches_prefixes(self):
+        """
+        Each term should match the start of a word in the service's text.
+        """
+        services = search_services(jasmin_services.models.Service.objects.all(), "clim model")
+        self.assertEqual(list(services), [self.climate])
+
+    def test_search_is_updated_on_save(self):
+        """
+        The index should be updated when a service is saved or deleted.
+        """
+        self.login.summary = "Access to the climate login servers"
+        self.login.save()
+        services = search_services(jasmin_services.models.Service.objects.all(), "climate")
+        self.assertCountEqual(services, [self.climate, self.login])
+
+        self.climate.delete()
+        services = search_services(jasmin_services.models.Service.objects.all(), "climate")
+        self.assertEqual(list(services), [self.login])
+
+    def test_search_without_matches(self):
+        """
+        A search without matches should return no services.
+        """
+        services = search_services(jasmin_services.models.Service.objects.all(), "nothing")
+        self.assertEqual(list(services), [])
+
+    def test_search_does_not_shadow_category(self):
+        """
+        A category called "search" should still be reachable.
+        """
+        search_url = django.urls.reverse("jasmin_services:service_search")
+        self.assertEqual(
+            django.urls.resolve(search_url).url_name,
+            "service_search",
+        )
+        category_url = django.urls.reverse(
+            "jasmin_services:service_list", kwargs={"category": "search"}
+        )
+        self.assertNotEqual(category_url, search_url)
+        match = django.urls.resolve(category_url)
+        self.assertEqual(match.url_name, "service_list")
+        self.assertEqual(match.kwargs, {"category": "search"})
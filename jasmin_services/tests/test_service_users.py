@@ -0,0 +1,63 @@
+import datetime as dt
+from unittest import mock
+
+import django.contrib.auth
+import django.test
+
+import jasmin_metadata.models
+import jasmin_services.models
+from jasmin_services.views.service_users import count_grants, keyset_page
+
+
+@mock.patch("jasmin_services.notifications.notify_approvers")
+class ServiceUsersPaginationTest(django.test.TestCase):
+    def setUp(self):
+        metadata_form = jasmin_metadata.models.Form.objects.create(name="test_form")
+        category = jasmin_services.models.Category.objects.create(
+            name="test_category", long_name="Test Category", position=1
+        )
+        service = jasmin_services.models.Service.objects.create(
+            category=category, name="test_service"
+        )
+        roles = [
+            jasmin_services.models.Role.objects.create(
+                service=service, name=name, metadata_form=metadata_form
+            )
+            for name in ["USER", "MANAGER"]
+        ]
+        for i in range(3):
+            user = django.contrib.auth.get_user_model().objects.create_user(
+                username=f"user{i}", email=f"user{i}@example.com"
+            )
+            user.notify = mock.Mock()
+            for role in roles:
+                jasmin_services.models.Grant.objects.create(
+                    access=jasmin_services.models.Access.objects.create(user=user, role=role),
+                    granted_by="admin",
+                    expires=dt.date.today() + dt.timedelta(days=365),
+                )
+        self.grants = jasmin_services.models.Grant.objects.filter_active().select_related("access")
+        self.ordered = list(self.grants.order_by("access__user", "pk"))
+
+    def test_keyset_pages(self, _):
+        """
+        Following the cursors should visit every grant once, in order, in both directions.
+        """
+        pages = [keyset_page(self.grants, per_page=4)]
+        self.assertFalse(pages[0].has_previous())
+        self.assertTrue(pages[0].has_next())
+        pages.append(keyset_page(self.grants, after=pages[0].next_cursor(), per_page=4))
+        self.assertTrue(pages[1].has_previous())
+        self.assertFalse(pages[1].has_next())
+        self.assertEqual([grant for page in pages for grant in page], self.ordered)
+
+        previous = keyset_page(self.grants, before=pages[1].previous_cursor(), per_page=4)
+        self.assertEqual(list(previous), self.ordered[:4])
+        self.assertFalse(previous.has_previous())
+
+    def test_count_grants(self, _):
+        """
+        The grants and users should be counted in a single query.
+        """
+        with self.assertNumQueries(1):
+            self.assertEqual(count_grants(self.grants), (6, 3, False))
@@ -0,0 +1,90 @@
+import datetime as dt
+from unittest import mock
+
+import asgiref.sync
+import django.contrib.auth
+import django.test
+
+import jasmin_metadata.models
+import jasmin_services.models
+from jasmin_services.views.mixins import AccessListMixin
+
+
+class UserMayApplyMapTest(django.test.TestCase):
+    def setUp(self):
+        # Patch in setUp rather than on the class, so that it covers the requests
+        # created here as well as in the tests
+        patcher = mock.patch("jasmin_services.notifications.notify_approvers")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.user = django.contrib.auth.get_user_model().objects.create_user(
+            username="testuser",
+            email="test@example.com",
+        )
+        self.user.notify = mock.Mock()
+        metadata_form = jasmin_metadata.models.Form.objects.create(name="test_form")
+        category = jasmin_services.models.Category.objects.create(
+            name="test_category", long_name="Test Category", position=1
+        )
+        service = jasmin_services.models.Service.objects.create(
+            category=category, name="test_service"
+        )
+        self.granted, self.expiring, self.requested, self.available = (
+            jasmin_services.models.Role.objects.create(
+                service=service, name=name, metadata_form=metadata_form
+            )
+            for name in ["GRANTED", "EXPIRING", "REQUESTED", "AVAILABLE"]
+        )
+        for role, days in [(self.granted, 365), (self.expiring, 30)]:
+            jasmin_services.models.Grant.objects.create(
+                access=jasmin_services.models.Access.objects.create(user=self.user, role=role),
+                granted_by="admin",
+                expires=dt.date.today() + dt.timedelta(days=days),
+            )
+        jasmin_services.models.Request.objects.create(
+            access=jasmin_services.models.Access.objects.create(
+                user=self.user, role=self.requested
+            ),
+            requested_by="testuser",
+        )
+        self.roles = [self.granted, self.expiring, self.requested, self.available]
+
+    def test_user_may_apply_map(self):
+        """
+        The map should match user_may_apply for each role, using a single query.
+        """
+        with self.assertNumQueries(1):
+            may_apply = jasmin_services.models.Role.objects.user_may_apply_map(
+                self.user, self.roles
+            )
+        self.assertEqual(
+            may_apply,
+            {role.pk: role.user_may_apply(self.user) for role in self.roles},
+        )
+        self.assertEqual(
+            may_apply,
+            {
+                self.granted.pk: False,
+                self.expiring.pk: True,
+                self.requested.pk: False,
+                self.available.pk: True,
+            },
+        )
+
+    def test_display_accesses_merges_newest_first(self):
+        """
+        The grants and requests should be merged into a single list, newest first.
+        """
+        grants = jasmin_services.models.Grant.objects.filter(access__user=self.user)
+        requests = jasmin_services.models.Request.objects.filter(access__user=self.user)
+        accesses = asgiref.sync.async_to_sync(AccessListMixin().display_accesses)(
+            self.user, grants, requests
+        )
+
+        starts = [access.frontend["start"] for access in accesses]
+        self.assertEqual(len(accesses), 3)
+        self.assertEqual(starts, sorted(starts, reverse=True))
+        self.assertEqual(
+            {access.access.role.name: access.frontend["may_apply"] for access in accesses},
+            {"GRANTED": False, "EXPIRING": True, "REQUESTED": False},
+        )
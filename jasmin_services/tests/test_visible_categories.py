@@ -0,0 +1,68 @@
+from unittest import mock
+
+import django.contrib.auth
+import django.core.cache
+import django.test
+
+import jasmin_metadata.models
+import jasmin_services.models
+from jasmin_services.views.common import visible_categories
+
+
+@mock.patch("jasmin_services.notifications.notify_approvers")
+class VisibleCategoriesTest(django.test.TestCase):
+    def setUp(self):
+        django.core.cache.cache.clear()
+        self.user = django.contrib.auth.get_user_model().objects.create_user(
+            username="testuser",
+            email="test@example.com",
+        )
+        self.user.notify = mock.Mock()
+        self.public = jasmin_services.models.Category.objects.create(
+            name="public", long_name="Public", position=1
+        )
+        jasmin_services.models.Service.objects.create(
+            category=self.public, name="public_service", hidden=False
+        )
+        self.private = jasmin_services.models.Category.objects.create(
+            name="private", long_name="Private", position=2
+        )
+        self.private_service = jasmin_services.models.Service.objects.create(
+            category=self.private, name="private_service", hidden=True
+        )
+
+    def test_visible_categories_are_cached(self, _):
+        """
+        The visible categories should only be fetched from the database once.
+        """
+        self.assertEqual(visible_categories(self.user), [("public", "Public")])
+        with self.assertNumQueries(0):
+            self.assertEqual(visible_categories(self.user), [("public", "Public")])
+
+    def test_current_category_is_visible(self, _):
+        """
+        The current category should be visible even if it contains no visible services.
+        """
+        self.assertEqual(
+            visible_categories(self.user, self.private),
+            [("public", "Public"), ("private", "Private")],
+        )
+
+    def test_new_request_invalidates_cache(self, _):
+        """
+        A new request for a hidden service should make its category visible.
+        """
+        visible_categories(self.user)
+        role = jasmin_services.models.Role.objects.create(
+            service=self.private_service,
+            name="USER",
+            metadata_form=jasmin_metadata.models.Form.objects.create(name="test_form"),
+        )
+        jasmin_services.models.Request.objects.create(
+            access=jasmin_services.models.Access.objects.create(user=self.user, role=role),
+            requested_by="testuser",
+        )
+        self.assertEqual(
+            visible_categories(self.user),
+            [("public", "Public"), ("private", "Private")],
+        )
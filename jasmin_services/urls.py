@@ -50,6 +50,9 @@ urlpatterns = [
     ),
     path("reverse_dns_check/", views.reverse_dns_check, name="reverse_dns_check"),
     path("my_services/", views.my_services, name="my_services"),
+    # Search is mounted under "-", which is not a meaningful category name, so that it
+    # does not shadow a category called "search"
+    path("-/search/", views.service_search, name="service_search"),
     path("<slug:category>/", views.service_list, name="service_list"),
     path(
         "<slug:category>/<slug:service>/",
@@ -57,8 +60,23 @@ urlpatterns = [
             [
                 path("", ServiceDetailsView.as_view(), name="service_details"),
                 path("requests/", views.service_requests, name="service_requests"),
+                path(
+                    "requests/decide/",
+                    views.service_requests_decide,
+                    name="service_requests_decide",
+                ),
                 path("users/", views.service_users, name="service_users"),
                 path("message/", views.service_message, name="service_message"),
+                path(
+                    "message/recipients/",
+                    views.service_message_recipients,
+                    name="service_message_recipients",
+                ),
+                path(
+                    "message/<int:pk>/",
+                    views.service_message_status,
+                    name="service_message_status",
+                ),
                 path("grant/", views.grant_role, name="grant_role"),
             ]
         ),
@@ -74,5 +92,10 @@ urlpatterns = [
         name="role_apply",
     ),
     path("request/<int:pk>/decide/", RequestDecideView.as_view(), name="request_decide"),
+    path(
+        "request/<int:pk>/history/",
+        views.RequestHistoryView.as_view(),
+        name="request_history",
+    ),
     path("grant/<int:pk>/review/", views.grant_review, name="grant_review"),
 ]
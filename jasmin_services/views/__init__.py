@@ -1,13 +1,17 @@
 from .grant_review import grant_review
 from .grant_role import grant_role
 from .my_services import my_services
-from .request_decide import RequestDecideView
+from .request_decide import RequestDecideView, RequestHistoryView
 from .reverse_dns_check import reverse_dns_check
 from .role_apply import RoleApplyView
 from .service_details import ServiceDetailsView
-from .service_list import service_list
-from .service_message import service_message
-from .service_requests import service_requests
+from .service_list import service_list, service_search
+from .service_message import (
+    service_message,
+    service_message_recipients,
+    service_message_status,
+)
+from .service_requests import service_requests, service_requests_decide
 from .service_users import service_users
 
 __all__ = [
@@ -15,11 +19,16 @@ __all__ = [
     "grant_role",
     "my_services",
     "RequestDecideView",
+    "RequestHistoryView",
     "reverse_dns_check",
     "service_details",
     "service_list",
+    "service_search",
     "service_message",
+    "service_message_recipients",
+    "service_message_status",
     "service_requests",
+    "service_requests_decide",
     "service_users",
     "RoleApplyView",
     "ServiceDetailsView",
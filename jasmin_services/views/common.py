@@ -1,17 +1,126 @@
 """Common functions for jasmin_services views."""
 
+import asyncio
+import atexit
+import concurrent.futures
 import functools
 import logging
+import threading
 
-from django import http
+import asgiref.sync
+from django import db, http
+from django.conf import settings
+from django.core.cache import cache
 from django.core.exceptions import ObjectDoesNotExist
+from django.db.models import Exists, OuterRef, Q
 from django.shortcuts import redirect
 
-from ..models import Service
+from .. import caching
+from ..backends import RoleObjectPermissionsBackend
+from ..models import Category, Grant, Request, Role, Service
 
 _log = logging.getLogger(__name__)
 
 
+_query_executor = None
+_query_executor_lock = threading.Lock()
+
+
+def _get_query_executor():
+    """Return the thread pool used to run queries concurrently.
+
+    Each worker thread holds its own database connection for the life of the thread, so
+    the size of the pool bounds the number of connections used.
+    """
+    global _query_executor
+    with _query_executor_lock:
+        if _query_executor is None:
+            _query_executor = concurrent.futures.ThreadPoolExecutor(
+                max_workers=getattr(settings, "JASMIN_SERVICES", {}).get("QUERY_CONCURRENCY", 4),
+                thread_name_prefix="jasmin_services_query",
+            )
+        return _query_executor
+
+
+@atexit.register
+def shutdown_query_executor():
+    """Shut down the thread pool used to run queries concurrently, if it was started.
+
+    The worker threads exit once their queries finish, which releases their database
+    connections. A new pool is started if any more queries are run.
+    """
+    global _query_executor
+    with _query_executor_lock:
+        executor, _query_executor = _query_executor, None
+    if executor is not None:
+        executor.shutdown(wait=True, cancel_futures=True)
+
+
+def _run_query(func):
+    try:
+        return func()
+    finally:
+        # The connection is kept between queries, unless an error has left it unusable
+        connection = db.connection
+        if connection.errors_occurred:
+            if connection.is_usable():
+                connection.errors_occurred = False
+            else:
+                connection.close()
+
+
+async def gather_queries(*funcs):
+    """Run the given synchronous functions, which query the database, concurrently.
+
+    Returns a list of the results in the same order as the functions.
+    """
+    in_transaction = await asgiref.sync.sync_to_async(lambda: db.connection.in_atomic_block)()
+    if in_transaction:
+        # Other connections cannot see changes made in the transaction, so the queries
+        # must run one after another on the connection for this request
+        return [await asgiref.sync.sync_to_async(func)() for func in funcs]
+    loop = asyncio.get_running_loop()
+    executor = _get_query_executor()
+    return await asyncio.gather(
+        *(loop.run_in_executor(executor, _run_query, func) for func in funcs)
+    )
+
+
+def user_roles_with_perm(user, permission, service):
+    """Return the roles in the service for which the user has the given permission.
+
+    The permission may be allocated for all services, per-service or per-role. Returns
+    ``None`` if the user does not have the permission for the service or any of its roles.
+    """
+    backend = RoleObjectPermissionsBackend()
+    role_ids = backend.roles_with_perm(user, permission, service)
+    # Note that a user who has been granted the permission for a service with no roles
+    # still has permission, but there are no roles to show
+    if not role_ids and service.pk not in backend.services_with_perm(user, permission):
+        return None
+    return list(service.roles.filter(pk__in=role_ids))
+
+
+def annotate_pending_counts(user, services):
+    """Set ``pending_request_count`` on each of the services for which the user may decide
+    requests, using a single grouped query.
+
+    The count only includes the requests for the roles that the user may decide.
+    """
+    permission = "jasmin_services.decide_request"
+    backend = RoleObjectPermissionsBackend()
+    decidable = backend.services_with_perm(user, permission)
+    services = [service for service in services if service.pk in decidable]
+    if not services:
+        return
+    roles = backend.filter_roles_with_perm(
+        user, permission, Role.objects.filter(service__in=services)
+    )
+    counts = Request.objects.pending_counts(roles)
+    for service in services:
+        service.pending_request_count = counts.get(service.pk, 0)
+
+
 def with_service(view):
     """Take a service type and service name and turns them into a service for the underlying view.
 
@@ -21,9 +130,7 @@ def with_service(view):
     @functools.wraps(view)
     def wrapper(*args, **kwargs):
         try:
-            kwargs["service"] = Service.objects.get(
-                category__name=kwargs.pop("category"), name=kwargs.pop("service")
-            )
+            kwargs["service"] = caching.get_service(kwargs.pop("category"), kwargs.pop("service"))
         except ObjectDoesNotExist as err:
             raise http.Http404("Service does not exist.") from err
         if kwargs["service"].disabled:
@@ -33,6 +140,54 @@ def with_service(view):
     return wrapper
 
 
+def visible_categories(user, current_category=None):
+    """Return ``(name, long_name)`` tuples for the categories that are visible to the user.
+
+    A category is visible if it contains a visible service. If a service is hidden, it is
+    visible if the user has a grant or request for one of its roles. The current category
+    is included even if it would not normally be visible.
+
+    The result is cached for each user, keyed on the user's access version and the services
+    version, so that repeat visits do not need to query the database.
+    """
+    services_version = caching.get_version(caching.SERVICES)
+    categories = cache.get_or_set(
+        f"jasmin_services.categories.{services_version}",
+        lambda: list(Category.objects.values_list("pk", "name", "long_name")),
+    )
+    visible_key = "jasmin_services.visible_categories.{}.{}.{}".format(
+        user.pk, caching.get_version(caching.user_access(user.pk)), services_version
+    )
+    visible = cache.get(visible_key)
+    if visible is None:
+        # Because of the way the data model works, it is sufficient to check if the
+        # user has ever had a request or grant for a service, rather than
+        # specifically an active one - if they have at least one, then they have an
+        # active one
+        visible = set(
+            Category.objects.filter(
+                Q(service__hidden=False)
+                | Exists(
+                    Grant.objects.filter(
+                        access__role__service__category=OuterRef("pk"), access__user=user
+                    )
+                )
+                | Exists(
+                    Request.objects.filter(
+                        access__role__service__category=OuterRef("pk"), access__user=user
+                    )
+                )
+            )
+            .values_list("pk", flat=True)
+            .order_by()
+            .distinct()
+        )
+        cache.set(visible_key, visible)
+    if current_category is not None:
+        visible = visible | {current_category.pk}
+    return [(name, long_name) for pk, name, long_name in categories if pk in visible]
+
+
 def redirect_to_service(service, view_name="service_details"):
     """Return a redirect response to the given service on the service list page."""
     return redirect(
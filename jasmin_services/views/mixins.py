@@ -1,14 +1,17 @@
+import functools
+import heapq
 import random
 import string
 from datetime import date
 
 import asgiref.sync
 import django.contrib.auth.mixins
+import django.db.models
 import django.http
 import django.urls
 from django.db.models import Q
 
-from .. import models
+from .. import caching, models
 from . import common, mixins
 
 
@@ -19,25 +22,17 @@ class WithServiceMixin:
     def get_service(category_name: str, service_name: str) -> models.Service:
         """Get a service from its category and name."""
         try:
-            service = models.Service.objects.get(name=service_name, category__name=category_name)
+            service = caching.get_service(category_name, service_name)
         except models.Service.DoesNotExist as err:
             raise django.http.Http404("Service does not exist.") from err
         if service.disabled:
             raise django.http.Http404("Service has been retired.")
         return service
 
-    @staticmethod
-    async def aget_service(category_name: str, service_name: str) -> models.Service:
+    @classmethod
+    async def aget_service(cls, category_name: str, service_name: str) -> models.Service:
         """Async version of get_service."""
-        try:
-            service = await models.Service.objects.select_related("category").aget(
-                name=service_name, category__name=category_name
-            )
-        except models.Service.DoesNotExist as err:
-            raise django.http.Http404("Service does not exist.") from err
-        if service.disabled:
-            raise django.http.Http404("Service has been retired.")
-        return service
+        return await asgiref.sync.sync_to_async(cls.get_service)(category_name, service_name)
 
 
 class AsyncContextMixin:
@@ -92,17 +87,19 @@ class AccessListMixin:
     """Mixin to process a list of grants and requests for display on the frontend."""
 
     @staticmethod
-    async def process_access(access, user, id_part, id_, may_apply_override=None):
+    async def process_access(
+        access, user, id_part, id_, may_apply_override=None, may_apply_map=None
+    ):
         # Allow overriding the user_may_apply calculation.
-        if may_apply_override is None:
-            may_apply = await access.access.role.auser_may_apply(user)
-        else:
+        if may_apply_override is not None:
             may_apply = may_apply_override
+        elif may_apply_map is not None and access.access.role_id in may_apply_map:
+            may_apply = may_apply_map[access.access.role_id]
+        else:
+            may_apply = await access.access.role.auser_may_apply(user)
 
         access.frontend = {
-            "start": (
-                access.requested_at if isinstance(access, models.Request) else access.granted_at
-            ),
+            "start": _access_start(access),
             "id": f"{id_part}_{id_}",
             "type": ("REQUEST" if isinstance(access, models.Request) else "GRANT"),
             "apply_url": django.urls.reverse(
@@ -119,29 +116,52 @@ class AccessListMixin:
         }
         return access
 
-    async def display_accesses(self, user, grants, requests, may_apply_override=None):
-        """Process a list of either requests or grants for display."""
-        processed = []
+    async def display_accesses(
+        self, user, grants, requests, may_apply_override=None, may_apply_map=None
+    ):
+        """Process a list of either requests or grants for display.
+
+        The grants and requests may be querysets, which are fetched concurrently, or
+        lists that are already ordered newest first. They are merged into a single list,
+        newest first.
+
+        Unless it is overridden, whether the user may apply again for the role of each
+        access is taken from ``may_apply_map``, which is computed in a single query for
+        all the roles if not given.
+        """
+        grants, requests = await common.gather_queries(
+            functools.partial(_newest_first, grants, "-granted_at"),
+            functools.partial(_newest_first, requests, "-requested_at"),
+        )
+        accesses = list(heapq.merge(grants, requests, key=_access_start, reverse=True))
+        if may_apply_override is None and may_apply_map is None:
+            may_apply_map = await models.Role.objects.auser_may_apply_map(
+                user, {access.access.role_id for access in accesses}
+            )
 
         # This ID is used to create CSS ids. Must be unique per access.
         id_part = "".join(random.choice(string.ascii_lowercase) for i in range(5))
-        id_ = 0
         # We loop through the list, and add some information which is not otherwise available.
-        async for grant in grants:
-            processed.append(
-                await self.process_access(
-                    grant, user, id_part, id_, may_apply_override=may_apply_override
-                )
-            )
-            id_ += 1
-        async for request in requests:
-            processed.append(
-                await self.process_access(
-                    request, user, id_part, id_, may_apply_override=may_apply_override
-                )
+        return [
+            await self.process_access(
+                access,
+                user,
+                id_part,
+                id_,
+                may_apply_override=may_apply_override,
+                may_apply_map=may_apply_map,
             )
-            id_ += 1
+            for id_, access in enumerate(accesses)
+        ]
+
+
+def _access_start(access):
+    """Return the datetime at which the grant or request was made."""
+    return access.requested_at if isinstance(access, models.Request) else access.granted_at
 
-        accesses = sorted(processed, key=lambda x: x.frontend["start"], reverse=True)
 
-        return accesses
+def _newest_first(accesses, ordering):
+    """Return a list of the accesses, ordering them newest first if they are a queryset."""
+    if isinstance(accesses, django.db.models.QuerySet):
+        return list(accesses.order_by(ordering))
+    return list(accesses)
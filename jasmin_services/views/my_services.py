@@ -4,12 +4,13 @@ from datetime import date
 from dateutil.relativedelta import relativedelta
 from django.conf import settings
 from django.contrib.auth.decorators import login_required
-from django.core.paginator import EmptyPage, PageNotAnInteger, Paginator
-from django.db.models import Exists, OuterRef, Q
+from django.core.paginator import Paginator
+from django.db.models import Exists, OuterRef
 from django.shortcuts import render
 from django.views.decorators.http import require_safe
 
-from ..models import Category, Grant, Request, RequestState, Service
+from ..models import Grant, Request, RequestState, Service
+from .common import annotate_pending_counts, visible_categories
 
 _log = logging.getLogger(__name__)
 
@@ -24,35 +25,6 @@ def my_services(request):
 
     Displays all of the services for which the user has an active grant or request.
     """
-    # Get the visible categories for the user
-    # A category is visible if it contains a visible service
-    # If a service is hidden, it is visible if the user has a grant or request
-    # for one of its roles
-    # Because of the way the data model works, it is sufficient to check if the
-    # user has ever had a request or grant for a service, rather than
-    # specifically an active one - if they have at least one, then they have an
-    # active one
-    # Django doesn't allow EXISTS subqueries to be used in filters - they must
-    # be annotated first
-    categories = (
-        Category.objects.annotate(
-            has_grant=Exists(
-                Grant.objects.filter(
-                    access__role__service__category=OuterRef("pk"),
-                    access__user=request.user,
-                )
-            ),
-            has_request=Exists(
-                Request.objects.filter(
-                    access__role__service__category=OuterRef("pk"),
-                    access__user=request.user,
-                )
-            ),
-        )
-        .filter(Q(service__hidden=False) | Q(has_grant=True) | Q(has_request=True))
-        .distinct()
-        .values_list("name", "long_name")
-    )
     # Get the active grants and requests with the longest expiries for the user,
     # as these define the visible services and categories, along with the hidden
     # flag on the service itself
@@ -85,8 +57,11 @@ def my_services(request):
         if "expired" not in checked:
             grants = grants.exclude(revoked=False, expires__lt=date.today())
         if "expiring" not in checked:
+            # Make sure we don't include expired grants in expiring
             grants = grants.exclude(
-                revoked=False, expires__lt=date.today() + relativedelta(months=2)
+                revoked=False,
+                expires__gte=date.today(),
+                expires__lt=date.today() + relativedelta(months=2),
             )
         if "rejected" not in checked:
             requests = requests.exclude(state=RequestState.REJECTED)
@@ -96,31 +71,26 @@ def my_services(request):
         # If not applying filters, check all the filter checkboxes
         checked = {"active", "revoked", "expired", "expiring", "rejected", "pending"}
 
-    # Make the grants and requests queries be evaluated here.
-    # This makes the following query less complex and allows a significant speedup.
-    grants = list(grants.order_by("id"))
-    requests = list(requests.order_by("id"))
-
-    # Get the services that match the grants
-    # Since the count for this takes as long as the query, force it to
-    # a list now
-    services = list(
+    # Get the services that match the filtered grants and requests, using correlated
+    # subqueries so that the grants and requests never leave the database
+    services = (
         Service.objects.filter(disabled=False)
-        .filter(Q(role__access__grant__in=grants) | Q(role__access__request__in=requests))
-        .distinct()
-        .prefetch_related("roles")
+        .filter(
+            Exists(grants.filter(access__role__service=OuterRef("pk")))
+            | Exists(requests.filter(access__role__service=OuterRef("pk")))
+        )
         .select_related("category")
+        .prefetch_related("roles")
+        # The primary key makes the ordering stable between pages
+        .order_by("category__position", "category__long_name", "position", "name", "pk")
     )
-    # Get a paginator for the services
+    # Get a paginator for the services, which fetches only the services on the page
     paginator = Paginator(
         services, getattr(settings, "JASMIN_SERVICES", {}).get("SERVICES_PER_PAGE", 5)
     )
-    try:
-        page = paginator.page(request.GET.get("page"))
-    except PageNotAnInteger:
-        page = paginator.page(1)
-    except EmptyPage:
-        page = paginator.page(paginator.num_pages)
+    page = paginator.get_page(request.GET.get("page"))
+    # Show the number of pending requests for the services the user can decide requests for
+    annotate_pending_counts(request.user, page)
     # Only preserve filters if they were applied
     if "_apply_filters" in request.GET:
         preserved_filters = set(checked)
@@ -131,7 +101,7 @@ def my_services(request):
         request,
         "jasmin_services/my_services/service_list.html",
         {
-            "categories": categories,
+            "categories": visible_categories(request.user),
             # Pass a dummy 'current category'
             "current_category": {
                 "name": "my_services",
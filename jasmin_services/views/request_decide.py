@@ -5,6 +5,8 @@ import django.db
 import django.http
 import django.urls
 import django.views.generic.edit
+from django.conf import settings
+from django.db.models import F, Value
 
 from .. import forms, models
 from . import mixins
@@ -35,8 +37,15 @@ class RequestDecideView(
         # pylint: disable=attribute-defined-outside-init
         super().setup(request, *args, **kwargs)
         self.object = self.get_object()
-        self.service = self.get_service(
-            self.object.access.role.service.category.name, self.object.access.role.service.name
+        # The service is loaded with the request, so there is no need to look it up again
+        self.service = self.object.access.role.service
+        if self.service.disabled:
+            raise django.http.Http404("Service has been retired.")
+
+    def get_queryset(self):
+        """Load the applicant, role, service and category with the request."""
+        return models.Request.objects.select_related(
+            "access__user", "access__role__service__category"
         )
 
     def request_already_actioned(self, request):
@@ -124,36 +133,96 @@ class RequestDecideView(
             .prefetch_related("metadata", "access__role__service__category")
         )
 
-        # If the user is staff, show them any request and grant the user has ever had
-        # from any service.
-        if self.request.user.is_staff:
-            all_grants = (
-                models.Grant.objects.filter(access__user=self.object.access.user)
-                .exclude(access__role__service=self.service)
-                .prefetch_related("metadata", "access__role__service__category")
-            )
-            all_requests = (
-                models.Request.objects.filter(
-                    access__user=self.object.access.user,
-                    resulting_grant__isnull=True,
-                )
-                .exclude(access__role__service=self.service)
-                .prefetch_related("metadata", "access__role__service__category")
-            )
-            all_accesses = asgiref.sync.async_to_sync(self.display_accesses)(
-                self.request.user, all_grants, all_requests, may_apply_override=False
-            )
-        else:
-            all_accesses = None
-
         context |= {
             "accesses": asgiref.sync.async_to_sync(self.display_accesses)(
                 self.request.user, grants, requests, may_apply_override=False
             ),
-            "all_accesses": all_accesses,
             "service": self.service,
             # The list of approvers to show here is any user who has the correct
             # permission for either the role or the service
             "approvers": self.object.access.role.approvers.exclude(pk=self.request.user.pk),
         }
         return context
+
+
+class RequestHistoryView(RequestDecideView):
+    """Render a page of the applicant's requests and grants for other services.
+
+    The decide page loads these on demand, since long-standing users may have a large
+    history. Only staff may see the history for other services.
+    """
+
+    http_method_names = ["get"]
+
+    def test_func(self):
+        return self.request.user.is_staff and super().test_func()
+
+    def get_template_names(self):
+        return ["jasmin_services/includes/request_history.html"]
+
+    def get(self, request, *args, **kwargs):
+        try:
+            page = max(int(request.GET.get("page", 1)), 1)
+        except ValueError:
+            page = 1
+        grants, requests, has_next = history_page(
+            self.object.access.user,
+            self.service,
+            page,
+            getattr(settings, "JASMIN_SERVICES", {}).get("HISTORY_PER_PAGE", 20),
+        )
+        accesses = asgiref.sync.async_to_sync(self.display_accesses)(
+            request.user, grants, requests, may_apply_override=False
+        )
+        return self.render_to_response(
+            {
+                "view": self,
+                "accesses": accesses,
+                "next_page": page + 1 if has_next else None,
+            }
+        )
+
+
+def history_page(user, service, page, per_page):
+    """Return a page of the grants and requests that the user has had for services other
+    than the given service.
+
+    Returns ``(grants, requests, has_next)``, where the grants and requests are lists
+    ordered newest first. The page is selected using a single query over the combined
+    history, and only the grants and requests on the page are fetched with their metadata.
+    """
+    grants = (
+        models.Grant.objects.filter(access__user=user)
+        .exclude(access__role__service=service)
+        .annotate(start=F("granted_at"), kind=Value("GRANT"))
+        .order_by()
+        .values_list("start", "kind", "pk")
+    )
+    requests = (
+        models.Request.objects.filter(access__user=user, resulting_grant__isnull=True)
+        .exclude(access__role__service=service)
+        .annotate(start=F("requested_at"), kind=Value("REQUEST"))
+        .order_by()
+        .values_list("start", "kind", "pk")
+    )
+    offset = (page - 1) * per_page
+    # Fetch one extra row to find out if there is another page
+    keys = list(
+        grants.union(requests, all=True).order_by("-start", "-kind", "-pk")[
+            offset : offset + per_page + 1
+        ]
+    )
+    has_next = len(keys) > per_page
+    keys = keys[:per_page]
+    related = ("metadata", "access__role__service__category")
+    page_grants = models.Grant.objects.filter(
+        pk__in=[pk for _, kind, pk in keys if kind == "GRANT"]
+    ).prefetch_related(*related)
+    page_requests = models.Request.objects.filter(
+        pk__in=[pk for _, kind, pk in keys if kind == "REQUEST"]
+    ).prefetch_related(*related)
+    return (
+        list(page_grants.order_by("-granted_at")),
+        list(page_requests.order_by("-requested_at")),
+        has_next,
+    )
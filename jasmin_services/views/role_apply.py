@@ -10,7 +10,7 @@ import django.urls
 import django.views.generic
 import django.views.generic.edit
 from django.contrib import messages
-from django.db import transaction
+from django.db import IntegrityError, transaction
 
 from ..models import Access, Grant, Request, RequestState, Role
 from . import common, mixins
@@ -137,53 +137,83 @@ class RoleApplyView(
         return context
 
     def form_valid(self, form):
-        """Handle the form and create the role request."""
-        with transaction.atomic():
-            access, _ = Access.objects.get_or_create(
-                role=self.role,
-                user=self.request.user,
-            )
-            # If the role is set to auto accept, grant before saving
-            if self.role.auto_accept:
-                req = Request.objects.create(
-                    access=access,
-                    requested_by=self.request.user.username,
-                    state=RequestState.APPROVED,
-                )
-                req.approve(
-                    granted_by="automatic",
-                    expires=date.today()
-                    + dt.timedelta(
-                        days=django.conf.settings.JASMIN_SERVICES.get("AUTO_ACCEPT_GRANT_TIME", 365)
-                    ),
-                )
+        """Handle the form and create the role request.
 
-                if self.previous_request is not None:
-                    req.previous_request = self.previous_request
-                    req.save()
+        The access is locked while the request is created, so that concurrent
+        submissions for the same access, e.g. from a double-click or another tab, are
+        handled one at a time. Whether the user may still apply is checked again once
+        the lock is held.
+        """
+        try:
+            with transaction.atomic():
+                access, _ = Access.objects.select_for_update().get_or_create(
+                    role=self.role, user=self.request.user
+                )
+                error = self.recheck_may_apply(access)
+                if error is not None:
+                    messages.info(self.request, error)
+                    return common.redirect_to_service(self.service)
+                self.create_request(access, form)
+        except IntegrityError:
+            # The database only allows one pending request for each access
+            messages.info(self.request, "You already have an active request for this role")
+            return common.redirect_to_service(self.service)
 
-                if self.previous_grant is not None:
-                    req.resulting_grant.previous_grant = self.previous_grant
-                    req.previous_grant = self.previous_grant
-                    req.resulting_grant.save()
+        messages.success(self.request, "Request submitted successfully")
+        return django.http.HttpResponseRedirect(self.get_success_url())
 
-                req.save()
-                form.save(req)
-                req.copy_metadata_to(req.resulting_grant)
-            else:
-                req = Request.objects.create(access=access, requested_by=self.request.user.username)
+    def recheck_may_apply(self, access):
+        """Check again that the user may apply, once the access is locked.
 
-                if self.previous_request is not None:
-                    self.previous_request.next_request = req
-                    self.previous_request.save()
+        Returns an error message if they may not, or ``None`` if they may.
+        """
+        error, self.previous_grant, self.previous_request = self.get_previous_request_and_grant(
+            self.kwargs.get("bool_grant", None), self.kwargs.get("previous", None)
+        )
+        if error is not None:
+            return error
+        if django.conf.settings.MULTIPLE_REQUESTS_ALLOWED:
+            return None
+        # Another submission may have created a request since the form was shown
+        active_requests = Request.objects.filter_active().filter(access=access)
+        if self.previous_request is not None:
+            active_requests = active_requests.exclude(pk=self.previous_request.pk)
+        if active_requests.filter(state=RequestState.PENDING).exists():
+            return "You already have an active request for this role"
+        return None
 
-                if self.previous_grant is not None:
-                    req.previous_grant = self.previous_grant
-                req.save()
-                form.save(req)
+    def create_request(self, access, form):
+        """Create the request for the access, approving it if the role is auto accepted.
 
-        messages.success(self.request, "Request submitted successfully")
-        return django.http.HttpResponseRedirect(self.get_success_url())
+        The links to the previous request and grant are set when the request is created,
+        so that it is only saved once before any approval.
+        """
+        if self.role.auto_accept:
+            req = Request.objects.create(
+                access=access,
+                requested_by=self.request.user.username,
+                state=RequestState.APPROVED,
+                previous_request=self.previous_request,
+                previous_grant=self.previous_grant,
+            )
+            req.approve(
+                granted_by="automatic",
+                expires=date.today()
+                + dt.timedelta(
+                    days=django.conf.settings.JASMIN_SERVICES.get("AUTO_ACCEPT_GRANT_TIME", 365)
+                ),
+            )
+            form.save(req)
+            req.copy_metadata_to(req.resulting_grant)
+        else:
+            req = Request.objects.create(
+                access=access,
+                requested_by=self.request.user.username,
+                previous_request=self.previous_request,
+                previous_grant=self.previous_grant,
+            )
+            form.save(req)
+        return req
 
     def get_success_url(self):
         """Set default success url to service details page."""
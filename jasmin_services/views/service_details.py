@@ -1,11 +1,13 @@
+import functools
 import random
 import string
 from datetime import date
 
 import django.urls
+from django.core.cache import cache
 from django.db.models import Q
 
-from .. import models
+from .. import caching, models
 from . import common, mixins
 
 
@@ -23,22 +25,33 @@ class ServiceDetailsView(
     """
 
     @staticmethod
-    async def get_service_roleholders(service, role_name):
-        """Get the holders of a given role for a service."""
-        holders = (
-            models.Grant.objects.filter(
-                access__role__service=service,
-                expires__gt=date.today(),
-                revoked=False,
-            )
-            .filter_active()
-            .filter(access__role__name=role_name)
-            .select_related("access__user")
+    async def get_service_roleholders(service, role_names):
+        """Get the holders of each of the given roles for a service.
+
+        The holders are cached for each service until one of its grants changes, or until
+        the end of the day, since grants may expire.
+        """
+        version = caching.get_version(caching.service_grants(service.pk))
+        cache_key = "jasmin_services.roleholders.{}.{}.{}.{}".format(
+            service.pk, ",".join(sorted(role_names)), date.today().isoformat(), version
         )
-        result = []
-        async for item in holders:
-            result.append(item.access.user)
-        return result
+        holders = await cache.aget(cache_key)
+        if holders is None:
+            (holders,) = await common.gather_queries(
+                functools.partial(models.Grant.objects.role_holders, service, role_names)
+            )
+            await cache.aset(cache_key, holders)
+        return holders
+
+    def get_roles(self, user):
+        """Get the roles the user is able to apply for.
+
+        This is any roles which aren't hidden, or any role the user has an access
+        (request or grant) for. Returns a tuple of the roles and a map of whether the user
+        may apply for each one.
+        """
+        roles = list(self.service.roles.filter(Q(hidden=False) | Q(access__user=user)).distinct())
+        return roles, models.Role.objects.user_may_apply_map(user, roles)
 
     async def get_context_data(self, **kwargs):
         """Add information about service to the context."""
@@ -52,32 +65,33 @@ class ServiceDetailsView(
             models.Grant.objects.filter(access__role__service=self.service, access__user=user)
             .filter_active()
             .prefetch_related("metadata", "access__role__service__category")
+            .order_by("-granted_at")
         )
         requests = (
             models.Request.objects.filter(access__role__service=self.service, access__user=user)
             .filter_active()
             .prefetch_related("metadata", "access__role__service__category")
+            .order_by("-requested_at")
         )
 
-        # Get the roles the user is able to apply for.
-        # This is any roles which aren't hidden, or any role the user
-        # Has an access (request or grant) for.
-        may_apply_roles = []
-        async for role in self.service.roles.filter(
-            Q(hidden=False) | Q(access__user=user)
-        ).distinct():
-            if await role.auser_may_apply(user):
-                may_apply_roles.append(role)
+        # These queries are independent, so run them concurrently
+        (roles, may_apply_map), grants, requests = await common.gather_queries(
+            functools.partial(self.get_roles, user),
+            functools.partial(list, grants),
+            functools.partial(list, requests),
+        )
+        may_apply_roles = [role for role in roles if may_apply_map[role.pk]]
 
         # Check if the user has any active grants in the service
-        user_has_grant = await grants.aexists()
+        user_has_grant = bool(grants)
 
         # If the user holds an active grant in the service
         # get all the current managers and deputies of a services so that
         # we can display this information to users of the service.
         if user_has_grant:
-            managers = await self.get_service_roleholders(self.service, "MANAGER")
-            deputies = await self.get_service_roleholders(self.service, "DEPUTY")
+            holders = await self.get_service_roleholders(self.service, ["MANAGER", "DEPUTY"])
+            managers = holders["MANAGER"]
+            deputies = holders["DEPUTY"]
         else:
             managers = []
             deputies = []
@@ -89,7 +103,11 @@ class ServiceDetailsView(
             "deputies": deputies,
             "user_may_apply": common.user_may_apply(user, self.service),
             "user_has_grant": user_has_grant,
-            "accesses": await self.display_accesses(user, grants, requests),
+            # The user's accesses are all for roles in the list of roles, so the same
+            # map can be used when displaying them
+            "accesses": await self.display_accesses(
+                user, grants, requests, may_apply_map=may_apply_map
+            ),
         }
         return context
 
@@ -1,15 +1,19 @@
 import logging
 
-import django.core.mail
 import django.db
+from django.conf import settings
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
-from django.shortcuts import render
+from django.core.exceptions import PermissionDenied
+from django.shortcuts import get_object_or_404, redirect, render
 from django.template.loader import render_to_string
-from django.views.decorators.http import require_http_methods
+from django.urls import reverse
+from django.views.decorators.http import require_http_methods, require_safe
 
-from ..forms import message_form_factory
-from .common import redirect_to_service, with_service
+from ..forms import message_form_factory, message_recipients
+from ..models import MessageRecipient, ServiceMessage
+from ..widgets import user_picker_response
+from .common import redirect_to_service, user_roles_with_perm, with_service
 
 _log = logging.getLogger(__name__)
 
@@ -31,20 +35,19 @@ def service_message(request, service):
     # Get the roles for which the user is allowed to send messages
     # We allow the permission to be allocated for all services, per-service or per-role
     permission = "jasmin_services.send_message_role"
-    if request.user.has_perm(permission) or request.user.has_perm(permission, service):
-        user_roles = list(service.roles.all())
-    else:
-        user_roles = [
-            role for role in service.roles.all() if request.user.has_perm(permission, role)
-        ]
-        # If the user has no permissions, send them back to the service details
-        # Note that we don't show this message if the user has been granted the
-        # permission for the service but there are no roles - in that case we
-        # just show nothing
-        if not user_roles:
-            messages.error(request, "Insufficient permissions")
-            return redirect_to_service(service)
-    MessageForm = message_form_factory(request.user, *user_roles)
+    user_roles = user_roles_with_perm(request.user, permission, service)
+    # If the user has no permissions, send them back to the service details
+    if user_roles is None:
+        messages.error(request, "Insufficient permissions")
+        return redirect_to_service(service)
+    MessageForm = message_form_factory(
+        request.user,
+        *user_roles,
+        recipients_url=reverse(
+            "jasmin_services:service_message_recipients",
+            kwargs={"category": service.category.name, "service": service.name},
+        ),
+    )
     if request.method == "POST":
         form = MessageForm(request.POST)
         if form.is_valid():
@@ -57,18 +60,32 @@ def service_message(request, service):
                     "reply_to": reply_to,
                 },
             )
-            recipients = [u.email for u in form.cleaned_data["users"]]
-            with django.core.mail.get_connection() as connection:
-                for recipient in recipients:
-                    django.core.mail.EmailMessage(
-                        subject=form.cleaned_data["subject"],
-                        body=body,
-                        to=[recipient],
-                        reply_to=[request.user.email] if reply_to else [],
-                        connection=connection,
-                    ).send()
-            messages.success(request, "Message sent")
-            return redirect_to_service(service, view_name="service_users")
+            # Queue the message to be sent in the background, as sending to thousands
+            # of users would take too long for a web request
+            message = ServiceMessage.objects.create(
+                service=service,
+                sender=request.user,
+                subject=form.cleaned_data["subject"],
+                body=body,
+                reply_to=request.user.email if reply_to else "",
+            )
+            # The holders of any selected roles are resolved here, rather than in the form
+            recipients = MessageRecipient.objects.bulk_create(
+                (
+                    MessageRecipient(message=message, user_id=user_id, email=email)
+                    for user_id, email in form.recipients().values_list("pk", "email")
+                ),
+                batch_size=1000,
+            )
+            message.total_recipients = len(recipients)
+            message.save(update_fields=["total_recipients"])
+            messages.success(request, "Message queued for sending")
+            return redirect(
+                "jasmin_services:service_message_status",
+                category=service.category.name,
+                service=service.name,
+                pk=message.pk,
+            )
         else:
             messages.error(request, "Error with one or more fields")
     else:
@@ -84,5 +101,66 @@ def service_message(request, service):
         {
             "service": service,
             "form": form,
+            "recent_messages": service.messages.all()[:10],
+        },
+    )
+
+
+@require_safe
+@login_required
+@with_service
+def service_message_recipients(request, service):
+    """
+    Handler for ``/<category>/<service>/message/recipients/``.
+
+    Responds to GET requests only. The user must have the ``send_message_role``
+    permission for at least one role for the service.
+
+    Returns a page of the users that the user may send messages to as JSON, filtered by
+    the ``term`` GET parameter.
+    """
+    permission = "jasmin_services.send_message_role"
+    user_roles = user_roles_with_perm(request.user, permission, service)
+    if user_roles is None:
+        raise PermissionDenied
+    return user_picker_response(
+        request,
+        message_recipients(user_roles).exclude(pk=request.user.pk),
+        per_page=getattr(settings, "JASMIN_SERVICES", {}).get("RECIPIENTS_PER_PAGE", 50),
+    )
+
+
+@require_safe
+@login_required
+@with_service
+def service_message_status(request, service, pk):
+    """
+    Handler for ``/<category>/<service>/message/<pk>/``.
+
+    Responds to GET requests only. The user must have the ``send_message_role``
+    permission for at least one role for the service.
+
+    Shows the progress of sending a message to the users of the service, along with
+    the recipients that the message could not be sent to.
+    """
+    permission = "jasmin_services.send_message_role"
+    if user_roles_with_perm(request.user, permission, service) is None:
+        messages.error(request, "Insufficient permissions")
+        return redirect_to_service(service)
+    message = get_object_or_404(service.messages, pk=pk)
+    templates = [
+        "jasmin_services/{}/{}/service_message_status.html".format(
+            service.category.name, service.name
+        ),
+        "jasmin_services/{}/service_message_status.html".format(service.category.name),
+        "jasmin_services/service_message_status.html",
+    ]
+    return render(
+        request,
+        templates,
+        {
+            "service": service,
+            "message": message,
+            "failed_recipients": message.recipients.exclude(error="").order_by("email"),
         },
     )
@@ -1,14 +1,18 @@
+import json
 import logging
 from datetime import date
 
+from django import http
 from django.contrib import messages
 from django.contrib.auth import get_user_model
 from django.contrib.auth.decorators import login_required
 from django.shortcuts import render
-from django.views.decorators.http import require_safe
+from django.views.decorators.http import require_http_methods, require_safe
 
+from ..actions import decide_requests
+from ..forms import BulkDecisionForm, BulkDecisionFormSet
 from ..models import Grant, Request, RequestState, Role
-from .common import redirect_to_service, with_service
+from .common import redirect_to_service, user_roles_with_perm, with_service
 
 _log = logging.getLogger(__name__)
 
@@ -29,19 +33,11 @@ def service_requests(request, service):
     # Get the roles for which the user is allowed to decide requests
     # We allow the permission to be allocated for all services, per-service or per-role
     permission = "jasmin_services.decide_request"
-    if request.user.has_perm(permission) or request.user.has_perm(permission, service):
-        user_roles = list(service.roles.all())
-    else:
-        user_roles = [
-            role for role in service.roles.all() if request.user.has_perm(permission, role)
-        ]
-        # If the user has no permissions, send them back to the service details
-        # Note that we don't show this message if the user has been granted the
-        # permission for the service but there are no roles - in that case we
-        # just show nothing
-        if not user_roles:
-            messages.error(request, "Insufficient permissions")
-            return redirect_to_service(service)
+    user_roles = user_roles_with_perm(request.user, permission, service)
+    # If the user has no permissions, send them back to the service details
+    if user_roles is None:
+        messages.error(request, "Insufficient permissions")
+        return redirect_to_service(service)
     templates = [
         "jasmin_services/{}/{}/service_requests.html".format(service.category.name, service.name),
         "jasmin_services/{}/service_requests.html".format(service.category.name),
@@ -72,3 +68,105 @@ def service_requests(request, service):
             .distinct(),
         },
     )
+
+
+@require_http_methods(["GET", "POST"])
+@login_required
+@with_service
+def service_requests_decide(request, service):
+    """
+    Handler for ``/<category>/<service>/requests/decide/``.
+
+    Responds to GET and POST. The user must have the permission ``decide_request``
+    for at least one role in the service.
+
+    Allows a user to decide many of the pending requests that they may decide at once,
+    giving the state, expiry and reasons for each of them. Requests that are not given a
+    decision are left pending.
+
+    A POST with a JSON body of the form ``{"decisions": [...]}``, where each decision has
+    the same fields as the form plus the id of the ``request``, responds with JSON giving
+    the ids of the requests that were ``decided`` and ``skipped``.
+    """
+    permission = "jasmin_services.decide_request"
+    user_roles = user_roles_with_perm(request.user, permission, service)
+    if request.content_type == "application/json":
+        if user_roles is None:
+            return http.JsonResponse({"error": "Insufficient permissions"}, status=403)
+        return _decide_requests_json(request)
+    if user_roles is None:
+        messages.error(request, "Insufficient permissions")
+        return redirect_to_service(service)
+    requests = list(
+        Request.objects.filter_active()
+        .filter(access__role__in=user_roles, state=RequestState.PENDING)
+        .select_related("access__user", "access__role")
+    )
+    if request.method == "POST":
+        formset = BulkDecisionFormSet(request.POST, form_kwargs={"approver": request.user})
+        if formset.is_valid():
+            decisions = _decisions(formset)
+            decided, skipped = decide_requests(decisions, request.user)
+            messages.success(
+                request, f"Decided {len(decided)} request{'s' if len(decided) != 1 else ''}"
+            )
+            if skipped:
+                messages.warning(
+                    request,
+                    f"{len(skipped)} request{'s were' if len(skipped) != 1 else ' was'} "
+                    "not decided, as they have already been decided or you may not decide them",
+                )
+            return redirect_to_service(service, "service_requests")
+        else:
+            messages.error(request, "Error with one or more fields")
+    else:
+        formset = BulkDecisionFormSet(
+            initial=[{"request": req.pk} for req in requests],
+            form_kwargs={"approver": request.user},
+        )
+    requests = {str(req.pk): req for req in requests}
+    templates = [
+        "jasmin_services/{}/{}/service_requests_decide.html".format(
+            service.category.name, service.name
+        ),
+        "jasmin_services/{}/service_requests_decide.html".format(service.category.name),
+        "jasmin_services/service_requests_decide.html",
+    ]
+    return render(
+        request,
+        templates,
+        {
+            "service": service,
+            "formset": formset,
+            # Pair each form with its request, skipping any that have since been decided
+            "rows": [
+                (requests[str(form["request"].value())], form)
+                for form in formset
+                if str(form["request"].value()) in requests
+            ],
+        },
+    )
+
+
+def _decide_requests_json(request):
+    """Decide the requests given in the JSON body of the request."""
+    try:
+        items = json.loads(request.body)["decisions"]
+    except (ValueError, KeyError, TypeError):
+        return http.JsonResponse({"error": "Expected a list of decisions"}, status=400)
+    if not isinstance(items, list) or not all(isinstance(item, dict) for item in items):
+        return http.JsonResponse({"error": "Expected a list of decisions"}, status=400)
+    forms = [BulkDecisionForm(request.user, data=item) for item in items]
+    errors = {index: form.errors for index, form in enumerate(forms) if not form.is_valid()}
+    if errors:
+        return http.JsonResponse({"errors": errors}, status=400)
+    decided, skipped = decide_requests(_decisions(forms), request.user)
+    return http.JsonResponse(
+        {"decided": [req.pk for req in decided], "skipped": skipped},
+    )
+
+
+def _decisions(forms):
+    """Return a dictionary of the decisions from the forms, keyed by request id."""
+    decisions = {form.cleaned_data["request"]: form.decision() for form in forms}
+    return {pk: decision for pk, decision in decisions.items() if decision is not None}
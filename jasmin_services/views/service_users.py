@@ -1,3 +1,4 @@
+import json
 import logging
 from datetime import date
 
@@ -5,16 +6,119 @@ from dateutil.relativedelta import relativedelta
 from django.conf import settings
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
-from django.core.paginator import EmptyPage, PageNotAnInteger, Paginator
+from django.db import connections
+from django.db.models import Count, Q
 from django.shortcuts import render
 from django.views.decorators.http import require_safe
 
 from ..models import Grant
-from .common import redirect_to_service, with_service
+from .common import redirect_to_service, user_roles_with_perm, with_service
 
 _log = logging.getLogger(__name__)
 
 
+class KeysetPage:
+    """
+    A page of grants selected by the ``(user, id)`` of the grant before or after the page,
+    so that no offset or total count is needed.
+    """
+
+    def __init__(self, object_list, has_previous, has_next):
+        self.object_list = object_list
+        self.has_previous_page = has_previous
+        self.has_next_page = has_next
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_previous(self):
+        return self.has_previous_page
+
+    def has_next(self):
+        return self.has_next_page
+
+    def has_other_pages(self):
+        return self.has_previous_page or self.has_next_page
+
+    @staticmethod
+    def _cursor(grant):
+        return "{}-{}".format(grant.access.user_id, grant.pk)
+
+    def previous_cursor(self):
+        return self._cursor(self.object_list[0]) if self.object_list else ""
+
+    def next_cursor(self):
+        return self._cursor(self.object_list[-1]) if self.object_list else ""
+
+
+def _parse_cursor(cursor):
+    """Parse a ``<user id>-<grant id>`` cursor, returning ``None`` if it is invalid."""
+    try:
+        user_id, grant_id = (int(part) for part in cursor.split("-"))
+    except (AttributeError, ValueError):
+        return None
+    return user_id, grant_id
+
+
+def keyset_page(grants, after=None, before=None, per_page=20):
+    """
+    Returns the page of grants, ordered by user and id, that comes after or before the
+    given cursor. Each page is found using the ``(user, id)`` ordering, so fetching later
+    pages does not get slower.
+    """
+    after, before = _parse_cursor(after), _parse_cursor(before)
+    if before:
+        user_id, grant_id = before
+        grants = grants.filter(
+            Q(access__user__lt=user_id) | Q(access__user=user_id, pk__lt=grant_id)
+        ).order_by("-access__user", "-pk")
+        # Fetch one extra grant to find out whether there is another page
+        object_list = list(grants[: per_page + 1])
+        has_previous = len(object_list) > per_page
+        return KeysetPage(object_list[:per_page][::-1], has_previous, True)
+    if after:
+        user_id, grant_id = after
+        grants = grants.filter(
+            Q(access__user__gt=user_id) | Q(access__user=user_id, pk__gt=grant_id)
+        )
+    object_list = list(grants.order_by("access__user", "pk")[: per_page + 1])
+    return KeysetPage(object_list[:per_page], bool(after), len(object_list) > per_page)
+
+
+def _estimate_count(queryset):
+    """
+    Returns the query planner's estimate of the number of rows in the queryset, or
+    ``None`` if the database cannot provide one.
+    """
+    if connections[queryset.db].vendor != "postgresql":
+        return None
+    plan = json.loads(queryset.order_by().explain(format="json"))
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+def count_grants(grants):
+    """
+    Returns a tuple of the number of grants, the number of distinct users and whether the
+    counts are approximate.
+
+    If the query planner estimates that there are more grants than the
+    ``APPROXIMATE_COUNT_THRESHOLD`` setting, the estimate is used instead and the number
+    of users is not counted. Otherwise, both are counted exactly in a single query.
+    """
+    threshold = getattr(settings, "JASMIN_SERVICES", {}).get("APPROXIMATE_COUNT_THRESHOLD")
+    if threshold is not None:
+        estimate = _estimate_count(grants)
+        if estimate is not None and estimate > threshold:
+            return estimate, None, True
+    counts = grants.order_by().aggregate(
+        n_grants=Count("pk"), n_users=Count("access__user", distinct=True)
+    )
+    return counts["n_grants"], counts["n_users"], False
+
+
 @require_safe
 @login_required
 @with_service
@@ -32,19 +136,11 @@ def service_users(request, service):
     # grants. We allow the permission to be allocated for all services,
     # per-service or per-role.
     permission = "jasmin_services.view_users_role"
-    if request.user.has_perm(permission) or request.user.has_perm(permission, service):
-        user_roles = list(service.roles.all())
-    else:
-        user_roles = [
-            role for role in service.roles.all() if request.user.has_perm(permission, role)
-        ]
-        # If the user has no permissions, send them back to the service details
-        # Note that we don't show this message if the user has been granted the
-        # permission for the service but there are no roles - in that case we
-        # just show nothing
-        if not user_roles:
-            messages.error(request, "Insufficient permissions")
-            return redirect_to_service(service)
+    user_roles = user_roles_with_perm(request.user, permission, service)
+    # If the user has no permissions, send them back to the service details
+    if user_roles is None:
+        messages.error(request, "Insufficient permissions")
+        return redirect_to_service(service)
     # Start with the active grants for the roles that the user has permission for
     grants = Grant.objects.filter_active().filter(access__role__in=user_roles)
     all_statuses = ("active", "expiring", "expired", "revoked")
@@ -74,20 +170,14 @@ def service_users(request, service):
         # If not applying filters, check all the filter checkboxes
         selected_roles = user_roles
         selected_statuses = all_statuses
-    # Order the grants by user and then by the natural ordering
-    grants = grants.select_related(
-        "access__role", "access__user", "access__user__institution"
-    ).order_by("access__user", *Grant._meta.ordering)
-    # Get a paginator for the grants
-    paginator = Paginator(
-        grants, getattr(settings, "JASMIN_SERVICES", {}).get("GRANTS_PER_PAGE", 20)
+    grants = grants.select_related("access__role", "access__user", "access__user__institution")
+    page = keyset_page(
+        grants,
+        after=request.GET.get("after"),
+        before=request.GET.get("before"),
+        per_page=getattr(settings, "JASMIN_SERVICES", {}).get("GRANTS_PER_PAGE", 20),
     )
-    try:
-        page = paginator.page(request.GET.get("page"))
-    except PageNotAnInteger:
-        page = paginator.page(1)
-    except EmptyPage:
-        page = paginator.page(paginator.num_pages)
+    n_grants, n_users, approximate = count_grants(grants)
     # Only preserve filters if they were applied
     if "_apply_filters" in request.GET:
         preserved_filters = set(r.name for r in selected_roles).union(selected_statuses)
@@ -107,7 +197,9 @@ def service_users(request, service):
             "statuses": tuple(dict(name=s, checked=s in selected_statuses) for s in all_statuses),
             "roles": tuple(dict(name=r.name, checked=r in selected_roles) for r in user_roles),
             "grants": page,
-            "n_users": grants.values("access__user").distinct().count(),
+            "n_grants": n_grants,
+            "n_users": n_users,
+            "approximate_count": approximate,
             "preserved_filters": "&".join("{}=1".format(f) for f in preserved_filters),
         },
     )
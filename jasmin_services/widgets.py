@@ -10,7 +10,9 @@ from django import forms
 from django.contrib import admin
 from django.contrib.contenttypes.models import ContentType
 from django.core.exceptions import ObjectDoesNotExist
-from django.http import HttpResponse
+from django.core.paginator import Paginator
+from django.db.models import Q
+from django.http import HttpResponse, JsonResponse
 from django.urls import reverse
 from django.urls.exceptions import NoReverseMatch
 
@@ -115,3 +117,80 @@ class AdminGfkObjectIdWidget(forms.TextInput):
             "admin:generic_object_text", current_app=self.admin_site.name
         )
         return attrs
+
+
+def user_picker_response(request, queryset, per_page=50):
+    """
+    Returns a JSON response containing a page of the users in the queryset that match
+    the ``term`` GET parameter, for use by :py:class:`UserPickerWidget`.
+
+    The page is selected by the ``page`` GET parameter.
+    """
+    term = request.GET.get("term", "").strip()
+    if term:
+        queryset = queryset.filter(
+            Q(username__icontains=term)
+            | Q(first_name__icontains=term)
+            | Q(last_name__icontains=term)
+            | Q(email__icontains=term)
+        )
+    page = Paginator(queryset.order_by("username", "pk"), per_page).get_page(
+        request.GET.get("page")
+    )
+    return JsonResponse(
+        {
+            "results": [
+                {"id": user.pk, "text": user_picker_label(user)}
+                for user in page.object_list.only("pk", "username", "first_name", "last_name")
+            ],
+            "more": page.has_next(),
+        }
+    )
+
+
+def user_picker_label(user):
+    """
+    Returns the label for a user in a :py:class:`UserPickerWidget`.
+    """
+    full_name = user.get_full_name()
+    return f"{user.username} ({full_name})" if full_name else user.username
+
+
+class UserPickerWidget(forms.SelectMultiple):
+    """
+    Custom widget for picking users from a set that may be too large to render.
+
+    Only the selected users are rendered as options. Other users are found by searching,
+    and are fetched a page at a time from a JSON endpoint that uses
+    :py:func:`user_picker_response`.
+    """
+
+    class Media:
+        js = ("jasmin_services/js/user_picker.js",)
+
+    def __init__(self, url, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.url = url
+
+    def build_attrs(self, *args, **kwargs):
+        attrs = super().build_attrs(*args, **kwargs)
+        class_to_add = "user-picker"
+        if "class" in attrs:
+            attrs["class"] += " " + class_to_add
+        else:
+            attrs["class"] = class_to_add
+        attrs["data-url"] = self.url
+        return attrs
+
+    def optgroups(self, name, value, attrs=None):
+        # Only render the selected users, rather than every user in the queryset
+        selected = [pk for pk in value if str(pk).isdigit()]
+        users = self.choices.queryset.filter(pk__in=selected) if selected else ()
+        return [
+            (
+                None,
+                [self.create_option(name, user.pk, user_picker_label(user), True, index)],
+                index,
+            )
+            for index, user in enumerate(users)
+        ]